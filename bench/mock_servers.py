@@ -0,0 +1,231 @@
+"""
+本地模拟 E-utilities（ESearch/EFetch/ELink）与 OpenAI chat completions 服务，供基准测试离线使用
+
+    python bench/mock_servers.py --port 8765 --latency 0.2 --error-rate 0.01 --max-rps 10
+
+- E-utilities 挂在 /entrez/eutils/，OpenAI 挂在 /v1/
+- --latency/--jitter：每个请求的模拟延迟（秒）
+- --error-rate：返回 500 的概率
+- --throttle-rate：随机返回 429 的概率；--max-rps：超过该速率时返回 429（模拟 NCBI 限流）
+- --missing-rate：EFetch 中缺失记录的比例
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from aiohttp import web
+
+ABSTRACT_SENTENCE = (
+    "This synthetic abstract describes a randomized controlled trial of a novel intervention "
+    "in patients with chronic disease, reporting primary and secondary outcomes. "
+)
+
+
+class MockBehavior:
+    """模拟服务的延迟、错误率和限流行为"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 max_rps=None, missing_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.missing_rate = missing_rate
+        self.random = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def _over_rate(self) -> bool:
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.max_rps
+
+    async def apply(self):
+        """按配置注入延迟、429 和 500，需要中断请求时抛出对应的 HTTP 异常"""
+        self.requests += 1
+        if self._over_rate() or self.random.random() < self.throttle_rate:
+            self.throttled += 1
+            raise web.HTTPTooManyRequests(
+                text='{"error":"API rate limit exceeded"}',
+                headers={"Retry-After": "1"},
+            )
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            raise web.HTTPInternalServerError(text="simulated upstream error")
+
+
+def _pmids_for_term(term: str, count: int):
+    """根据检索式生成确定的 PMID 序列"""
+    base = int(hashlib.md5(term.encode("utf-8")).hexdigest()[:6], 16) % 30000000 + 1000000
+    return [str(base + i) for i in range(count)]
+
+
+def _article_xml(pmid: str) -> str:
+    """生成一篇结构完整的 PubmedArticle"""
+    n = int(pmid) % 97
+    return (
+        "<PubmedArticle><MedlineCitation Status=\"MEDLINE\" Owner=\"NLM\">"
+        f"<PMID Version=\"1\">{pmid}</PMID>"
+        "<Article PubModel=\"Print\"><Journal><JournalIssue CitedMedium=\"Print\">"
+        f"<PubDate><Year>{2000 + n % 25}</Year></PubDate></JournalIssue>"
+        f"<Title>Journal of Synthetic Medicine {n}</Title><ISOAbbreviation>J Synth Med {n}</ISOAbbreviation></Journal>"
+        f"<ArticleTitle>Synthetic article {pmid} on leukemia and bronchiolitis obliterans</ArticleTitle>"
+        f"<Abstract><AbstractText>{ABSTRACT_SENTENCE * 8}</AbstractText></Abstract>"
+        "<AuthorList CompleteYN=\"Y\">"
+        "<Author ValidYN=\"Y\"><LastName>Smith</LastName><ForeName>Jane</ForeName><Initials>J</Initials></Author>"
+        f"<Author ValidYN=\"Y\"><LastName>Author{n}</LastName><ForeName>Alex</ForeName><Initials>A</Initials></Author>"
+        "</AuthorList></Article>"
+        "<MeshHeadingList><MeshHeading>"
+        "<DescriptorName UI=\"D007938\" MajorTopicYN=\"Y\">Leukemia</DescriptorName>"
+        "<QualifierName UI=\"Q000188\" MajorTopicYN=\"N\">drug therapy</QualifierName>"
+        "</MeshHeading><MeshHeading>"
+        "<DescriptorName UI=\"D001989\" MajorTopicYN=\"N\">Bronchiolitis Obliterans</DescriptorName>"
+        "</MeshHeading></MeshHeadingList>"
+        "<KeywordList Owner=\"NOTNLM\"><Keyword MajorTopicYN=\"N\">synthetic</Keyword></KeywordList>"
+        "</MedlineCitation><PubmedData><ArticleIdList>"
+        f"<ArticleId IdType=\"pubmed\">{pmid}</ArticleId><ArticleId IdType=\"doi\">10.5555/synth.{pmid}</ArticleId>"
+        "</ArticleIdList></PubmedData></PubmedArticle>"
+    )
+
+
+def create_app(behavior: MockBehavior, total_count: int = 5000) -> web.Application:
+    """创建同时提供 E-utilities 和 OpenAI 接口的应用"""
+    histories = {}
+
+    async def params_of(request):
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.post())
+        return params
+
+    async def esearch(request):
+        await behavior.apply()
+        params = await params_of(request)
+        term = params.get("term", "")
+        retstart = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        pmids = _pmids_for_term(term, total_count)
+        result = {"count": str(total_count), "idlist": pmids[retstart:retstart + retmax]}
+        if params.get("usehistory") == "y":
+            webenv = "MCID_" + hashlib.md5(term.encode("utf-8")).hexdigest()
+            histories[webenv] = term
+            result.update({"webenv": webenv, "querykey": "1"})
+        return web.json_response({"esearchresult": result})
+
+    async def efetch(request):
+        await behavior.apply()
+        params = await params_of(request)
+        if params.get("rettype") == "uilist":
+            term = histories.get(params.get("WebEnv"))
+            if term is None:
+                return web.Response(text="<ERROR>Unable to obtain query #1</ERROR>")
+            retstart = int(params.get("retstart", 0))
+            retmax = int(params.get("retmax", 20))
+            pmids = _pmids_for_term(term, total_count)[retstart:retstart + retmax]
+            return web.Response(text="\n".join(pmids) + "\n")
+        ids = [pmid for pmid in params.get("id", "").split(",") if pmid]
+        records = [
+            _article_xml(pmid) for pmid in ids
+            if behavior.random.random() >= behavior.missing_rate
+        ]
+        body = "<?xml version=\"1.0\" ?><PubmedArticleSet>" + "".join(records) + "</PubmedArticleSet>"
+        return web.Response(text=body, content_type="text/xml")
+
+    async def elink(request):
+        await behavior.apply()
+        params = await request.post()
+        linksets = [
+            {"dbfrom": "pubmed", "ids": [pmid], "linksetdbs": [
+                {"dbto": "pubmed", "linkname": "pubmed_pubmed", "links": _pmids_for_term(pmid, 5)}
+            ]}
+            for pmid in params.getall("id", [])
+        ]
+        return web.json_response({"linksets": linksets})
+
+    async def chat_completions(request):
+        await behavior.apply()
+        payload = await request.json()
+        # 原样返回用户消息，相当于一个"翻译"结果，保持 JSON 结构可被解析
+        content = payload["messages"][-1]["content"]
+        created = int(time.time())
+        if payload.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for start in range(0, len(content), 16):
+                chunk = {
+                    "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}],
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(0)
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        return web.json_response({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": created,
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(content) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": len(content) // 2},
+        })
+
+    async def stats(request):
+        return web.json_response({
+            "requests": behavior.requests,
+            "throttled": behavior.throttled,
+            "errors": behavior.errors,
+        })
+
+    app = web.Application()
+    app.router.add_route("*", "/entrez/eutils/esearch.fcgi", esearch)
+    app.router.add_route("*", "/entrez/eutils/efetch.fcgi", efetch)
+    app.router.add_post("/entrez/eutils/elink.fcgi", elink)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock E-utilities and OpenAI servers for benchmarking.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean per-request latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a random HTTP 429")
+    parser.add_argument("--max-rps", type=float, default=None, help="Return 429 above this request rate")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Fraction of EFetch records omitted")
+    parser.add_argument("--count", type=int, default=5000, help="Total hits reported for every query")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    behavior = MockBehavior(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_rps=args.max_rps,
+        missing_rate=args.missing_rate,
+        seed=args.seed,
+    )
+    web.run_app(create_app(behavior, total_count=args.count), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
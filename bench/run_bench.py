@@ -0,0 +1,336 @@
+"""
+离线基准测试：启动本地模拟服务，分别压测 PubMedAssistant、命令行和 FastAPI 服务
+
+    python bench/run_bench.py --scenarios assistant,api,cli --concurrency 1,8,32 --requests 200 \\
+        --latency 0.1 --output bench_results.json
+
+结果为 JSON，包含各场景在不同并发度下的 p50/p95/p99 延迟、吞吐量、错误数、峰值 RSS 和线程数，
+以及当前 git commit，便于在不同提交之间对比。
+"""
+import os
+import sys
+# 获取当前文件的父目录的父目录（即项目根目录）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 将项目根目录添加到系统路径
+sys.path.append(project_root)
+import argparse
+import asyncio
+import json
+import resource
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import aiohttp
+import yaml
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def read_proc_status(pid: int) -> Dict[str, int]:
+    """读取 /proc/<pid>/status 中的峰值 RSS（KB）和线程数，非 Linux 平台返回空字典"""
+    result = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    result["peak_rss_kb"] = int(line.split()[1])
+                elif line.startswith("Threads:"):
+                    result["threads"] = int(line.split()[1])
+    except OSError:
+        pass
+    return result
+
+
+class ProcessSampler:
+    """后台线程定期采样进程的峰值 RSS 和线程数"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.pids = set()
+        self.peak_rss_kb = 0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add(self, pid: int):
+        self.pids.add(pid)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pid in list(self.pids):
+                status = read_proc_status(pid)
+                if not status:
+                    self.pids.discard(pid)
+                    continue
+                self.peak_rss_kb = max(self.peak_rss_kb, status.get("peak_rss_kb", 0))
+                self.peak_threads = max(self.peak_threads, status.get("threads", 0))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def run_load(operation: Callable[[int], Any], concurrency: int, total: int) -> Dict[str, Any]:
+    """以固定并发度执行 total 次操作，返回延迟统计"""
+    latencies: List[float] = []
+    errors: List[str] = []
+    counter = iter(range(total))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                await operation(index)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e)[:200])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def write_bench_config(path: str, mock_url: str, args) -> str:
+    """生成指向模拟服务的配置文件"""
+    data = {
+        "ncbi_api_key": "",
+        "ncbi_rate_limit": args.rate_limit,
+        "max_search_results": args.topk,
+        "eutils": {"base_url": f"{mock_url}/entrez/eutils", "timeout": 30},
+        "openai": {"model": "mock-model", "api_key": "sk-mock", "base_url": f"{mock_url}/v1"},
+        "article_cache": {"enabled": args.cache, "path": os.path.join(os.path.dirname(path), "pubmed.db")},
+        "translation_cache": {"enabled": args.cache, "path": os.path.join(os.path.dirname(path), "pubmed.db")},
+    }
+    with open(path, "w") as f:
+        yaml.safe_dump(data, f)
+    return path
+
+
+async def wait_for_http(url: str, timeout: float = 30):
+    """等待服务可用"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"服务启动超时: {url}")
+
+
+async def bench_assistant(config_path: str, args, concurrency: int) -> Dict[str, Any]:
+    """在当前进程中直接驱动 PubMedAssistant：搜索 + 批量详情（可选翻译）"""
+    from src.config import Config
+    from src.agents.pubmed_assistant import PubMedAssistant
+    from src.tools.eutils import close_eutils_client
+
+    agent = PubMedAssistant(name="BenchAssistant", config=Config(config_file=config_path))
+
+    async def operation(index: int):
+        pmids = await agent.search_pubmed(query=f"bench query {index % args.distinct_queries}", topk=args.topk)
+        details = await agent.batch_get_details(pmids)
+        if args.translate:
+            await agent.translate_articles([d for d in details if "error" not in d])
+
+    threads = {"peak": threading.active_count()}
+
+    async def sample_threads():
+        while True:
+            threads["peak"] = max(threads["peak"], threading.active_count())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.ensure_future(sample_threads())
+    try:
+        result = await run_load(operation, concurrency, args.requests)
+    finally:
+        sampler.cancel()
+        await close_eutils_client()
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result["peak_threads"] = threads["peak"]
+    return result
+
+
+async def bench_cli(config_path: str, args, concurrency: int) -> Dict[str, Any]:
+    """以子进程方式运行 src/main.py"""
+    main_py = os.path.join(project_root, "src", "main.py")
+
+    with ProcessSampler() as sampler:
+        async def operation(index: int):
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, main_py,
+                "--query", f"bench query {index % args.distinct_queries}",
+                "--topk", str(args.topk),
+                "--config", config_path,
+                cwd=project_root,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            sampler.add(process.pid)
+            code = await process.wait()
+            if code != 0:
+                raise RuntimeError(f"main.py 退出码 {code}")
+
+        result = await run_load(operation, concurrency, max(1, args.requests // 10))
+    result["peak_rss_mb"] = sampler.peak_rss_kb / 1024 or None
+    result["peak_threads"] = sampler.peak_threads or None
+    return result
+
+
+async def bench_api(config_path: str, args, concurrency: int) -> Dict[str, Any]:
+    """启动 uvicorn 运行 src/api_server.py，通过 HTTP 压测搜索和批量详情接口"""
+    port = free_port()
+    env = {**os.environ, "PUBMED_AGENT_CONFIG": config_path}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}/api"
+    try:
+        await wait_for_http(f"{base}/health/")
+        with ProcessSampler() as sampler:
+            sampler.add(server.pid)
+            connector = aiohttp.TCPConnector(limit=concurrency)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                async def operation(index: int):
+                    query = {"query": f"bench query {index % args.distinct_queries}", "topk": args.topk}
+                    async with session.post(f"{base}/search/", json=query) as response:
+                        response.raise_for_status()
+                        pmids = (await response.json())["pmids"]
+                    async with session.post(f"{base}/search/batch", json=pmids) as response:
+                        response.raise_for_status()
+                        await response.read()
+
+                result = await run_load(operation, concurrency, args.requests)
+        result["peak_rss_mb"] = sampler.peak_rss_kb / 1024 or None
+        result["peak_threads"] = sampler.peak_threads or None
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+SCENARIOS = {
+    "assistant": bench_assistant,
+    "cli": bench_cli,
+    "api": bench_api,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=project_root, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def async_main():
+    parser = argparse.ArgumentParser(description='Offline throughput/latency benchmark against mock upstreams.')
+    parser.add_argument('--scenarios', type=str, default="assistant,api,cli", help='Comma-separated: assistant,api,cli')
+    parser.add_argument('--concurrency', type=str, default="1,8,32", help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=100, help='Operations per concurrency level (CLI runs 1/10)')
+    parser.add_argument('--topk', type=int, default=20, help='PMIDs per search')
+    parser.add_argument('--distinct-queries', type=int, default=50, help='Number of distinct query strings')
+    parser.add_argument('--translate', action='store_true', help='Also translate fetched articles (assistant scenario)')
+    parser.add_argument('--cache', action='store_true', help='Enable the on-disk caches')
+    parser.add_argument('--rate-limit', type=float, default=1000, help='ncbi_rate_limit used by the agent')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock upstream latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Mock upstream latency jitter (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Mock upstream HTTP 500 probability')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Mock upstream random 429 probability')
+    parser.add_argument('--max-rps', type=float, default=None, help='Mock upstream 429 above this rate')
+    parser.add_argument('--output', type=str, default=None, help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pubmed-bench-")
+    port = free_port()
+    mock_url = f"http://127.0.0.1:{port}"
+    mock_cmd = [
+        sys.executable, os.path.join(project_root, "bench", "mock_servers.py"),
+        "--port", str(port), "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+    ]
+    if args.max_rps:
+        mock_cmd += ["--max-rps", str(args.max_rps)]
+    mock = subprocess.Popen(mock_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": vars(args),
+        "scenarios": {},
+    }
+    try:
+        await wait_for_http(f"{mock_url}/_stats")
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            report["scenarios"][name] = []
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                # 每轮使用独立的缓存文件，避免上一轮的缓存影响结果
+                config_path = write_bench_config(
+                    os.path.join(tempfile.mkdtemp(dir=workdir), "config.yaml"), mock_url, args
+                )
+                result = await SCENARIOS[name](config_path, args, concurrency)
+                report["scenarios"][name].append(result)
+                print(f"{name} c={concurrency}: p50={result['latency_s']['p50']} "
+                      f"p99={result['latency_s']['p99']} rps={result['requests_per_s']:.1f} "
+                      f"errors={result['errors']}", file=sys.stderr)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{mock_url}/_stats") as response:
+                report["upstream"] = await response.json()
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+def main():
+    asyncio.run(async_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,105 @@
-from typing import Dict, List, Any
+from typing import Callable, Dict, Hashable, List, Any, Optional, Tuple
 from src.tools.base import BaseTool
 from src.config import Config
 from src.logger import logger
 import asyncio
+import time
+from src.metrics import TOOL_CALLS, TOOL_COALESCED, TOOL_LATENCY
+from src.tools.priority import current_priority, parse_priority, priority_scope
 
 class EasyAgent:
     def __init__(self, name: str, config: Config = None):
         self.name = name
         self.config = config
-        self.tools: Dict[str, BaseTool] = {}
+        self.tools: Dict[str, BaseTool] = {}  # 已创建的工具
+        self._tool_factories: Dict[str, Callable[[], BaseTool]] = {}  # 尚未创建的工具
         self.logger = logger
         self.cached_results = {}  # 添加通用缓存
+        # 单飞合并：相同工具 + 相同参数 + 相同优先级的并发调用共享同一个任务
+        self._inflight: Dict[Tuple[Hashable, int], asyncio.Task] = {}
+        self.coalesce_stats = {"calls": 0, "coalesced": 0}
 
     def register_tool(self, tool: BaseTool):
         """注册工具"""
         self.tools[tool.name] = tool
         self.logger.info(f"Tool '{tool.name}' registered to agent '{self.name}'.")
 
-    async def execute_tool_async(self, tool_name: str, *args, **kwargs) -> Any:
-        """异步执行工具"""
-        if tool_name not in self.tools:
-            raise ValueError(f"工具 {tool_name} 未找到")
-        tool = self.tools[tool_name]
-        self.logger.info(f"异步执行工具: {tool.name}")
-        return await tool.async_execute(*args, **kwargs)
+    def register_tool_factory(self, tool_name: str, factory: Callable[[], BaseTool]):
+        """登记工具的工厂函数，工具在首次使用时才创建，缩短进程启动时间"""
+        self._tool_factories[tool_name] = factory
+
+    def get_tool(self, tool_name: str) -> BaseTool:
+        """获取工具，尚未创建的工具在此时创建"""
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            factory = self._tool_factories.get(tool_name)
+            if factory is None:
+                raise ValueError(f"工具 {tool_name} 未找到")
+            tool = factory()
+            self.register_tool(tool)
+            del self._tool_factories[tool_name]
+        return tool
+
+    async def execute_tool_async(self, tool_name: str, *args, priority: Optional[str] = None, **kwargs) -> Any:
+        """
+        异步执行工具
+        :param priority: interactive / normal / bulk，决定在工具执行引擎和限流器中的排队顺序，默认沿用当前调用链
+        """
+        tool = self.get_tool(tool_name)
+        self.logger.debug(f"异步执行工具: {tool.name}")
+        level = parse_priority(priority) if priority is not None else current_priority.get()
+        call_key = self._call_key(tool_name, args, kwargs)
+        self.coalesce_stats["calls"] += 1
+        # 共享任务的优先级在创建时确定：只加入同级或更高优先级的在途任务，高优先级调用不会排进低优先级队列
+        task = next(
+            (self._inflight[(call_key, lane)] for lane in range(level, -1, -1) if (call_key, lane) in self._inflight),
+            None,
+        )
+        if task is None:
+            key = (call_key, level)
+            # 任务创建时复制当前上下文，工具内部的排队都按该优先级进行
+            with priority_scope(level):
+                task = asyncio.ensure_future(self._run_tool(tool, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release_inflight(key, t))
+        else:
+            self.coalesce_stats["coalesced"] += 1
+            TOOL_COALESCED.labels(tool.name).inc()
+        # shield：单个调用方被取消时不取消共享任务
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _run_tool(tool: BaseTool, args: tuple, kwargs: Dict) -> Any:
+        """执行工具并记录耗时和结果"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await tool.async_execute(*args, **kwargs)
+            status = "success"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            TOOL_LATENCY.labels(tool.name).observe(time.perf_counter() - started)
+            TOOL_CALLS.labels(tool.name, status).inc()
+
+    @staticmethod
+    def _call_key(tool_name: str, args: tuple, kwargs: Dict) -> Hashable:
+        """工具名 + 规范化参数作为合并键（可哈希的元组，不做序列化）"""
+        return tool_name, _freeze(args), _freeze(kwargs)
+
+    def _release_inflight(self, key: Tuple[Hashable, int], task: asyncio.Task):
+        """共享任务结束后移出在途表"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 所有调用方都已取消时避免 "exception was never retrieved" 警告
 
     def execute_tool_sync(self, tool_name: str, *args, **kwargs) -> Any:
         """同步执行工具"""
-        if tool_name not in self.tools:
-            raise ValueError(f"工具 {tool_name} 未找到")
-        tool = self.tools[tool_name]
-        self.logger.info(f"同步执行工具: {tool.name}")
+        tool = self.get_tool(tool_name)
+        self.logger.debug(f"同步执行工具: {tool.name}")
         return tool.execute(*args, **kwargs)
 
     # 保持原有异步方法兼容
@@ -40,15 +109,20 @@ class EasyAgent:
 
     async def async_execute_tools(self, tool_name: str, params_list: List[Dict]) -> List[Any]:
         """并发执行多个工具任务"""
-        if tool_name not in self.tools:
-            raise ValueError(f"工具 {tool_name} 未找到")
-            
-        tool = self.tools[tool_name]
-        tasks = []
-        for params in params_list:
-            tasks.append(tool.async_execute(**params))
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tool = self.get_tool(tool_name)
+        # 按工具并发上限逐步放行，而不是一次性创建全部任务
+        results: List[Any] = [None] * len(params_list)
+        pending = iter(enumerate(params_list))
+
+        async def worker():
+            for index, params in pending:
+                try:
+                    results[index] = await self.execute_tool_async(tool_name, **params)
+                except Exception as e:
+                    results[index] = e
+
+        workers = min(tool.max_concurrent_tasks, len(params_list))
+        await asyncio.gather(*(worker() for _ in range(workers)))
         return self._process_async_results(results)
 
     def _process_async_results(self, results: List[Any]) -> List[Any]:
@@ -62,4 +136,25 @@ class EasyAgent:
         return success
 
     def __str__(self):
-        return f"Agent(name={self.name}, tools={list(self.tools.keys())})"
\ No newline at end of file
+        return f"Agent(name={self.name}, tools={[*self.tools, *self._tool_factories]})"
+
+
+def _freeze(value: Any) -> Hashable:
+    """把参数转换为可哈希的规范形式：列表/元组转元组，字典按键排序，集合转 frozenset"""
+    if isinstance(value, (list, tuple)):
+        frozen = tuple(value)
+        try:
+            hash(frozen)  # 元素都可哈希时（如 PMID 列表）直接使用，避免逐项递归
+            return frozen
+        except TypeError:
+            return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return ("__dict__",) + tuple(sorted(((key, _freeze(item)) for key, item in value.items()), key=lambda pair: str(pair[0])))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        # 无法规范化的对象按身份区分，只与传入同一对象的调用合并；在途期间对象被任务引用，id 不会复用
+        return ("__id__", id(value))
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.logger import logger
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class JobStore:
+    """
+    批量任务的 SQLite 检查点存储
+    - 每处理完一块就写入该块的结果，进程重启后从未完成的块继续
+    - 任务通过租约（owner + lease_until）归属于某个进程，多个 uvicorn worker 共享同一文件时不会重复处理
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                processed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                pmids BLOB NOT NULL,
+                error TEXT,
+                owner TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                results BLOB NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+        """)
+
+    def create(self, pmids: List[str], chunk_size: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, total, chunk_size, pmids, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_PENDING, len(pmids), chunk_size, _encode(pmids), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务状态（不含 PMID 列表），不存在返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, total, chunk_size, processed, failed, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "status", "total", "chunk_size", "processed", "failed", "error", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def get_pmids(self, job_id: str) -> List[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT pmids FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decode(row[0]) if row else []
+
+    def claim(self, owner: str, lease: float) -> Optional[str]:
+        """领取一个待处理或租约已过期的任务"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND lease_until < ? ORDER BY created_at LIMIT 1",
+                    (JOB_PENDING, JOB_RUNNING, now),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                        (JOB_RUNNING, owner, now + lease, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[0] if row else None
+
+    def renew(self, owner: str, lease: float):
+        """续租本进程持有的全部任务"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+                (time.time() + lease, owner, JOB_RUNNING),
+            )
+
+    def done_chunks(self, job_id: str) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT seq FROM job_chunks WHERE job_id = ?", (job_id,))}
+
+    def save_chunk(self, job_id: str, owner: str, seq: int, results: List[Dict], failed: int) -> bool:
+        """
+        写入一块结果并更新进度
+        :return: 任务已被取消或被其他进程接管时返回 False，调用方应停止处理
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = self._conn.execute(
+                    "UPDATE jobs SET processed = processed + ?, failed = failed + ?, updated_at = ? "
+                    "WHERE id = ? AND owner = ? AND status = ?",
+                    (len(results), failed, time.time(), job_id, owner, JOB_RUNNING),
+                ).rowcount
+                if updated:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO job_chunks (job_id, seq, results) VALUES (?, ?, ?)",
+                        (job_id, seq, _encode(results)),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return bool(updated)
+
+    def finish(self, job_id: str, owner: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, lease_until = 0, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (status, error, time.time(), job_id, owner, JOB_RUNNING),
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            return bool(self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = 0, updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (JOB_CANCELLED, time.time(), job_id, JOB_PENDING, JOB_RUNNING),
+            ).rowcount)
+
+    def resume(self, job_id: str) -> bool:
+        """将失败或取消的任务重新放回队列，已完成的块不会重复处理"""
+        with self._lock:
+            return bool(self._conn.execute(
+                "UPDATE jobs SET status = ?, error = NULL, owner = NULL, lease_until = 0, updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (JOB_PENDING, time.time(), job_id, JOB_FAILED, JOB_CANCELLED),
+            ).rowcount)
+
+    def get_chunks(self, job_id: str, first: int, last: int) -> Dict[int, List[Dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, results FROM job_chunks WHERE job_id = ? AND seq BETWEEN ? AND ?",
+                (job_id, first, last),
+            ).fetchall()
+        return {seq: _decode(blob) for seq, blob in rows}
+
+    def purge(self, older_than: float) -> int:
+        """删除结束时间早于 older_than 的任务及其结果"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATES))}) AND updated_at < ?",
+                (*FINISHED_STATES, older_than),
+            )]
+            for job_id in ids:
+                self._conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BulkJobManager:
+    """
+    大批量 PMID 详情获取任务
+    - 提交后立即返回任务 ID，由后台协程按块调用 PubMedAssistant.batch_get_details，
+      以 bulk 优先级与普通请求共享同一个工具执行引擎和 NCBI 限流器，只使用交互请求剩余的容量
+    - 每块完成后写入检查点；服务重启或 worker 退出后，租约过期的任务会被重新领取并从断点继续
+    """
+
+    def __init__(self, agent, config=None):
+        options = (config.get("bulk_jobs") if config else None) or {}
+        self.agent = agent
+        self.store = JobStore(options.get("path", "./cache/jobs.db"))
+        self.chunk_size = options.get("chunk_size", 500)
+        self.max_pmids = options.get("max_pmids", 100000)
+        self.max_running_jobs = options.get("max_running_jobs", 2)
+        self.lease = options.get("lease", 60)
+        self.poll_interval = options.get("poll_interval", 2.0)
+        self.max_chunk_retries = options.get("max_chunk_retries", 5)
+        self.retry_delay = options.get("retry_delay", 5.0)
+        self.retention = options.get("retention", 7 * 24 * 3600)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动调度协程（需在事件循环中调用），同时清理过期的历史任务"""
+        if self._scheduler_task is not None and not self._scheduler_task.done():
+            return
+        purged = self.store.purge(time.time() - self.retention)
+        if purged:
+            logger.info(f"清理 {purged} 个过期的批量任务")
+        self._wakeup = asyncio.Event()
+        self._scheduler_task = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        """停止调度；未完成的任务保留检查点，租约过期后由重启后的进程继续"""
+        tasks = [task for task in (self._scheduler_task, *self._running.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduler_task = None
+
+    def submit(self, pmids: List[str], chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """提交任务，PMID 去重后保持原顺序"""
+        pmids = list(dict.fromkeys(str(pmid).strip() for pmid in pmids if str(pmid).strip()))
+        if not pmids:
+            raise ValueError("PMID 列表为空")
+        if len(pmids) > self.max_pmids:
+            raise ValueError(f"单个任务最多 {self.max_pmids} 个 PMID，实际 {len(pmids)} 个")
+        job_id = self.store.create(pmids, chunk_size or self.chunk_size)
+        logger.info(f"提交批量任务 {job_id}: {len(pmids)} 个 PMID")
+        self.start()
+        self._wakeup.set()
+        return self.store.get(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        return self.store.cancel(job_id)
+
+    def resume(self, job_id: str) -> bool:
+        resumed = self.store.resume(job_id)
+        if resumed:
+            self.start()
+            self._wakeup.set()
+        return resumed
+
+    async def _schedule(self):
+        """续租本进程的任务，并在有空闲名额时领取新任务"""
+        while True:
+            try:
+                if self._running:
+                    self.store.renew(self.owner, self.lease)
+                while len(self._running) < self.max_running_jobs:
+                    job_id = self.store.claim(self.owner, self.lease)
+                    if job_id is None:
+                        break
+                    task = asyncio.create_task(self._run_job(job_id))
+                    self._running[job_id] = task
+                    task.add_done_callback(lambda _, job_id=job_id: self._running.pop(job_id, None))
+            except Exception as e:
+                logger.error(f"批量任务调度失败: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _run_job(self, job_id: str):
+        job = self.store.get(job_id)
+        pmids = self.store.get_pmids(job_id)
+        chunk_size = job["chunk_size"]
+        chunks = (len(pmids) + chunk_size - 1) // chunk_size
+        done = self.store.done_chunks(job_id)
+        if done:
+            logger.info(f"从检查点恢复批量任务 {job_id}: 已完成 {len(done)}/{chunks} 块")
+        try:
+            for seq in range(chunks):
+                if seq in done:
+                    continue
+                results = await self._fetch_chunk(pmids[seq * chunk_size:(seq + 1) * chunk_size])
+                failed = sum(1 for result in results if "error" in result)
+                if not self.store.save_chunk(job_id, self.owner, seq, results, failed):
+                    logger.info(f"批量任务 {job_id} 已取消或被其他进程接管，停止处理")
+                    return
+            self.store.finish(job_id, self.owner, JOB_COMPLETED)
+            logger.info(f"批量任务 {job_id} 完成: {len(pmids)} 个 PMID")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"批量任务 {job_id} 失败: {str(e)}")
+            self.store.finish(job_id, self.owner, JOB_FAILED, str(e))
+        finally:
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _fetch_chunk(self, pmids: List[str]) -> List[Dict]:
+        """
+        获取一块详情；整块都失败时视为上游故障，退避后重试而不是把整块记为失败
+        """
+        for attempt in range(self.max_chunk_retries):
+            results = await self.agent.batch_get_details(pmids, priority="bulk")
+            if not all("error" in result for result in results):
+                return results
+            if attempt + 1 < self.max_chunk_retries:
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning(f"整块 {len(pmids)} 个 PMID 获取失败: {results[0]['error']}，{delay:.0f} 秒后重试")
+                await asyncio.sleep(delay)
+        raise RuntimeError(f"连续 {self.max_chunk_retries} 次整块获取失败: {results[0]['error']}")
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 500) -> Optional[Dict[str, Any]]:
+        """
+        按输入顺序分页读取结果；任务仍在运行时只返回已完成的连续部分
+        :return: {'job', 'results', 'next_offset'}，next_offset 为 None 表示已读完
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        chunk_size = job["chunk_size"]
+        offset = max(0, offset)
+        end = min(job["total"], offset + limit)
+        results: List[Dict] = []
+        if offset < end:
+            first, last = offset // chunk_size, (end - 1) // chunk_size
+            chunks = self.store.get_chunks(job_id, first, last)
+            for seq in range(first, last + 1):
+                if seq not in chunks:
+                    break
+                results.extend(chunks[seq])
+            results = results[offset - first * chunk_size:][:end - offset]
+        next_offset = offset + len(results)
+        return {
+            "job": job,
+            "results": results,
+            "next_offset": next_offset if next_offset < job["total"] else None,
+        }
+
+    async def iter_results(self, job_id: str) -> AsyncIterator[Dict]:
+        """按输入顺序流式产出结果，任务运行中时等待新的块完成"""
+        offset = 0
+        while True:
+            page = self.get_results(job_id, offset, limit=self.chunk_size)
+            if page is None:
+                return
+            for result in page["results"]:
+                yield result
+            offset += len(page["results"])
+            if page["next_offset"] is None:
+                return
+            if not page["results"]:
+                if page["job"]["status"] in FINISHED_STATES:
+                    return
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,124 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Set
+from src.logger import logger
+from src.metrics import PREFETCH_ARTICLES
+from src.tools.priority import INTERACTIVE, NORMAL, priority_scope
+
+
+class ArticlePrefetcher:
+    """
+    搜索结果下一页的文章详情预取
+    - 搜索返回一页后，以 bulk 优先级把紧随其后的 size 个 PMID 的详情写入文章缓存
+    - 只使用空闲配额：前台（interactive / normal）调用在 NCBI 限流器或工具执行引擎上排队时不启动预取，
+      已启动的预取立即取消，让出名额
+    - 记录预取过的 PMID，之后被请求时计为已使用，used / prefetched 即预取的命中率
+    """
+
+    def __init__(self, agent, config=None):
+        options = (config.get("prefetch") if config else None) or {}
+        self.agent = agent
+        self.enabled = options.get("enabled", False)
+        self.size = options.get("size", 20)
+        self.max_tasks = options.get("max_tasks", 2)
+        self.max_tracked = options.get("max_tracked", 10000)
+        self.check_interval = options.get("check_interval", 0.2)
+        self._tasks: Set[asyncio.Task] = set()
+        # 已预取、尚未被请求的 PMID，超出 max_tracked 时淘汰最早的
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self.counters = {"scheduled": 0, "skipped": 0, "cancelled": 0, "failed": 0, "prefetched": 0, "used": 0}
+
+    def schedule(self, pmids: List[str]):
+        """在后台预取这些 PMID 的详情，忙碌或并发预取数已满时跳过"""
+        if not self.enabled or not pmids:
+            return
+        if len(self._tasks) >= self.max_tasks or self._under_load():
+            self.counters["skipped"] += 1
+            return
+        self.counters["scheduled"] += 1
+        with priority_scope("bulk"):
+            task = asyncio.create_task(self._run(list(pmids)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def record_requests(self, pmids: Iterable[Any]):
+        """前台请求详情时调用，统计其中有多少来自预取"""
+        if not self._pending:
+            return
+        used = 0
+        for pmid in pmids:
+            pmid = str(pmid).strip()
+            if pmid in self._pending:
+                del self._pending[pmid]
+                used += 1
+        if used:
+            self.counters["used"] += used
+            PREFETCH_ARTICLES.labels("used").inc(used)
+
+    def _under_load(self) -> bool:
+        """已创建的工具中是否有前台调用在排队"""
+        for tool in self.agent.tools.values():
+            queues = [tool.engine.waiting_by_class()]
+            if tool.rate_limiter is not None:
+                queues.append(tool.rate_limiter.waiting_by_class())
+            if any(queue.get(INTERACTIVE) or queue.get(NORMAL) for queue in queues):
+                return True
+        return False
+
+    async def _run(self, pmids: List[str]):
+        """执行预取，期间定期检查负载，前台开始排队时取消"""
+        work = asyncio.ensure_future(self._prefetch(pmids))
+        try:
+            while not work.done():
+                if self._under_load():
+                    work.cancel()
+                    self.counters["cancelled"] += 1
+                    logger.debug(f"前台请求排队，取消 {len(pmids)} 篇文章的预取")
+                    return
+                await asyncio.wait({work}, timeout=self.check_interval)
+            work.result()
+        except asyncio.CancelledError:
+            work.cancel()
+            raise
+        except Exception as e:
+            self.counters["failed"] += 1
+            logger.warning(f"预取文章详情失败: {str(e)}")
+
+    async def _prefetch(self, pmids: List[str]):
+        """
+        只请求缓存中没有的 PMID
+        直接调用工具而不经过单飞合并：合并任务受 shield 保护，取消预取时无法中断其上游请求
+        """
+        tool = self.agent.get_tool("PubMedGetArticleTool")
+        if tool.cache is None:
+            return
+        cached = tool.cache.existing(pmids)
+        missing = [pmid for pmid in pmids if pmid not in cached]
+        if not missing:
+            return
+        results = await tool.async_execute(pmids=missing)
+        fetched = [result["pmid"] for result in results if "error" not in result]
+        for pmid in fetched:
+            self._pending[pmid] = None
+            self._pending.move_to_end(pmid)
+        while len(self._pending) > self.max_tracked:
+            self._pending.popitem(last=False)
+        self.counters["prefetched"] += len(fetched)
+        PREFETCH_ARTICLES.labels("prefetched").inc(len(fetched))
+
+    async def stop(self):
+        """取消所有进行中的预取"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        prefetched = self.counters["prefetched"]
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "running": len(self._tasks),
+            **self.counters,
+            "used_rate": self.counters["used"] / prefetched if prefetched else 0.0,
+        }
@@ -1,9 +1,22 @@
+import asyncio
+import base64
+import json
+import time
+from collections import OrderedDict
 from src.config import Config
-from src.tools.pubmed_search import PubMedSearchTool
-from src.tools.pubmed_get_article import PubMedGetArticleTool
-from src.tools.translate import TranslateTool
 from src.agents import EasyAgent
-from typing import Any, List, Dict
+from src.agents.prefetch import ArticlePrefetcher
+from src.agents.rerank import SearchReranker
+from typing import Any, AsyncIterator, List, Dict, Optional
+
+# 多检索式合并时单个检索式最多取回的 PMID 数量（ESearch retmax 上限）
+MAX_MULTI_SEARCH_RESULTS = 10000
+MAX_MULTI_SEARCH_QUERIES = 20
+SET_OPERATIONS = {
+    "union": lambda sets: set().union(*sets),
+    "intersection": lambda sets: set.intersection(*sets),
+    "difference": lambda sets: sets[0].difference(*sets[1:]),
+}
  
 
 class PubMedAssistant(EasyAgent):
@@ -15,40 +28,363 @@ class PubMedAssistant(EasyAgent):
         """
         super().__init__(name, config)
         self._register_pubmed_tools()
-        self.cached_search_results= {}
+        # 检索式 -> ESearch history（WebEnv/query_key），同一检索式的后续分页不再重新检索
+        self._search_sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_search_sessions = (config.get("search_history.max_sessions") if config else None) or 1000
+        self.search_session_ttl = (config.get("search_history.ttl") if config else None) or 3600
+        self.stream_chunk_size = (config.get("stream_chunk_size") if config else None) or 20
+        # 可选：搜索后在后台预取下一页的文章详情
+        self.prefetcher = ArticlePrefetcher(self, config)
+        # 可选：按缓存中的标题和摘要对检索结果做本地 BM25 重排
+        self.reranker = SearchReranker(self, config)
 
     def _register_pubmed_tools(self):
-        """统一注册工具"""
-        tools = [
-            PubMedSearchTool(name="PubMedSearchTool", config=self.config),
-            PubMedGetArticleTool(name="PubMedGetArticleTool", config=self.config),
-            TranslateTool(name="TranslateTool", config=self.config)
-        ]
-        for tool in tools:
-            self.register_tool(tool)
+        """统一注册工具：只登记工厂函数，工具模块在首次使用时才导入，工具也在那时才创建"""
+        self.register_tool_factory("PubMedSearchTool", self._create_search_tool)
+        self.register_tool_factory("PubMedGetArticleTool", self._create_get_article_tool)
+        self.register_tool_factory("TranslateTool", self._create_translate_tool)
+        self.register_tool_factory("PdfDownloadTool", self._create_pdf_download_tool)
+        self.register_tool_factory("PdfExtractTool", self._create_pdf_extract_tool)
+
+    def _create_search_tool(self):
+        from src.tools.pubmed_search import PubMedSearchTool
+        return PubMedSearchTool(name="PubMedSearchTool", config=self.config)
+
+    def _create_get_article_tool(self):
+        from src.tools.pubmed_get_article import PubMedGetArticleTool
+        tool = PubMedGetArticleTool(name="PubMedGetArticleTool", config=self.config)
+        if self.reranker.enabled:
+            tool.listeners.append(self.reranker.on_articles_cached)
+        return tool
+
+    def _create_translate_tool(self):
+        from src.tools.translate import TranslateTool
+        return TranslateTool(name="TranslateTool", config=self.config)
+
+    def _create_pdf_download_tool(self):
+        from src.tools.pdf_download import PdfDownloadTool
+        return PdfDownloadTool(name="PdfDownloadTool", config=self.config)
+
+    def _create_pdf_extract_tool(self):
+        from src.tools.pdf_extract import PdfExtractTool
+        return PdfExtractTool(name="PdfExtractTool", config=self.config)
 
     async def search_pubmed(self, **params) -> List[str]:
-        """搜索入口"""
+        """搜索入口，只请求 offset 起的 topk 个 PMID；rerank=True 时按本地相关度重排"""
+        page = await self.search_pubmed_page(
+            query=params.get('query'),
+            offset=params.get('offset', 0),
+            limit=params.get('topk', 10),
+            rerank=params.get('rerank', False),
+            rerank_candidates=params.get('rerank_candidates')
+        )
+        return page["pmids"]
+
+    async def search_pubmed_page(self, query: Optional[str] = None, offset: int = 0,
+                                 limit: Optional[int] = None, cursor: Optional[str] = None,
+                                 priority: str = "interactive", rerank: bool = False,
+                                 rerank_candidates: Optional[int] = None) -> Dict[str, Any]:
+        """
+        分页搜索，基于 ESearch history server
+        :param query: 检索式
+        :param offset: 起始偏移
+        :param limit: 每页数量，默认 10
+        :param cursor: 上一页返回的 next_cursor，传入时忽略 query、offset 和 rerank 参数
+        :param priority: 调度优先级
+        :param rerank: 取 ESearch 前 rerank_candidates 个结果按标题和摘要的 BM25 得分重排后分页，
+                       只能翻到候选范围内
+        :return: {'pmids', 'count', 'offset', 'limit', 'next_cursor'}
+        """
+        history = None
+        if cursor:
+            state = _decode_cursor(cursor)
+            query, offset = state["query"], state["offset"]
+            limit = limit or state["limit"]
+            history = {"webenv": state["webenv"], "query_key": state["query_key"], "count": state["count"]}
+            rerank, rerank_candidates = bool(state.get("rerank")), state.get("rerank")
+        else:
+            history = self._get_search_session(query)
+        limit = limit or 10
+        if rerank:
+            return await self._search_reranked_page(query, offset, limit, rerank_candidates, history, priority)
+        # 启用预取时同一次检索多取 size 个 PMID，省去为下一页单独检索
+        prefetch_size = self.prefetcher.size if self.prefetcher.enabled else 0
+
         try:
-            results = await self.execute_tool_async(
+            page = await self.execute_tool_async(
                 "PubMedSearchTool",
-                query=params.get('query'),
-                max_results=self.config.get("max_search_results")
+                query=query,
+                offset=offset,
+                limit=limit + prefetch_size,
+                history=history,
+                priority=priority
             )
-            self.cached_search_results = results
-            self.logger.info(f"找到 {len(results)} 篇文献 (模式: {'异步'})")
-            return results[:params.get('topk', 10)]
         except Exception as e:
             self.logger.error(f"文献搜索失败: {str(e)}")
             raise
 
-    async def batch_get_details(self, pmids: List[str]) -> List[Dict]:
-        """批量获取详情"""
-        params_list = [{"pmid": pmid} for pmid in pmids]
-        return await self.async_execute_tools("PubMedGetArticleTool", params_list)
+        self._save_search_session(query, page)
+        if prefetch_size:
+            self.prefetcher.schedule(page["pmids"][limit:])
+            page = {**page, "pmids": page["pmids"][:limit]}
+        self.logger.debug(f"找到 {page['count']} 篇文献，返回 {offset} 起的 {len(page['pmids'])} 篇")
+        next_offset = offset + len(page["pmids"])
+        next_cursor = None
+        if page["pmids"] and next_offset < page["count"]:
+            next_cursor = _encode_cursor({
+                "query": query,
+                "offset": next_offset,
+                "limit": limit,
+                "count": page["count"],
+                "webenv": page.get("webenv"),
+                "query_key": page.get("query_key"),
+            })
+        return {
+            "pmids": page["pmids"],
+            "count": page["count"],
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }
+
+    async def _search_reranked_page(self, query: Optional[str], offset: int, limit: int,
+                                    candidates: Optional[int], history: Optional[Dict],
+                                    priority: str) -> Dict[str, Any]:
+        """取前 candidates 个检索结果重排后分页，同一检索式的排序结果在 rerank.ranking_ttl 内复用"""
+        if not self.reranker.enabled:
+            raise ValueError("未启用检索结果重排（rerank.enabled）")
+        candidates = self.reranker.candidate_count(candidates)
+        ranked = self.reranker.cached_ranking(query, candidates)
+        if ranked is None:
+            try:
+                page = await self.execute_tool_async(
+                    "PubMedSearchTool",
+                    query=query,
+                    offset=0,
+                    limit=candidates,
+                    history=history,
+                    priority=priority
+                )
+            except Exception as e:
+                self.logger.error(f"文献搜索失败: {str(e)}")
+                raise
+            self._save_search_session(query, page)
+            ranked = await self.reranker.rerank(query, page, candidates)
+
+        pmids = ranked["pmids"][offset:offset + limit]
+        next_offset = offset + len(pmids)
+        next_cursor = None
+        if pmids and next_offset < len(ranked["pmids"]):
+            session = self._get_search_session(query) or {}
+            next_cursor = _encode_cursor({
+                "query": query,
+                "offset": next_offset,
+                "limit": limit,
+                "count": ranked["count"],
+                "webenv": session.get("webenv"),
+                "query_key": session.get("query_key"),
+                "rerank": candidates,
+            })
+        return {
+            "pmids": pmids,
+            "count": ranked["count"],
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }
+
+    async def search_pubmed_multi(self, queries: List[str], operation: str = "union",
+                                  max_results: int = MAX_MULTI_SEARCH_RESULTS) -> Dict[str, Any]:
+        """
+        并发执行多个检索式，在服务端对 PMID 集合求并集/交集/差集
+        各检索式经由 PubMedSearchTool 执行，受工具的并发上限约束
+        :param queries: 检索式列表，差集为第一个检索式减去其余检索式
+        :param operation: union / intersection / difference
+        :param max_results: 每个检索式最多取回的 PMID 数量（ESearch 上限为 10000）
+        :return: {'pmids', 'count', 'operation', 'truncated', 'queries': [{'query', 'count', 'retrieved', 'truncated'}]}，
+                 命中总数超过取回数量的检索式标记 truncated，此时集合运算的结果不完整
+        """
+        if operation not in SET_OPERATIONS:
+            raise ValueError(f"不支持的集合运算: {operation}")
+        queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+        if not queries:
+            raise ValueError("检索式列表为空")
+        if len(queries) > MAX_MULTI_SEARCH_QUERIES:
+            raise ValueError(f"检索式数量超过上限 {MAX_MULTI_SEARCH_QUERIES}")
+        if max_results < 1:
+            raise ValueError("max_results 必须大于 0")
+        max_results = min(max_results, MAX_MULTI_SEARCH_RESULTS)
+
+        pages = await asyncio.gather(*(
+            self.execute_tool_async("PubMedSearchTool", query=query, offset=0, limit=max_results, priority="normal")
+            for query in queries
+        ), return_exceptions=True)
+        for query, page in zip(queries, pages):
+            if isinstance(page, ValueError):
+                raise page  # 检索式本身无效（如本地索引不支持的字段标签）
+            if isinstance(page, Exception):
+                # 任一检索失败时集合运算的结果没有意义，整体失败
+                raise RuntimeError(f"检索式 '{query}' 执行失败: {str(page)}") from page
+
+        # 以整数集合运算，比字符串列表省内存且哈希更快
+        sets = [{int(pmid) for pmid in page["pmids"]} for page in pages]
+        combined = SET_OPERATIONS[operation](sets)
+        counts = [
+            {"query": query, "count": page["count"], "retrieved": len(pmid_set), "truncated": page["count"] > len(pmid_set)}
+            for query, page, pmid_set in zip(queries, pages, sets)
+        ]
+        truncated = any(item["truncated"] for item in counts)
+        if truncated:
+            self.logger.warning(f"部分检索式命中数超过 max_results={max_results}，{operation} 结果只基于已取回的 PMID")
+        self.logger.debug(f"{len(queries)} 个检索式 {operation} 后得到 {len(combined)} 篇文献")
+        return {
+            "pmids": [str(pmid) for pmid in sorted(combined, reverse=True)],
+            "count": len(combined),
+            "operation": operation,
+            "truncated": truncated,
+            "queries": counts,
+        }
+
+    def _get_search_session(self, query: Optional[str]) -> Optional[Dict]:
+        """获取未过期的检索历史"""
+        session = self._search_sessions.get(query)
+        if not session:
+            return None
+        if time.time() - session["created_at"] > self.search_session_ttl:
+            self._search_sessions.pop(query, None)
+            return None
+        self._search_sessions.move_to_end(query)
+        return session
+
+    def _save_search_session(self, query: Optional[str], page: Dict):
+        """保存检索历史，超出上限时淘汰最久未用的"""
+        existing = self._search_sessions.get(query)
+        if not page.get("webenv") or (existing and existing["webenv"] == page["webenv"]):
+            return
+        self._search_sessions[query] = {
+            "webenv": page["webenv"],
+            "query_key": page["query_key"],
+            "count": page["count"],
+            "created_at": time.time(),
+        }
+        while len(self._search_sessions) > self.max_search_sessions:
+            self._search_sessions.popitem(last=False)
+
+    async def batch_get_details(self, pmids: List[str], priority: str = "normal",
+                                fields: Optional[List[str]] = None) -> List[Dict]:
+        """
+        批量获取详情，按块合并为多 PMID 的 EFetch 请求
+        :param priority: 调度优先级，后台批量任务使用 bulk
+        :param fields: 只返回这些字段，默认返回全部
+        :return: 与输入顺序一致的结果列表，失败的 PMID 对应 {'pmid', 'error'}
+        """
+        if not pmids:
+            return []
+        self.prefetcher.record_requests(pmids)
+        return await self.execute_tool_async("PubMedGetArticleTool", pmids=pmids, fields=fields, priority=priority)
+
+    async def iter_article_details(self, pmids: List[str], chunk_size: Optional[int] = None,
+                                   fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """
+        流式获取详情：按块获取，每块完成后立即逐篇产出
+        只预取下一块，调用方消费变慢时不会继续向上游请求，内存占用不超过两块
+        :param pmids: PMID 列表
+        :param chunk_size: 每块的 PMID 数量
+        :param fields: 只返回这些字段，默认返回全部
+        """
+        chunk_size = chunk_size or self.stream_chunk_size
+        chunks = [pmids[i:i + chunk_size] for i in range(0, len(pmids), chunk_size)]
+        if not chunks:
+            return
+        pending = asyncio.ensure_future(self.batch_get_details(chunks[0], fields=fields))
+        try:
+            for index in range(len(chunks)):
+                results = await pending
+                pending = None
+                if index + 1 < len(chunks):
+                    pending = asyncio.ensure_future(self.batch_get_details(chunks[index + 1], fields=fields))
+                for result in results:
+                    yield result
+        finally:
+            # 客户端断开时取消预取
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def get_article_details(self, pmid: int, priority: str = "interactive",
+                                  fields: Optional[List[str]] = None) -> Dict[Any, Any]:
+        """统一使用异步调用，单篇查询默认按交互请求调度；fields 指定只返回的字段"""
+        self.prefetcher.record_requests([pmid])
+        return await self.execute_tool_async("PubMedGetArticleTool", pmid=pmid, fields=fields, priority=priority)
+
+    async def translate_articles(self, articles: List[Dict], target_lang: str = "中文") -> List[Dict]:
+        """
+        批量翻译文章的 title 和 abstract，多篇文章打包到一次 LLM 请求中，已翻译过的内容直接读缓存
+        :return: 与输入顺序一致的结果列表，失败的文章包含 error
+        """
+        if not articles:
+            return []
+        return await self.execute_tool_async("TranslateTool", articles=articles, target_lang=target_lang,
+                                             priority="normal")
+
+    async def translate_article(self, article: Dict, target_lang: str = "中文") -> Dict:
+        """翻译单篇文章"""
+        results = await self.translate_articles([article], target_lang)
+        return results[0]
+
+    def stream_translate_article(self, article: Dict, target_lang: str = "中文") -> AsyncIterator[Dict[str, str]]:
+        """
+        流式翻译单篇文章，按交互请求调度；流式调用无法共享，不经过单飞合并
+        :return: 异步迭代器，依次产出 {'field', 'delta'}
+        """
+        from src.tools.priority import INTERACTIVE
+
+        return self.get_tool("TranslateTool").stream_translate_article(article, target_lang, priority=INTERACTIVE)
+
+    async def download_pdfs(self, pmids: List[str], force: bool = False) -> List[Dict]:
+        """
+        并发下载 PDF 到 pdf_download.directory
+        :param force: 已存在的文件也重新下载
+        :return: 与输入顺序一致的 [{'pmid', 'status', 'path', 'url', 'size', 'error'}]
+        """
+        if not pmids:
+            return []
+        return await self.execute_tool_async("PdfDownloadTool", pmids=pmids, force=force)
+
+    def iter_download_pdfs(self, pmids: List[str], force: bool = False) -> AsyncIterator[Dict]:
+        """并发下载 PDF，按完成顺序逐篇产出结果"""
+        return self.get_tool("PdfDownloadTool").iter_download(pmids, force=force)
+
+    def iter_extract_pdfs(self, pmids: List[str], force: bool = False) -> AsyncIterator[Dict]:
+        """
+        在进程池中提取已下载 PDF 的全文，按完成顺序逐篇产出结果
+        :param force: 文件内容未变也重新提取
+        """
+        pmids = list(dict.fromkeys(str(pmid).strip() for pmid in pmids))
+        return self.get_tool("PdfExtractTool").iter_extract([(pmid, None) for pmid in pmids], force=force)
+
+    def get_pdf_text(self, pmid: str) -> Optional[Dict]:
+        """读取已提取的全文（title / abstract / sections / references），未提取时返回 None"""
+        return self.get_tool("PdfExtractTool").get_text(pmid)
+
+
+def _encode_cursor(state: Dict) -> str:
+    """将分页状态编码为不透明的游标"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
 
-    async def get_article_details(self, pmid: int) -> Dict[Any, Any]:
-        """统一使用异步调用"""
-        return await self.execute_tool_async("PubMedGetArticleTool", pmid=pmid)
-        
-  
\ No newline at end of file
+def _decode_cursor(cursor: str) -> Dict:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return {
+            "query": state["query"],
+            "offset": int(state["offset"]),
+            "limit": int(state["limit"]),
+            "count": int(state["count"]),
+            "webenv": state.get("webenv"),
+            "query_key": state.get("query_key"),
+            # 重排分页的候选数，普通分页为 None
+            "rerank": int(state["rerank"]) if state.get("rerank") else None,
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
@@ -0,0 +1,239 @@
+import asyncio
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from src.logger import logger
+from src.metrics import RERANK_DURATION
+from src.tools.eutils import chunked
+
+# PubMed 检索式中的字段标签和布尔运算符，不参与打分
+_QUERY_SYNTAX = re.compile(r"\[[^\]]*\]|\b(?:AND|OR|NOT)\b")
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+# 从缓存补入索引时每次处理的文章数
+INDEX_CHUNK_SIZE = 200
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were with "
+    "we our these those than then which who not no can may also between into during after before".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """小写分词，去掉停用词和单字符词；连字符复合词保留为一个词"""
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    标题 + 摘要的 BM25 索引
+    - 词表和文档频率常驻内存，文章写入缓存时增量加入；超出 max_documents 时淘汰最早加入的文档并扣减其文档频率
+    - 每篇文档保存 (词 ID, 词频) 两个数组；打分时把候选文档拼成 CSR 稀疏矩阵，只取查询词所在的列，一次向量化算出全部得分
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_documents: int = 200000):
+        import numpy as np
+
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self.vocabulary: Dict[str, int] = {}
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._docs: "OrderedDict[str, Tuple[Any, Any, int]]" = OrderedDict()
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, pmid: str) -> bool:
+        return pmid in self._docs
+
+    def add_many(self, articles: Dict[str, Dict]):
+        """加入或更新文章，articles 为 {pmid: 文章记录}，缺少标题和摘要的记录忽略"""
+        import numpy as np
+
+        for pmid, article in articles.items():
+            text = f"{article.get('title') or ''} {article.get('abstract') or ''}"
+            counts = Counter(tokenize(text))
+            if not counts:
+                continue
+            self._remove(pmid)
+            ids = np.array([self._term_id(term) for term in counts], dtype=np.int32)
+            tf = np.array(list(counts.values()), dtype=np.float32)
+            self._df[ids] += 1
+            length = int(tf.sum())
+            self._docs[pmid] = (ids, tf, length)
+            self._total_length += length
+        while len(self._docs) > self.max_documents:
+            self._remove(next(iter(self._docs)))
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.vocabulary)
+            if term_id >= len(self._df):
+                import numpy as np
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=self._df.dtype)])
+        return term_id
+
+    def _remove(self, pmid: str):
+        doc = self._docs.pop(pmid, None)
+        if doc is not None:
+            self._df[doc[0]] -= 1
+            self._total_length -= doc[2]
+
+    def score(self, query: str, pmids: List[str]):
+        """
+        计算每个 PMID 对查询的 BM25 得分，不在索引中的 PMID 得分为 0
+        :return: 与 pmids 等长的 numpy 数组
+        """
+        import numpy as np
+        from scipy import sparse
+
+        scores = np.zeros(len(pmids), dtype=np.float64)
+        query_counts = Counter(term for term in tokenize(_QUERY_SYNTAX.sub(" ", query or "")) if term in self.vocabulary)
+        rows = [row for row, pmid in enumerate(pmids) if pmid in self._docs]
+        if not query_counts or not rows:
+            return scores
+
+        # 候选文档 × 词表的 CSR 矩阵直接由各文档的 (词 ID, 词频) 数组拼成，再只取查询词所在的列
+        query_ids = np.fromiter((self.vocabulary[term] for term in query_counts), dtype=np.int64, count=len(query_counts))
+        docs = [self._docs[pmids[row]] for row in rows]
+        sizes = np.fromiter((len(doc[0]) for doc in docs), dtype=np.int64, count=len(docs))
+        indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        matrix = sparse.csr_matrix(
+            (np.concatenate([doc[1] for doc in docs]), np.concatenate([doc[0] for doc in docs]), indptr),
+            shape=(len(docs), len(self.vocabulary)),
+        )[:, query_ids]
+        lengths = np.fromiter((doc[2] for doc in docs), dtype=np.float64, count=len(docs))
+
+        # BM25 词频饱和与长度归一化直接作用在非零元素上
+        average_length = self._total_length / len(self._docs)
+        norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        matrix_rows = np.repeat(np.arange(len(docs)), np.diff(matrix.indptr))
+        matrix.data = matrix.data * (self.k1 + 1) / (matrix.data + norm[matrix_rows])
+
+        df = self._df[query_ids].astype(np.float64)
+        idf = np.log1p((len(self._docs) - df + 0.5) / (df + 0.5))
+        weights = idf * np.fromiter(query_counts.values(), dtype=np.float64, count=len(query_counts))
+        scores[rows] = matrix @ weights
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._docs),
+            "vocabulary": len(self.vocabulary),
+            "average_length": self._total_length / len(self._docs) if self._docs else 0.0,
+        }
+
+
+class SearchReranker:
+    """
+    检索结果的本地相关度重排
+    - 取 ESearch 前 candidates 个 PMID，用缓存中的标题和摘要按 BM25 打分后稳定排序，得分相同时保留 ESearch 顺序
+    - 索引随文章写入缓存增量更新；候选中尚未索引的文章先从文章缓存补入，仍缺少的默认得分为 0
+    - fetch_missing 开启时，最多 max_fetch 篇缺少的文章经助手以 bulk 优先级批量获取（与相同的在途获取合并），不占用交互请求的名额
+    - 同一检索式的排序结果保留在内存中，翻页时不再重新打分
+    """
+
+    def __init__(self, agent, config=None):
+        options = (config.get("rerank") if config else None) or {}
+        self.agent = agent
+        self.enabled = options.get("enabled", True)
+        self.candidates = options.get("candidates", 500)
+        self.max_candidates = options.get("max_candidates", 5000)
+        self.fetch_missing = options.get("fetch_missing", False)
+        self.max_fetch = options.get("max_fetch", 200)
+        self.max_rankings = options.get("max_rankings", 100)
+        self.ranking_ttl = options.get("ranking_ttl", 3600)
+        self._options = options
+        self._index: Optional[BM25Index] = None
+        # (检索式, 候选数) -> (排序时间, {'pmids', 'count'})
+        self._rankings: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.counters = {"reranks": 0, "ranking_hits": 0, "fetched": 0}
+        self.last_duration = 0.0
+
+    @property
+    def index(self) -> BM25Index:
+        """首次使用时才创建索引并导入 numpy"""
+        if self._index is None:
+            self._index = BM25Index(
+                k1=self._options.get("k1", 1.2),
+                b=self._options.get("b", 0.75),
+                max_documents=self._options.get("max_documents", 200000),
+            )
+        return self._index
+
+    def on_articles_cached(self, articles: Dict[str, Dict]):
+        """文章写入缓存时调用；索引尚未创建时不处理，首次重排时再从缓存补入"""
+        if self._index is not None:
+            self._index.add_many(articles)
+
+    def candidate_count(self, candidates: Optional[int] = None) -> int:
+        return max(1, min(candidates or self.candidates, self.max_candidates))
+
+    def cached_ranking(self, query: str, candidates: int) -> Optional[Dict[str, Any]]:
+        """未过期的排序结果 {'pmids', 'count'}"""
+        entry = self._rankings.get((query, candidates))
+        if entry is None or time.time() - entry[0] > self.ranking_ttl:
+            return None
+        self._rankings.move_to_end((query, candidates))
+        self.counters["ranking_hits"] += 1
+        return entry[1]
+
+    async def rerank(self, query: str, page: Dict[str, Any], candidates: int) -> Dict[str, Any]:
+        """
+        按 BM25 得分重排检索结果的候选 PMID 并记住结果
+        :param page: 检索结果 {'pmids', 'count'}
+        :return: {'pmids': 重排后的候选, 'count': 检索命中总数}
+        """
+        import numpy as np
+
+        pmids = page["pmids"]
+        await self._ensure_indexed(pmids)
+        started = time.perf_counter()
+        scores = self.index.score(query, pmids)
+        ranked = {"pmids": [pmids[i] for i in np.argsort(-scores, kind="stable")], "count": page["count"]}
+        self.last_duration = time.perf_counter() - started
+        RERANK_DURATION.labels().observe(self.last_duration)
+        self.counters["reranks"] += 1
+        logger.debug(f"重排 {len(pmids)} 篇候选文献，用时 {self.last_duration * 1000:.1f}ms")
+
+        self._rankings[(query, candidates)] = (time.time(), ranked)
+        self._rankings.move_to_end((query, candidates))
+        while len(self._rankings) > self.max_rankings:
+            self._rankings.popitem(last=False)
+        return ranked
+
+    async def _ensure_indexed(self, pmids: List[str]):
+        """把尚未索引的候选从文章缓存补入索引，仍缺少的按需获取前 max_fetch 篇（获取结果经缓存写入回调进入索引）"""
+        index = self.index
+        missing = [pmid for pmid in pmids if pmid not in index]
+        if not missing:
+            return
+        tool = self.agent.get_tool("PubMedGetArticleTool")
+        if tool.cache is not None:
+            cached = tool.cache.get_many(missing)
+            # 分词在事件循环中执行，分块补入并在块之间让出，避免大批候选长时间阻塞其他请求
+            for chunk in chunked(list(cached.items()), INDEX_CHUNK_SIZE):
+                index.add_many({pmid: entry.value for pmid, entry in chunk})
+                await asyncio.sleep(0)
+            missing = [pmid for pmid in missing if pmid not in cached]
+        if missing and self.fetch_missing and self.max_fetch > 0:
+            results = await self.agent.execute_tool_async(
+                "PubMedGetArticleTool", pmids=missing[:self.max_fetch], fields=["title", "abstract"], priority="bulk"
+            )
+            fetched = {result["pmid"]: result for result in results if "error" not in result}
+            # 未启用缓存时不会触发写入回调，直接加入索引
+            index.add_many({pmid: article for pmid, article in fetched.items() if pmid not in index})
+            self.counters["fetched"] += len(fetched)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "candidates": self.candidates,
+            **(self._index.stats() if self._index is not None else {"documents": 0, "vocabulary": 0}),
+            **self.counters,
+            "rankings": len(self._rankings),
+            "last_duration_ms": self.last_duration * 1000,
+        }
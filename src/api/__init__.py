@@ -1,11 +1,17 @@
 from src.api.routes.search_service import router as search_router
 from src.api.routes.translate_service import router as translate_router
 from src.api.routes.health_service import router as health_router
-from src.api.models import SearchQuery, Article
+from src.api.routes.metrics_service import router as metrics_router
+from src.api.routes.job_service import router as job_router
+from src.api.routes.pdf_service import router as pdf_router
+from src.api.models import SearchQuery, SearchResult, MultiSearchQuery, MultiSearchResult, Article, BulkJobRequest, BulkJobStatus, BulkJobResults, PdfDownloadRequest, PdfDownloadResult, PdfExtractRequest, PdfExtractResult, PdfFullText, convert_to_article
 from fastapi import APIRouter
 
 
 api_routers = APIRouter()
 api_routers.include_router(search_router, prefix="/search", tags=["PubMed Search"])
+api_routers.include_router(job_router, prefix="/jobs", tags=["PubMed Bulk Jobs"])
+api_routers.include_router(pdf_router, prefix="/pdf", tags=["PDF Download"])
 api_routers.include_router(translate_router, prefix="/translate", tags=["DeepSeek Translation"])
-api_routers.include_router(health_router, prefix="/health", tags=["Server Status"])
\ No newline at end of file
+api_routers.include_router(health_router, prefix="/health", tags=["Server Status"])
+api_routers.include_router(metrics_router, prefix="/metrics", tags=["Server Status"])
\ No newline at end of file
@@ -1,8 +1,15 @@
 from functools import lru_cache
 from src.config import Config
 from src.agents.pubmed_assistant import PubMedAssistant
+from src.agents.bulk_jobs import BulkJobManager
 
 @lru_cache()
 def get_pubmed_assistant():
-    config = Config(config_file="./config.yaml")
-    return PubMedAssistant(name="PubMedAssistant", config=config) 
\ No newline at end of file
+    config = Config()
+    return PubMedAssistant(name="PubMedAssistant", config=config)
+
+
+@lru_cache()
+def get_bulk_job_manager():
+    agent = get_pubmed_assistant()
+    return BulkJobManager(agent, config=agent.config)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field
+from typing import Any, List, Dict, Optional
 
 class MeshTerm(BaseModel):
     descriptor_name: str
@@ -8,7 +8,8 @@ class MeshTerm(BaseModel):
     qualifier_ui: Optional[str] = None
 
 class Article(BaseModel):
-    title: str
+    """未请求的字段（fields 投影）不出现在响应中"""
+    title: str = ""
     first_author: str = ""
     last_author: str = ""
     authors: List[str] = []
@@ -19,10 +20,123 @@ class Article(BaseModel):
     journal: str = ""
     pmid: str = ""
 
+def convert_to_article(result: Dict[str, Any]) -> Article:
+    """统一转换结果到Article模型，只设置结果中存在的字段，配合 exclude_unset 实现字段投影"""
+    values = {}
+    if 'mesh_terms' in result:
+        mesh_terms = {}
+        for mesh_id, term in (result['mesh_terms'] or {}).items():
+            if isinstance(term, dict):  # 添加类型检查
+                mesh_terms[mesh_id] = MeshTerm(
+                    descriptor_name=term.get('descriptor_name', ''),
+                    major_topic=term.get('major_topic', False),
+                    qualifier_name=term.get('qualifier_name'),
+                    qualifier_ui=term.get('qualifier_ui')
+                )
+        values['mesh_terms'] = mesh_terms
+    for key in ('title', 'first_author', 'last_author', 'abstract', 'journal'):
+        if key in result:
+            values[key] = result[key] or ''
+    for key in ('authors', 'keywords'):
+        if key in result:
+            values[key] = result[key] or []
+    if 'year' in result:
+        values['year'] = str(result['year'] or '')  # 确保字符串类型
+    values['pmid'] = str(result.get('pmid', ''))
+    return Article(**values)
+
 class SearchQuery(BaseModel):
     query: Optional[str] = None
     journal: Optional[str] = None
     author: Optional[str] = None
     year: Optional[str] = None
     keyword: Optional[str] = None
-    topk: int = 10
\ No newline at end of file
+    topk: int = 10
+    offset: int = 0
+    limit: Optional[int] = None  # 每页数量，未设置时使用 topk
+    cursor: Optional[str] = None  # 上一页返回的 next_cursor
+    rerank: bool = False  # 按缓存中的标题和摘要对前 rerank_candidates 个结果做 BM25 重排
+    rerank_candidates: Optional[int] = None  # 参与重排的候选数，默认 rerank.candidates
+
+class SearchResult(BaseModel):
+    pmids: List[str] = []
+    count: int = 0
+    offset: int = 0
+    next_cursor: Optional[str] = None
+
+class MultiSearchQuery(BaseModel):
+    queries: List[str] = Field(max_length=20)  # 每个检索式都会并发取回最多 max_results 个 PMID
+    operation: str = "union"  # union / intersection / difference（第一个检索式减去其余）
+    max_results: int = Field(10000, ge=1, le=10000)  # 每个检索式最多取回的 PMID 数量
+
+class QueryCount(BaseModel):
+    query: str
+    count: int = 0  # PubMed 报告的命中总数
+    retrieved: int = 0  # 实际取回并参与运算的 PMID 数量
+    truncated: bool = False  # 命中总数超过取回数量，集合运算只基于前 retrieved 个结果
+
+class MultiSearchResult(BaseModel):
+    pmids: List[str] = []
+    count: int = 0
+    operation: str = "union"
+    truncated: bool = False  # 任一检索式的结果被截断
+    queries: List[QueryCount] = []
+
+class BulkJobRequest(BaseModel):
+    pmids: List[str]
+    chunk_size: Optional[int] = None  # 每块 PMID 数量，默认使用 bulk_jobs.chunk_size
+
+class BulkJobStatus(BaseModel):
+    job_id: str
+    status: str  # pending / running / completed / failed / cancelled
+    total: int = 0
+    processed: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    created_at: float = 0
+    updated_at: float = 0
+
+class BulkJobResults(BaseModel):
+    job: BulkJobStatus
+    offset: int = 0
+    next_offset: Optional[int] = None  # 为空表示已读完；任务运行中时可能返回空页，稍后重试
+    articles: List[Article] = []
+    errors: List[Dict[str, str]] = []
+
+class PdfDownloadRequest(BaseModel):
+    pmids: List[str]
+    force: bool = False  # 已下载的文件也重新下载
+
+class PdfDownloadResult(BaseModel):
+    pmid: str
+    status: str  # downloaded / exists / not_found / failed
+    path: Optional[str] = None
+    url: Optional[str] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+
+class PdfExtractRequest(BaseModel):
+    pmids: List[str]
+    force: bool = False  # 文件内容未变也重新提取
+
+class PdfExtractResult(BaseModel):
+    pmid: str
+    status: str  # extracted / unchanged / missing / failed
+    pages: Optional[int] = None
+    sections: Optional[int] = None  # 正文章节数
+    references: Optional[int] = None  # 参考文献条数
+    error: Optional[str] = None
+
+class PdfSection(BaseModel):
+    heading: Optional[str] = None
+    text: str
+
+class PdfFullText(BaseModel):
+    pmid: str
+    sha256: str
+    pages: int
+    title: str = ""
+    abstract: Optional[str] = None
+    sections: List[PdfSection] = []
+    references: List[str] = []
+    extracted_at: float
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from src.api.depends import get_pubmed_assistant
+from src.agents.pubmed_assistant import PubMedAssistant
+from src.tools.resilience import circuit_breaker_stats
 
 router = APIRouter()
 # 添加健康检查端点
@@ -9,3 +12,92 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+
+@router.get("/cache")
+async def cache_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    文章缓存命中统计
+    """
+    cache = agent.get_tool("PubMedGetArticleTool").cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/rate_limit")
+async def rate_limit_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    NCBI 限流器的排队深度和等待时间
+    """
+    rate_limiter = agent.get_tool("PubMedSearchTool").rate_limiter
+    if rate_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **rate_limiter.stats()}
+
+
+@router.get("/coalescing")
+async def coalescing_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    单飞合并统计：calls 为工具调用总数，coalesced 为复用在途任务的次数
+    """
+    return {**agent.coalesce_stats, "inflight": len(agent._inflight)}
+
+
+@router.get("/prefetch")
+async def prefetch_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    下一页预取统计：prefetched 为预取写入缓存的文章数，used 为其中之后被请求的篇数
+    """
+    return agent.prefetcher.stats()
+
+
+@router.get("/rerank")
+async def rerank_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    检索结果重排统计：BM25 索引的文档数和词表大小、重排次数以及最近一次打分排序的耗时
+    """
+    return agent.reranker.stats()
+
+
+@router.get("/pdf_download")
+async def pdf_download_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    PDF 下载的按主机并发占用和浏览器会话池状态（尚未使用时不创建下载工具）
+    """
+    tool = agent.tools.get("PdfDownloadTool")
+    if tool is None:
+        return {"enabled": False}
+    return {"enabled": True, **tool.stats()}
+
+
+@router.get("/pdf_extract")
+async def pdf_extract_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    PDF 全文提取统计：各状态篇数、解析页数和页/秒吞吐（尚未使用时不创建提取工具）
+    """
+    tool = agent.tools.get("PdfExtractTool")
+    if tool is None:
+        return {"enabled": False}
+    return {"enabled": True, **tool.stats()}
+
+
+@router.get("/executors")
+async def executor_stats(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    各工具执行引擎的排队深度、在途数、排队等待与执行耗时（尚未使用的工具不列出）
+    """
+    return {name: tool.engine.stats() for name, tool in agent.tools.items()}
+
+
+@router.get("/circuit_breakers")
+async def circuit_breaker_status(agent: PubMedAssistant = Depends(get_pubmed_assistant)):
+    """
+    各上游熔断器的状态（closed / open / half_open）以及各工具当前的自适应超时
+    """
+    return {
+        "circuit_breakers": circuit_breaker_stats(),
+        "timeouts": {
+            name: {kind: timeout.stats() for kind, timeout in tool.adaptive_timeouts.items()}
+            for name, tool in agent.tools.items()
+        },
+    }
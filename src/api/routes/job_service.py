@@ -0,0 +1,108 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from src.api.depends import get_bulk_job_manager
+from src.api.models import BulkJobRequest, BulkJobStatus, BulkJobResults, convert_to_article
+from src.agents.bulk_jobs import BulkJobManager
+
+router = APIRouter()
+
+
+@router.post("/", response_model=BulkJobStatus, status_code=202)
+async def submit_job(
+    request: BulkJobRequest,
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+) -> BulkJobStatus:
+    """
+    提交批量获取文章详情的任务，立即返回任务 ID；适用于 /api/search/batch 无法在一次请求内完成的大批量 PMID
+    """
+    try:
+        return BulkJobStatus(**manager.submit(request.pmids, request.chunk_size))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{job_id}", response_model=BulkJobStatus)
+async def get_job(
+    job_id: str,
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+) -> BulkJobStatus:
+    """
+    查询任务状态和进度
+    """
+    job = manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return BulkJobStatus(**job)
+
+
+@router.get("/{job_id}/results", response_model=BulkJobResults)
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+) -> BulkJobResults:
+    """
+    按提交顺序分页读取结果；任务运行中时只返回已完成的部分
+    """
+    page = manager.get_results(job_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return BulkJobResults(
+        job=BulkJobStatus(**page["job"]),
+        offset=offset,
+        next_offset=page["next_offset"],
+        articles=[convert_to_article(result) for result in page["results"] if "error" not in result],
+        errors=[result for result in page["results"] if "error" in result],
+    )
+
+
+@router.get("/{job_id}/stream")
+async def stream_job_results(
+    job_id: str,
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+):
+    """
+    以 NDJSON 流式返回结果，任务运行中时随块完成持续输出，任务结束后关闭连接
+    """
+    if manager.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    async def ndjson_stream():
+        async for result in manager.iter_results(job_id):
+            if "error" in result:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            else:
+                yield convert_to_article(result).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/{job_id}/resume", response_model=BulkJobStatus)
+async def resume_job(
+    job_id: str,
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+) -> BulkJobStatus:
+    """
+    重新执行失败或已取消的任务，已完成的块不会重复获取
+    """
+    if not manager.resume(job_id):
+        raise HTTPException(status_code=409, detail="只有失败或已取消的任务可以恢复")
+    return BulkJobStatus(**manager.get_job(job_id))
+
+
+@router.delete("/{job_id}", response_model=BulkJobStatus)
+async def cancel_job(
+    job_id: str,
+    manager: BulkJobManager = Depends(get_bulk_job_manager)
+) -> BulkJobStatus:
+    """
+    取消任务，已完成部分的结果仍可读取
+    """
+    if not manager.cancel(job_id):
+        job = manager.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        raise HTTPException(status_code=409, detail=f"任务已结束: {job['status']}")
+    return BulkJobStatus(**manager.get_job(job_id))
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.metrics import REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 文本格式的指标（每个 worker 进程单独统计）；只读取指标注册表，抓取时不创建 PubMedAssistant
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
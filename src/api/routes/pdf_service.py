@@ -0,0 +1,83 @@
+import json
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from src.api.depends import get_pubmed_assistant
+from src.api.models import PdfDownloadRequest, PdfDownloadResult, PdfExtractRequest, PdfExtractResult, PdfFullText
+from src.agents.pubmed_assistant import PubMedAssistant
+
+router = APIRouter()
+
+# 单次请求的 PMID 上限，更多的 PMID 请分批提交或使用命令行 src/download_pdfs.py
+MAX_PDF_PMIDS = 1000
+
+
+@router.post("/download")
+async def download_pdfs(
+    request: PdfDownloadRequest,
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    并发下载多篇 PDF 到服务端目录，以 NDJSON 按完成顺序返回每篇的结果（PdfDownloadResult）
+    """
+    if not request.pmids:
+        raise HTTPException(status_code=400, detail="PMID 列表为空")
+    if len(request.pmids) > MAX_PDF_PMIDS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {MAX_PDF_PMIDS} 个 PMID")
+
+    async def ndjson_stream():
+        async for result in agent.iter_download_pdfs(request.pmids, force=request.force):
+            yield PdfDownloadResult(**result).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/extract")
+async def extract_pdfs(
+    request: PdfExtractRequest,
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    提取已下载 PDF 的全文（在进程池中解析，不阻塞事件循环），以 NDJSON 按完成顺序返回每篇的结果（PdfExtractResult）
+    """
+    if not request.pmids:
+        raise HTTPException(status_code=400, detail="PMID 列表为空")
+    if len(request.pmids) > MAX_PDF_PMIDS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {MAX_PDF_PMIDS} 个 PMID")
+
+    async def ndjson_stream():
+        async for result in agent.iter_extract_pdfs(request.pmids, force=request.force):
+            yield PdfExtractResult(**result).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/{pmid}/text", response_model=PdfFullText)
+async def get_pdf_text(
+    pmid: str,
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    返回已提取的全文：标题、摘要、正文章节和参考文献
+    """
+    record = agent.get_pdf_text(pmid)
+    if record is None:
+        raise HTTPException(status_code=404, detail="全文尚未提取")
+    return record
+
+
+@router.get("/{pmid}")
+async def get_pdf(
+    pmid: str,
+    force: bool = Query(False),
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    返回文章 PDF，尚未下载时先下载
+    """
+    results = await agent.download_pdfs([pmid], force=force)
+    result = results[0] if results else None
+    if result is None or result["path"] is None:
+        status_code = 404 if result is None or result["status"] == "not_found" else 502
+        raise HTTPException(status_code=status_code, detail=(result or {}).get("error") or "PDF 未找到")
+    return FileResponse(result["path"], media_type="application/pdf", filename=f"{result['pmid']}.pdf")
@@ -1,16 +1,19 @@
+import json
 from typing import List, Dict, Optional, Any
-from fastapi import APIRouter, Depends,  HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends,  HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from src.api.depends import get_pubmed_assistant
-from src.api.models import MeshTerm, Article, SearchQuery
+from src.api.models import Article, SearchQuery, SearchResult, MultiSearchQuery, MultiSearchResult, convert_to_article
 from src.agents.pubmed_assistant import PubMedAssistant
+from src.tools.pubmed_parser import normalize_fields
 
 router = APIRouter()
 
 # 定义API路由
-@router.get("/{pmid}", response_model=Article)
+@router.get("/{pmid}", response_model=Article, response_model_exclude_unset=True)
 async def get_article_by_pmid(
     pmid: str,
+    fields: Optional[str] = Query(None, description="只返回这些字段，逗号分隔，如 title,year"),
     agent: PubMedAssistant = Depends(get_pubmed_assistant)
 )-> Article:
     """
@@ -18,20 +21,23 @@ async def get_article_by_pmid(
     """
     try:
         # 使用搜索代理检索文章
-        result = await agent.get_article_details(pmid)
+        result = await agent.get_article_details(pmid, fields=fields)
         if not result:
             raise HTTPException(status_code=404, detail="文章未找到")
             
-        return _convert_to_article(result)
+        return convert_to_article(result)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"检索文章时发生错误: {str(e)}")
 
 
-@router.post("/batch", response_model=Dict[str, List[Article]])
+@router.post("/batch", response_model=Dict[str, List[Article]], response_model_exclude_unset=True)
 async def get_articles_by_pmids(
     pmids: List[str],
+    fields: Optional[str] = Query(None, description="只返回这些字段，逗号分隔，如 title,year"),
     agent: PubMedAssistant = Depends(get_pubmed_assistant)
 ) -> Dict[str, List[Article]]:
     """
@@ -39,59 +45,120 @@ async def get_articles_by_pmids(
     """
     try:
         # 使用批量获取方法
-        results = await agent.batch_get_details(pmids)
+        results = await agent.batch_get_details(pmids, fields=fields)
         articles = []
         for result in results:
-            if isinstance(result, Exception) or not result:
-                continue  # 已由基类处理异常
-            articles.append(_convert_to_article(result))
+            if not result or "error" in result:
+                continue  # 单篇失败不影响整批结果
+            articles.append(convert_to_article(result))
             
         return {"articles": articles}
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"批量检索文章时发生错误: {str(e)}")
  
 
-@router.post("/", response_model=Dict[str, List[str]])
+@router.post("/stream")
+async def search_articles_stream(
+    search_params: SearchQuery,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    fields: Optional[str] = Query(None, description="只返回这些字段，逗号分隔，如 title,year"),
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    搜索并流式返回文章详情，每篇文章获取后立即发送
+    - ndjson: 每行一个 Article；获取失败的 PMID 输出 {"pmid", "error"}
+    - sse: article / error 事件，最后发送 end 事件
+    """
+    try:
+        normalize_fields(fields)
+        page = await agent.search_pubmed_page(
+            query=search_params.query or "",
+            offset=search_params.offset,
+            limit=search_params.limit or search_params.topk,
+            cursor=search_params.cursor,
+            rerank=search_params.rerank,
+            rerank_candidates=search_params.rerank_candidates
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"搜索过程中发生错误: {str(e)}")
+
+    async def ndjson_stream():
+        async for result in agent.iter_article_details(page["pmids"], fields=fields):
+            if "error" in result:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            else:
+                yield convert_to_article(result).model_dump_json(exclude_unset=True) + "\n"
+
+    async def sse_stream():
+        sent = 0
+        async for result in agent.iter_article_details(page["pmids"], fields=fields):
+            if "error" in result:
+                yield f"event: error\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+            else:
+                sent += 1
+                yield f"event: article\ndata: {convert_to_article(result).model_dump_json(exclude_unset=True)}\n\n"
+        end = {"count": page["count"], "sent": sent, "next_cursor": page["next_cursor"]}
+        yield f"event: end\ndata: {json.dumps(end)}\n\n"
+
+    if format == "sse":
+        return StreamingResponse(sse_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson",
+                             headers={"X-Total-Count": str(page["count"])})
+
+
+@router.post("/multi", response_model=MultiSearchResult)
+async def search_articles_multi(
+    search_params: MultiSearchQuery,
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+) -> MultiSearchResult:
+    """
+    并发执行多个检索式，并在服务端对结果求并集、交集或差集
+    返回去重后的 PMID（按 PMID 倒序）以及每个检索式的命中数
+    """
+    try:
+        result = await agent.search_pubmed_multi(
+            queries=search_params.queries,
+            operation=search_params.operation,
+            max_results=search_params.max_results
+        )
+        return MultiSearchResult(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"多检索式搜索时发生错误: {str(e)}")
+
+
+@router.post("/", response_model=SearchResult)
 async def search_articles(
     search_params: SearchQuery,
     agent: PubMedAssistant = Depends(get_pubmed_assistant)
-)-> Dict[str, List[str]]:
+)-> SearchResult:
     """
-    执行PubMed文献搜索
+    执行PubMed文献搜索，支持 offset/limit 分页或使用 next_cursor 翻页
     """
     try:
-        # 适配新的search_pubmed参数
-        result = await agent.search_pubmed(
+        page = await agent.search_pubmed_page(
             query=search_params.query or "",
-            topk=search_params.topk
+            offset=search_params.offset,
+            limit=search_params.limit or search_params.topk,
+            cursor=search_params.cursor,
+            rerank=search_params.rerank,
+            rerank_candidates=search_params.rerank_candidates
+        )
+        return SearchResult(
+            pmids=page["pmids"],
+            count=page["count"],
+            offset=page["offset"],
+            next_cursor=page["next_cursor"]
         )
-        return {"pmids": result}
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索过程中发生错误: {str(e)}")
-
-def _convert_to_article(result: Dict) -> Article:
-    """统一转换结果到Article模型"""
-    mesh_terms = {}
-    for mesh_id, term in result.get('mesh_terms', {}).items():
-        if isinstance(term, dict):  # 添加类型检查
-            mesh_terms[mesh_id] = MeshTerm(
-                descriptor_name=term.get('descriptor_name', ''),
-                major_topic=term.get('major_topic', False),
-                qualifier_name=term.get('qualifier_name'),
-                qualifier_ui=term.get('qualifier_ui')
-            )
-    
-    return Article(
-        title=result.get('title', ''),
-        first_author=result.get('first_author', ''),
-        last_author=result.get('last_author', ''),
-        authors=result.get('authors', []),
-        abstract=result.get('abstract', ''),
-        mesh_terms=mesh_terms,
-        keywords=result.get('keywords', []),
-        year=str(result.get('year', '')),  # 确保字符串类型
-        journal=result.get('journal', ''),
-        pmid=str(result.get('pmid', ''))
-    )
@@ -1,21 +1,68 @@
+import json
 from typing import List, Dict, Optional, Any
-from fastapi import APIRouter, Depends,  HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends,  HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from src.api.depends import get_pubmed_assistant
 from src.api.models import Article
+from src.agents.pubmed_assistant import PubMedAssistant
 
 router = APIRouter()
  
 @router.post("/")
-async def translate_article(article: Article):
+async def translate_article(
+    article: Article,
+    target_lang: str = Query("中文"),
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
     """
     翻译文章内容
     """
     try:
         # 准备要翻译的文章数据
-        article_dict = article.dict()
+        article_dict = article.model_dump()
         # 调用翻译工具
-        translated = agent.translate_article(article_dict)
-        return translated
+        translated = await agent.translate_article(article_dict, target_lang)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"翻译过程中发生错误: {str(e)}")
+    if "error" in translated:
+        raise HTTPException(status_code=500, detail=translated["error"])
+    return translated
 
+
+@router.post("/stream")
+async def translate_article_stream(
+    article: Article,
+    target_lang: str = Query("中文"),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    agent: PubMedAssistant = Depends(get_pubmed_assistant)
+):
+    """
+    流式翻译文章的 title 和 abstract，LLM 生成的译文片段立即发送
+    - ndjson: 每行 {"field": "title" | "abstract", "delta": 片段}，出错时输出 {"error"}
+    - sse: delta 事件，最后发送 end 事件（完整译文）或 error 事件
+    """
+    events = agent.stream_translate_article(article.model_dump(), target_lang)
+
+    async def ndjson_stream():
+        try:
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"翻译过程中发生错误: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    async def sse_stream():
+        translated = {"pmid": article.pmid, "title": "", "abstract": "", "target_language": target_lang}
+        try:
+            async for event in events:
+                translated[event["field"]] += event["delta"]
+                yield f"event: delta\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            error = {"error": f"翻译过程中发生错误: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+            return
+        yield f"event: end\ndata: {json.dumps(translated, ensure_ascii=False)}\n\n"
+
+    if format == "sse":
+        return StreamingResponse(sse_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
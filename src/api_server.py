@@ -6,8 +6,10 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 from fastapi import FastAPI 
 from fastapi.responses import JSONResponse 
-from src.config import Config
 from src.api import api_routers
+from src.tools.eutils import close_eutils_client
+from src.tools.openai_client import close_openai_client
+from src.api.depends import get_bulk_job_manager, get_pubmed_assistant
 from fastapi.middleware.cors import CORSMiddleware
 
 # 创建FastAPI应用
@@ -31,6 +33,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 启动批量任务调度，继续处理上次退出时未完成的任务
+@app.on_event("startup")
+async def startup_event():
+    get_bulk_job_manager().start()
+
+# 停止批量任务调度和后台预取，关闭 PDF 下载会话和全文提取进程池，以及共享的 E-utilities 和 OpenAI 连接池
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_bulk_job_manager().stop()
+    await get_pubmed_assistant().prefetcher.stop()
+    pdf_tool = get_pubmed_assistant().tools.get("PdfDownloadTool")
+    if pdf_tool is not None:
+        await pdf_tool.close()
+    extract_tool = get_pubmed_assistant().tools.get("PdfExtractTool")
+    if extract_tool is not None:
+        extract_tool.close()
+    await close_eutils_client()
+    await close_openai_client()
+
 # 全局异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -39,9 +60,6 @@ async def global_exception_handler(request, exc):
         content={"message": f"发生未知错误: {str(exc)}"}
     )
 
-# 创建搜索代理实例
-config = Config(config_file="./config.yaml")
- 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -3,13 +3,19 @@ from typing import Dict, Any
 import os
 
 class Config:
-    def __init__(self, config_file="config.yaml"):
+    def __init__(self, config_file=None):
+        # 未指定时优先使用环境变量 PUBMED_AGENT_CONFIG，便于基准测试等场景切换配置
+        config_file = config_file or os.getenv("PUBMED_AGENT_CONFIG", "config.yaml")
         with open(config_file) as f:
             self.data = yaml.safe_load(f)
             
         # 新增 OpenAI 配置读取
         self.openai_config = self.data.get('openai', {})
-        self.ncbi_api_key = self.data.get('ncbi_api_key', '')
+        # 兼容 config.yaml.example 中的 NCBI_API_KEY 写法
+        self.ncbi_api_key = self.data.get('ncbi_api_key') or self.data.get('NCBI_API_KEY') or os.getenv('NCBI_API_KEY', '')
+        if self.ncbi_api_key:
+            # metapub 从环境变量读取 API key
+            os.environ.setdefault('NCBI_API_KEY', self.ncbi_api_key)
     @property
     def openai_api_key(self):
         return self.openai_config.get('api_key') or os.getenv("OPENAI_API_KEY")
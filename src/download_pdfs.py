@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+# 获取当前文件的父目录的父目录（即项目根目录）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 将项目根目录添加到系统路径
+sys.path.append(project_root)
+from src.logger import logger
+from src.config import Config
+
+
+def read_pmids(args) -> list:
+    """命令行参数和 --file 中的 PMID（每行一个）"""
+    pmids = list(args.pmids)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            pmids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return list(dict.fromkeys(pmids))
+
+
+async def async_main():
+    parser = argparse.ArgumentParser(description='Download article PDFs concurrently.')
+    parser.add_argument('pmids', nargs='*', help='PMIDs to download')
+    parser.add_argument('--file', type=str, help='File with one PMID per line')
+    parser.add_argument('--dir', type=str, default=None, help='Download directory (default: pdf_download.directory)')
+    parser.add_argument('--force', action='store_true', help='Download again even if the PDF already exists')
+    parser.add_argument('--extract', action='store_true', help='Extract full text of each PDF as soon as it is on disk')
+    parser.add_argument('--config', type=str, default=None, help='Config file (default: $PUBMED_AGENT_CONFIG or ./config.yaml)')
+    args = parser.parse_args()
+
+    pmids = read_pmids(args)
+    if not pmids:
+        parser.error("未提供 PMID")
+
+    from src.tools.pdf_download import PdfDownloadTool
+    from src.tools.pdf_extract import PdfExtractTool
+
+    config = Config(config_file=args.config)
+    tool = PdfDownloadTool(name="PdfDownloadTool", config=config)
+    extract_tool = PdfExtractTool(name="PdfExtractTool", config=config) if args.extract else None
+    extractions = []
+    started = time.monotonic()
+    counts = {}
+    try:
+        async for result in tool.iter_download(pmids, directory=args.dir, force=args.force):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            done = sum(counts.values())
+            if result["error"]:
+                logger.warning(f"[{done}/{len(pmids)}] {result['pmid']}: {result['status']} {result['error']}")
+            else:
+                logger.info(f"[{done}/{len(pmids)}] {result['pmid']}: {result['status']} {result['path']}")
+            if extract_tool is not None and result["path"]:
+                # 下载完成即开始提取，与其余下载并行
+                extractions.append(asyncio.ensure_future(extract_tool.extract(result["pmid"], result["path"])))
+        logger.info(f"下载完成 {sum(counts.values())} 篇，用时 {time.monotonic() - started:.0f} 秒: {counts}")
+        if extractions:
+            extracted = {}
+            for result in await asyncio.gather(*extractions):
+                extracted[result["status"]] = extracted.get(result["status"], 0) + 1
+                if result["error"]:
+                    logger.warning(f"{result['pmid']}: 提取失败 {result['error']}")
+            stats = extract_tool.stats()
+            logger.info(f"提取完成 {len(extractions)} 篇: {extracted}，共 {stats['pages']} 页，"
+                        f"{stats['pages_per_second']:.1f} 页/秒")
+    finally:
+        await tool.close()
+        if extract_tool is not None:
+            extract_tool.close()
+
+
+def main():
+    asyncio.run(async_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+# 获取当前文件的父目录的父目录（即项目根目录）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 将项目根目录添加到系统路径
+sys.path.append(project_root)
+from src.logger import logger
+from src.tools.pubmed_parser import iter_medline_file
+from src.tools.local_index import LocalPubMedIndex, prepare_rows
+
+
+def parse_file(path: str):
+    """在子进程中解析一个 MEDLINE 文件，返回 (文件名, 待写入行, 删除的 PMID)"""
+    rows, deletions = [], []
+    for kind, payload in iter_medline_file(path):
+        if kind == "article":
+            if payload.get("pmid"):
+                rows.append(prepare_rows(payload))
+        else:
+            deletions.extend(payload)
+    return os.path.basename(path), rows, deletions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a local PubMed index from MEDLINE baseline/update XML files.')
+    parser.add_argument('files', nargs='+', help='MEDLINE XML files or glob patterns (e.g. pubmed24n*.xml.gz)')
+    parser.add_argument('--index', type=str, default='./cache/medline.db', help='Index database path')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of parser processes')
+    parser.add_argument('--force', action='store_true', help='Re-ingest files that were already ingested')
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.files for path in (glob.glob(pattern) or [pattern])},
+                   key=os.path.basename)
+    index = LocalPubMedIndex(args.index)
+    if not args.force:
+        paths = [path for path in paths if not index.is_ingested(os.path.basename(path))]
+    if not paths:
+        logger.info("没有需要导入的文件")
+        return
+
+    # update 文件必须按文件名顺序应用：解析并行进行，写入按提交顺序串行进行，
+    # 同时最多保留 workers * 2 个已提交的文件，避免解析结果堆积在内存中
+    started = time.monotonic()
+    total_articles = total_deletions = 0
+    window = max(1, args.workers) * 2
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(parse_file, path) for path in paths[:window]]
+        next_path = len(futures)
+        for i in range(len(paths)):
+            name, rows, deletions = futures[i].result()
+            futures[i] = None
+            if next_path < len(paths):
+                futures.append(pool.submit(parse_file, paths[next_path]))
+                next_path += 1
+            index.apply_file(name, rows, deletions)
+            total_articles += len(rows)
+            total_deletions += len(deletions)
+            elapsed = time.monotonic() - started
+            logger.info(f"[{i + 1}/{len(paths)}] {name}: {len(rows)} 篇，删除 {len(deletions)} 篇，"
+                        f"累计 {total_articles / elapsed:.0f} 篇/秒")
+    index.optimize()
+    logger.info(f"导入完成: {total_articles} 篇，删除 {total_deletions} 篇，索引共 {index.stats()['articles']} 篇")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
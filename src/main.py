@@ -10,6 +10,7 @@ from src.logger import logger
 from src.config import Config
 from src.logger import logger
 from src.agents.pubmed_assistant import PubMedAssistant
+from src.tools.eutils import close_eutils_client
  
 async def async_main():
     parser = argparse.ArgumentParser(description='Search PubMed using dictionary parameters.')
@@ -19,9 +20,11 @@ async def async_main():
     parser.add_argument('--keyword', type=str, help='Keyword')
     parser.add_argument('--query', type=str, help='Traditional PubMed query string')
     parser.add_argument('--topk', type=int, default=10, help='Number of results to return')
+    parser.add_argument('--rerank', action='store_true', help='Re-rank the top candidates by BM25 over cached titles and abstracts')
+    parser.add_argument('--config', type=str, default=None, help='Config file (default: $PUBMED_AGENT_CONFIG or ./config.yaml)')
     args = parser.parse_args()
 
-    config = Config(config_file="./config.yaml")
+    config = Config(config_file=args.config)
     agent = PubMedAssistant(name="PubMedAssistant", config=config)
 
     params = {}
@@ -37,25 +40,24 @@ async def async_main():
     try:
         # 优先使用query参数，如果不存在则使用参数字典
         if args.query:
-            results = await agent.search_pubmed(query=args.query, topk=args.topk)
+            results = await agent.search_pubmed(query=args.query, topk=args.topk, rerank=args.rerank)
             logger.info(f"使用查询字符串搜索结果: {results}")
         elif params:
-            results = await agent.search_pubmed(**params, topk=args.topk)
+            results = await agent.search_pubmed(**params, topk=args.topk, rerank=args.rerank)
             logger.info(f"使用参数字典搜索结果: {results}")
         else:
             logger.warning("未提供任何搜索参数")
             return
 
         if results:
-            # 统一使用并发获取详细信息
-            tasks = [agent.get_article_details(pmid) for pmid in results]
-            details = await asyncio.gather(*tasks, return_exceptions=True)
+            # 批量 EFetch 获取详细信息，结果与输入顺序一致
+            details = await agent.batch_get_details(results)
             
             # 添加结果输出
             success_count = 0
             for pmid, detail in zip(results, details):
-                if isinstance(detail, Exception):
-                    logger.error(f"PMID {pmid} 详情获取失败: {str(detail)}")
+                if "error" in detail:
+                    logger.error(f"PMID {pmid} 详情获取失败: {detail['error']}")
                 else:
                     success_count += 1
                     logger.info(f"详细信息 PMID {pmid}: {detail}")
@@ -68,6 +70,8 @@ async def async_main():
 
     except Exception as e:
         logger.error(f"搜索过程中发生错误: {str(e)}")
+    finally:
+        await close_eutils_client()
 
 def main():
     # 修改为运行参数解析函数
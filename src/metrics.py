@@ -0,0 +1,211 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """指标基类，按标签值缓存子指标，热路径上只有一次字典查找"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format_value(child.value)}"]
+
+
+class _ValueChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, key, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, child.counts):
+            cumulative += count
+            labels = self._label_text(key, 'le="%s"' % _format_value(bound))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        cumulative += child.counts[-1]
+        labels = self._label_text(key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+# 工具调用（EasyAgent 层）
+TOOL_CALLS = REGISTRY.counter("pubmed_tool_calls_total", "Tool calls by outcome", ["tool", "status"])
+TOOL_COALESCED = REGISTRY.counter("pubmed_tool_coalesced_total", "Tool calls served by an in-flight identical call", ["tool"])
+TOOL_LATENCY = REGISTRY.histogram("pubmed_tool_call_duration_seconds", "End-to-end tool call latency", ["tool"])
+
+# 上游操作（BaseTool._execute_operation）
+OPERATION_LATENCY = REGISTRY.histogram("pubmed_operation_duration_seconds", "Latency of a single upstream attempt", ["tool"])
+OPERATION_RETRIES = REGISTRY.counter("pubmed_operation_retries_total", "Upstream attempts that were retried", ["tool"])
+OPERATION_TIMEOUTS = REGISTRY.counter("pubmed_operation_timeouts_total", "Upstream attempts that timed out", ["tool"])
+OPERATION_FAILURES = REGISTRY.counter("pubmed_operation_failures_total", "Operations that failed after all retries", ["tool"])
+OPERATION_ERRORS = REGISTRY.counter("pubmed_operation_errors_total", "Failed upstream attempts by error class", ["tool", "category"])
+OPERATION_TIMEOUT_SECONDS = REGISTRY.gauge("pubmed_operation_timeout_seconds", "Current adaptive per-attempt timeout", ["tool", "kind"])
+
+# 熔断器
+CIRCUIT_STATE = REGISTRY.gauge("pubmed_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["upstream"])
+CIRCUIT_REJECTED = REGISTRY.counter("pubmed_circuit_rejected_total", "Calls rejected by an open circuit breaker", ["upstream"])
+
+# 执行引擎
+EXECUTOR_IN_FLIGHT = REGISTRY.gauge("pubmed_executor_in_flight", "Calls currently holding an execution slot", ["tool"])
+EXECUTOR_QUEUE_DEPTH = REGISTRY.gauge("pubmed_executor_queue_depth", "Calls waiting for an execution slot", ["tool"])
+EXECUTOR_QUEUE_WAIT = REGISTRY.histogram("pubmed_executor_queue_wait_seconds", "Time spent waiting for an execution slot", ["tool", "priority"])
+
+# 限流器
+RATE_LIMIT_QUEUE_DEPTH = REGISTRY.gauge("pubmed_rate_limit_queue_depth", "Callers waiting for a rate-limit token", ["upstream"])
+RATE_LIMIT_WAIT = REGISTRY.histogram("pubmed_rate_limit_wait_seconds", "Time spent waiting for a rate-limit token", ["upstream", "priority"])
+RATE_LIMIT_THROTTLED = REGISTRY.counter("pubmed_rate_limit_throttled_total", "HTTP 429 responses received", ["upstream"])
+
+# 缓存
+CACHE_REQUESTS = REGISTRY.counter("pubmed_cache_requests_total", "Cache lookups by result (hit, stale, miss)", ["cache", "result"])
+
+# 预取
+PREFETCH_ARTICLES = REGISTRY.counter("pubmed_prefetch_articles_total", "Articles prefetched into the cache and later requested", ["result"])
+
+# PDF 下载
+PDF_DOWNLOADS = REGISTRY.counter("pubmed_pdf_downloads_total", "PDF download attempts by outcome", ["status"])
+PDF_DOWNLOAD_BYTES = REGISTRY.counter("pubmed_pdf_download_bytes_total", "Bytes written by PDF downloads")
+
+# PDF 全文提取
+PDF_EXTRACTIONS = REGISTRY.counter("pubmed_pdf_extractions_total", "PDF text extractions by outcome", ["status"])
+PDF_EXTRACT_PAGES = REGISTRY.counter("pubmed_pdf_extract_pages_total", "PDF pages parsed by text extraction")
+PDF_EXTRACT_DURATION = REGISTRY.histogram("pubmed_pdf_extract_duration_seconds", "CPU time spent parsing one PDF in a worker process")
+
+# 检索结果重排
+RERANK_DURATION = REGISTRY.histogram("pubmed_rerank_duration_seconds", "Time spent scoring and sorting rerank candidates")
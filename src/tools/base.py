@@ -1,20 +1,82 @@
 from typing import Any, Dict, Callable, TypeVar, Optional
 from src.config import Config
 from src.logger import logger
-from time import sleep
+from src.metrics import (
+    OPERATION_ERRORS,
+    OPERATION_FAILURES,
+    OPERATION_LATENCY,
+    OPERATION_RETRIES,
+    OPERATION_TIMEOUT_SECONDS,
+    OPERATION_TIMEOUTS,
+)
+from src.tools.engine import ExecutionEngine
+from src.tools.rate_limiter import retry_after_seconds
+from src.tools.resilience import (
+    ERROR_PERMANENT,
+    ERROR_THROTTLED,
+    ERROR_TIMEOUT,
+    AdaptiveTimeout,
+    OperationError,
+    OperationTimeoutError,
+    backoff_delay,
+    classify_error,
+)
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from functools import partial
-from typing import Coroutine
+import time
 T = TypeVar('T')
+
+# 自适应超时按操作类型分别统计：单条请求和批量请求（多 PMID EFetch、多篇文章合并翻译）耗时相差很大
+TIMEOUT_SINGLE = "single"
+TIMEOUT_BATCH = "batch"
  
 class BaseTool:
+    # 自适应超时的初始值和上限（秒），可通过 timeout / max_timeout 配置覆盖
+    DEFAULT_TIMEOUT = 30
+    DEFAULT_MAX_TIMEOUT = 60
+    # 批量操作的超时下限（秒），可通过 batch_min_timeout 配置覆盖
+    DEFAULT_BATCH_MIN_TIMEOUT = 10
+
     def __init__(self, name:str, config=None):
         self.name = name
         self.config = config
         self.logger = logger
-        self._semaphore = None
-        self.max_concurrent_tasks = getattr(config, 'max_concurrent_tasks', 10) if config else 10
+        self.rate_limiter = None  # 访问受限上游（如 NCBI）的工具在子类中设置
+        self.circuit_breaker = None  # 访问远程上游的工具在子类中设置
+        # 工具级配置 tools.<name>.* 优先于全局配置
+        self.max_concurrent_tasks = self._get_option("max_concurrent_tasks", 10)
+        self.engine = ExecutionEngine(
+            name,
+            max_concurrent=self.max_concurrent_tasks,
+            max_workers=self._get_option("max_workers", None),
+            bulk_max_share=self._get_option("bulk_max_share", 0.75),
+            starvation_timeout=self._get_option("starvation_timeout", 10.0),
+        )
+        self.max_retries = self._get_option("max_retries", 3)
+        self.retry_base_delay = self._get_option("retry_base_delay", 0.5)
+        self.retry_max_delay = self._get_option("retry_max_delay", 10.0)
+        self.adaptive_timeouts = {
+            TIMEOUT_SINGLE: AdaptiveTimeout(
+                initial=self._get_option("timeout", self.DEFAULT_TIMEOUT),
+                minimum=self._get_option("min_timeout", 2.0),
+                maximum=self._get_option("max_timeout", self.DEFAULT_MAX_TIMEOUT),
+            ),
+            # 批量操作使用独立的样本窗口和更高的下限，不会被快速的单条请求拉低后整批超时重发
+            TIMEOUT_BATCH: AdaptiveTimeout(
+                initial=self._get_option("batch_timeout", self._get_option("timeout", self.DEFAULT_TIMEOUT)),
+                minimum=self._get_option("batch_min_timeout", self.DEFAULT_BATCH_MIN_TIMEOUT),
+                maximum=self._get_option("batch_max_timeout", self._get_option("max_timeout", self.DEFAULT_MAX_TIMEOUT)),
+            ),
+        }
+        self.adaptive_timeout = self.adaptive_timeouts[TIMEOUT_SINGLE]
+
+    def _get_option(self, key: str, default: Any = None) -> Any:
+        """读取工具配置，依次查找 tools.<name>.<key> 和 <key>"""
+        if not self.config:
+            return default
+        value = self.config.get(f"tools.{self.name}.{key}")
+        if value is None:
+            value = self.config.get(key)
+        return default if value is None else value
 
     def execute(self, *args, **kwargs):
         """同步执行入口"""
@@ -23,8 +85,9 @@ class BaseTool:
     async def async_execute(self, *args, **kwargs):
         """异步执行入口"""
         try:
-            # 默认将同步方法转为异步
-            return await asyncio.to_thread(self.execute, *args, **kwargs)
+            # 默认将同步方法放入工具专属线程池执行
+            async with self.engine.slot():
+                return await self.engine.run_blocking(self.execute, *args, **kwargs)
         except NotImplementedError:
             # 如果子类实现了异步方法则直接调用
             return await self._async_execute_impl(*args, **kwargs)
@@ -33,58 +96,117 @@ class BaseTool:
         """实际的异步实现"""
         raise NotImplementedError("异步执行方法未实现")
 
-    async def _execute_operation(self, operation, *args, timeout=None, max_retries=None, error_prefix="操作", **kwargs):
+    async def _execute_operation(self, operation, *args, timeout=None, max_retries=None, error_prefix="操作",
+                                 timeout_kind=TIMEOUT_SINGLE, rate_limiter=None, circuit_breaker=None,
+                                 rate_cost=1, **kwargs):
         """
-        执行操作的通用方法，支持超时和重试
-        :param operation: 要执行的操作（函数）
+        执行上游操作的通用方法，支持超时、分类重试和熔断
+        - 未指定 timeout 时使用按近期耗时分位数自适应的超时，单条和批量操作分别统计
+        - 永久错误（4xx、参数错误）立即失败；瞬时错误和超时按指数退避 + 抖动重试；429 由限流器统一退避
+        - 同一上游的熔断器打开时直接抛出 CircuitOpenError，不再请求上游
+        :param operation: 要执行的操作（同步函数在线程中执行，协程函数直接 await）
         :param args: 传递给操作的位置参数
-        :param timeout: 超时时间（秒）
-        :param max_retries: 最大重试次数
+        :param timeout: 固定的单次超时时间（秒），默认自适应
+        :param max_retries: 最大尝试次数
         :param error_prefix: 错误消息前缀
+        :param timeout_kind: 自适应超时的操作类型（TIMEOUT_SINGLE / TIMEOUT_BATCH）
+        :param rate_limiter: 本次操作使用的限流器，默认为工具的限流器（操作访问其他上游时传入）
+        :param circuit_breaker: 本次操作使用的熔断器，默认为工具的熔断器
+        :param rate_cost: 每次尝试获取的令牌数，即操作向上游发出的请求数
         :param kwargs: 传递给操作的关键字参数
         :return: 操作结果
+        :raises OperationError: 失败时抛出，category/retryable 标明错误类型；超时为 OperationTimeoutError
         """
-        retries = 0
-        max_retries = max_retries or 3
-        timeout = timeout or 30
+        max_retries = max_retries or self.max_retries
+        adaptive_timeout = self.adaptive_timeouts[timeout_kind]
+        rate_limiter = rate_limiter or self.rate_limiter
+        circuit_breaker = circuit_breaker or self.circuit_breaker
 
-        while retries < max_retries:
+        for attempt in range(max_retries):
+            attempt_timeout = timeout or adaptive_timeout.current()
+            OPERATION_TIMEOUT_SECONDS.labels(self.name, timeout_kind).set(attempt_timeout)
+            if circuit_breaker:
+                circuit_breaker.before_call()
             try:
-                # 使用 asyncio.wait_for 来处理超时
-                if args:
-                    result = await asyncio.wait_for(
-                        asyncio.to_thread(operation, *args),
-                        timeout=timeout
-                    )
-                else:
-                    result = await asyncio.wait_for(
-                        asyncio.to_thread(operation, **kwargs),
-                        timeout=timeout
-                    )
+                async with self.engine.slot():
+                    if rate_limiter:
+                        await rate_limiter.acquire(tokens=rate_cost)
+                    started = time.perf_counter()
+                    # 使用 asyncio.wait_for 来处理超时
+                    if asyncio.iscoroutinefunction(operation):
+                        # 原生协程直接在事件循环中执行，超时会真正取消请求
+                        result = await asyncio.wait_for(
+                            operation(*args, **kwargs),
+                            timeout=attempt_timeout
+                        )
+                    else:
+                        # 阻塞操作在有界线程池中执行，超时的线程最多占满该线程池
+                        result = await asyncio.wait_for(
+                            self.engine.run_blocking(operation, *args, **kwargs),
+                            timeout=attempt_timeout
+                        )
+                    elapsed = time.perf_counter() - started
+                    OPERATION_LATENCY.labels(self.name).observe(elapsed)
+                adaptive_timeout.observe(elapsed)
+                if rate_limiter:
+                    rate_limiter.record_success()
+                if circuit_breaker:
+                    circuit_breaker.record_success()
                 return result
 
-            except asyncio.TimeoutError:
-                retries += 1
-                if retries < max_retries:
-                    self.logger.warning(f"{error_prefix}超时，正在重试 ({retries}/{max_retries})...")
-                else:
-                    raise TimeoutError(f"{error_prefix}在 {timeout} 秒内未完成，已重试 {max_retries} 次")
+            except asyncio.CancelledError:
+                # 调用方取消时归还半开探测名额，避免熔断器卡在半开状态
+                if circuit_breaker:
+                    circuit_breaker.release_probe()
+                raise
 
             except Exception as e:
-                retries += 1
-                if retries < max_retries:
-                    self.logger.warning(f"{error_prefix}失败: {str(e)}，正在重试 ({retries}/{max_retries})...")
+                category = classify_error(e)
+                OPERATION_ERRORS.labels(self.name, category).inc()
+                if category == ERROR_TIMEOUT:
+                    OPERATION_TIMEOUTS.labels(self.name).inc()
+                    if timeout is None:
+                        # 超时的请求按当时的超时时间计入样本，连续超时会逐步放宽超时
+                        adaptive_timeout.observe(attempt_timeout)
+                    message = f"{error_prefix}在 {attempt_timeout:.2f} 秒内未完成"
+                else:
+                    message = f"{error_prefix}失败: {str(e)}"
+                if circuit_breaker:
+                    # 永久错误说明上游仍在正常响应，不计入熔断
+                    if category == ERROR_PERMANENT:
+                        circuit_breaker.record_success()
+                    else:
+                        circuit_breaker.record_failure()
+                retry_after = retry_after_seconds(e) if category == ERROR_THROTTLED else None
+                if category == ERROR_THROTTLED and rate_limiter:
+                    rate_limiter.backoff(retry_after)
+
+                if category == ERROR_PERMANENT or attempt + 1 >= max_retries:
+                    OPERATION_FAILURES.labels(self.name).inc()
+                    if category == ERROR_TIMEOUT:
+                        raise OperationTimeoutError(f"{message}，已尝试 {attempt + 1} 次") from e
+                    raise OperationError(
+                        f"{message}，已尝试 {attempt + 1} 次",
+                        category=category,
+                        retryable=category != ERROR_PERMANENT
+                    ) from e
+
+                OPERATION_RETRIES.labels(self.name).inc()
+                if category == ERROR_THROTTLED and rate_limiter:
+                    delay = 0.0  # 限流器已暂停发放令牌，下一次 acquire 会等待
                 else:
-                    raise Exception(f"{error_prefix}失败: {str(e)}，已重试 {max_retries} 次")
+                    delay = retry_after or backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+                self.logger.warning(
+                    f"{message}（{category}），{delay:.2f} 秒后重试 ({attempt + 1}/{max_retries})..."
+                )
+                await asyncio.sleep(delay)
 
     async def _async_operation(self, operation: Callable, *args, **kwargs):
         """
-        在线程池中执行同步操作
+        在工具专属线程池中执行同步操作
         """
-        with ThreadPoolExecutor() as pool:
-            return await self.loop.run_in_executor(
-                pool, partial(operation, *args, **kwargs)
-            )
+        async with self.engine.slot():
+            return await self.engine.run_blocking(operation, *args, **kwargs)
 
     def __del__(self):
         """
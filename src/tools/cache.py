@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+from src.metrics import CACHE_REQUESTS
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stale: bool
+
+
+class SQLiteCache:
+    """
+    基于 SQLite 的持久化键值缓存
+    - 值以 JSON + zlib 压缩存储
+    - 支持 TTL、条目数/字节数上限（按最近访问时间 LRU 淘汰）
+    - 使用 WAL 模式，同一主机上的多个进程（如 uvicorn workers）可共享同一个文件
+    """
+
+    def __init__(self, path: str, table: str = "cache", ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 serve_stale: bool = False):
+        """
+        :param path: 数据库文件路径
+        :param table: 表名，同一文件可存放多张缓存表
+        :param ttl: 默认有效期（秒），None 表示永不过期
+        :param max_entries: 最大条目数
+        :param max_bytes: 压缩后数据的最大总字节数
+        :param serve_stale: 过期条目是否仍然返回（标记为 stale，由调用方负责刷新）
+        """
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.serve_stale = serve_stale
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._hit_counter = CACHE_REQUESTS.labels(table, "hit")
+        self._stale_counter = CACHE_REQUESTS.labels(table, "stale")
+        self._miss_counter = CACHE_REQUESTS.labels(table, "miss")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table}(accessed_at)")
+
+    @classmethod
+    def from_config(cls, config, section: str, table: str, default_path: str = "./cache/pubmed.db"):
+        """根据配置段创建缓存，未配置或 enabled 为 false 时返回 None"""
+        if config is None:
+            return None
+        options = config.get(section) or {}
+        if not options.get("enabled", True):
+            return None
+        return cls(
+            path=options.get("path", default_path),
+            table=table,
+            ttl=options.get("ttl"),
+            max_entries=options.get("max_entries"),
+            max_bytes=options.get("max_bytes"),
+            serve_stale=options.get("serve_stale", False),
+        )
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """获取单个条目，未命中返回 None"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """批量获取条目，只返回命中的键"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, value, expires_at FROM {self.table} WHERE key IN ({placeholders})",
+                    part,
+                ).fetchall()
+                for key, blob, expires_at in rows:
+                    stale = expires_at is not None and expires_at <= now
+                    if stale and not self.serve_stale:
+                        continue
+                    found[key] = CacheEntry(self._decode(blob), stale)
+            if found:
+                hit_keys = list(found)
+                for start in range(0, len(hit_keys), 500):
+                    part = hit_keys[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET accessed_at = ? WHERE key IN ({placeholders})",
+                        [now, *part],
+                    )
+            stale_count = sum(1 for entry in found.values() if entry.stale)
+            self.hits += len(found) - stale_count
+            self.stale_hits += stale_count
+            self.misses += len(keys) - len(found)
+        self._hit_counter.inc(len(found) - stale_count)
+        self._stale_counter.inc(stale_count)
+        self._miss_counter.inc(len(keys) - len(found))
+        return found
+
+    def existing(self, keys: Iterable[str]) -> Set[str]:
+        """返回已缓存且未过期的键，不计入命中统计，也不更新访问时间"""
+        keys = list(keys)
+        now = time.time()
+        found = set()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key FROM {self.table} WHERE key IN ({placeholders}) "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    [*part, now],
+                ).fetchall()
+                found.update(key for key, in rows)
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入单个条目"""
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        批量写入条目
+        :param items: 键 -> 值
+        :param ttl: 本次写入的有效期（秒），默认使用缓存的 ttl
+        """
+        if not items:
+            return
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        rows = []
+        for key, value in items.items():
+            blob = self._encode(value)
+            rows.append((key, blob, len(blob), expires_at, now))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str):
+        """删除条目"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self):
+        """按最近访问时间淘汰超出上限的条目，需在事务内调用"""
+        if self.max_entries:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        if self.max_bytes:
+            total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims: List[str] = []
+                for key, size in self._conn.execute(
+                    f"SELECT key, size FROM {self.table} ORDER BY accessed_at"
+                ):
+                    victims.append(key)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in victims])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计和当前容量"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
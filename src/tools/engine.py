@@ -0,0 +1,128 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+from src.metrics import EXECUTOR_IN_FLIGHT, EXECUTOR_QUEUE_DEPTH, EXECUTOR_QUEUE_WAIT
+from src.tools.priority import BULK, PRIORITY_NAMES, PrioritySemaphore, WaitStats, current_priority
+
+
+class ExecutionEngine:
+    """
+    工具级执行引擎
+    - 用信号量限制在途调用数，超出的调用按优先级（interactive > normal > bulk）排队
+    - bulk 调用最多占用 bulk_max_share 比例的名额，始终为交互请求留出余量
+    - 仍需阻塞执行的操作在专属的有界线程池中运行，不占用默认线程池
+    - 分别统计排队等待时间和执行时间
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 10, max_workers: Optional[int] = None,
+                 bulk_max_share: float = 0.75, starvation_timeout: float = 10.0):
+        """
+        :param name: 引擎名称（通常为工具名）
+        :param max_concurrent: 最大在途调用数
+        :param max_workers: 阻塞操作线程池大小，默认等于 max_concurrent
+        :param bulk_max_share: bulk 调用最多占用的名额比例
+        :param starvation_timeout: 低优先级调用等待超过该时间（秒）后按最高优先级排队
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_workers = max_workers or max_concurrent
+        self.bulk_max_share = bulk_max_share
+        self.starvation_timeout = starvation_timeout
+        self._semaphore: Optional[PrioritySemaphore] = None
+        self.wait_stats = WaitStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_exec = 0.0
+        self._queue_depth_gauge = EXECUTOR_QUEUE_DEPTH.labels(name)
+        self._in_flight_gauge = EXECUTOR_IN_FLIGHT.labels(name)
+        self._queue_wait_histograms = {
+            priority: EXECUTOR_QUEUE_WAIT.labels(name, priority_name)
+            for priority, priority_name in PRIORITY_NAMES.items()
+        }
+
+    @property
+    def semaphore(self) -> PrioritySemaphore:
+        if self._semaphore is None:
+            self._semaphore = PrioritySemaphore(
+                self.max_concurrent,
+                class_limits={BULK: max(1, int(self.max_concurrent * self.bulk_max_share))},
+                starvation_timeout=self.starvation_timeout,
+            )
+        return self._semaphore
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{self.name}-worker",
+            )
+        return self._executor
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None):
+        """占用一个在途名额，记录排队和执行耗时；priority 默认取当前调用链的优先级"""
+        priority = current_priority.get() if priority is None else priority
+        queued_at = time.monotonic()
+        self.waiting += 1
+        self._queue_depth_gauge.inc()
+        try:
+            await self.semaphore.acquire(priority)
+        finally:
+            self.waiting -= 1
+            self._queue_depth_gauge.dec()
+        started_at = time.monotonic()
+        waited = started_at - queued_at
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self._queue_wait_histograms[priority].observe(waited)
+        self.wait_stats.observe(priority, waited)
+        self.running += 1
+        self._in_flight_gauge.inc()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._in_flight_gauge.dec()
+            self.completed += 1
+            self.total_exec += time.monotonic() - started_at
+            self.semaphore.release(priority)
+
+    def waiting_by_class(self) -> Dict[int, int]:
+        """各优先级正在排队的调用数"""
+        return self._semaphore.waiting_by_class() if self._semaphore is not None else {}
+
+    async def run_blocking(self, operation: Callable, *args, **kwargs) -> Any:
+        """在专属线程池中执行阻塞操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(operation, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回排队深度、在途数和平均耗时"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_workers": self.max_workers,
+            "queue_depth": self.waiting,
+            "in_flight": self.running,
+            "completed": self.completed,
+            "avg_queue_wait": self.total_wait / self.completed if self.completed else 0.0,
+            "max_queue_wait": self.max_wait,
+            "avg_exec_time": self.total_exec / self.completed if self.completed else 0.0,
+            "priorities": self.wait_stats.stats(
+                self._semaphore.waiting_by_class() if self._semaphore is not None else None
+            ),
+        }
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,246 @@
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+
+EUTILS_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+# 单次 EFetch POST 的 PMID 数量上限，NCBI 建议每次不超过数百个
+DEFAULT_EFETCH_BATCH_SIZE = 200
+# 流式读取响应时每块的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+# PMC ID Converter，每次请求最多 200 个 ID
+IDCONV_URL = "https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/"
+IDCONV_BATCH_SIZE = 200
+
+
+def chunked(items: List[str], size: int) -> Iterable[List[str]]:
+    """按固定大小切分列表"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+_pubmed_fetcher = None
+
+
+def get_pubmed_fetcher():
+    """进程内共享的 metapub PubMedFetcher，首次使用时才导入 metapub"""
+    global _pubmed_fetcher
+    if _pubmed_fetcher is None:
+        from metapub import PubMedFetcher
+        _pubmed_fetcher = PubMedFetcher()
+    return _pubmed_fetcher
+
+
+class EUtilsHTTPError(Exception):
+    """E-utilities 返回非 2xx 状态码"""
+
+    def __init__(self, status: int, message: str, headers=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.headers = headers or {}
+
+
+class EUtilsClient:
+    """
+    基于 aiohttp 的异步 E-utilities 客户端
+    - 进程内共享一个 keep-alive 连接池
+    - 不占用线程；调用方取消（如 asyncio.wait_for 超时）时请求随之中断
+    - 不做限流，由调用方（BaseTool._execute_operation）统一限流和重试
+    """
+
+    def __init__(self, base_url: str = EUTILS_BASE_URL, api_key: Optional[str] = None,
+                 timeout: float = 30, pool_size: int = 20):
+        """
+        :param base_url: E-utilities 根地址
+        :param api_key: NCBI API key
+        :param timeout: 单次请求超时时间（秒）
+        :param pool_size: 连接池大小
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._session_guard = None
+        self._loop = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """
+        在当前事件循环中懒创建会话，事件循环变化后（如 CLI 多次 asyncio.run）重建
+        会话的生命周期限定在创建它的事件循环内：事件循环结束前（asyncio.run 关闭异步生成器时）自动关闭，不会遗留连接
+        """
+        import aiohttp  # 延迟导入，避免拖慢进程启动
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+            # 事件循环只弱引用异步生成器，需保留引用，否则被回收时会提前关闭会话
+            self._session_guard = self._close_with_loop(self._session)
+            loop.create_task(self._session_guard.__anext__())
+        return self._session
+
+    @staticmethod
+    async def _close_with_loop(session: "aiohttp.ClientSession"):
+        """挂起在事件循环中的异步生成器，事件循环关闭异步生成器时关闭会话"""
+        try:
+            yield
+        finally:
+            if not session.closed:
+                await session.close()
+
+    async def _request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                       data: Optional[Dict] = None) -> bytes:
+        """发送请求并返回响应体"""
+        if self.api_key:
+            if data is not None:
+                data = {**data, "api_key": self.api_key}
+            else:
+                params = {**(params or {}), "api_key": self.api_key}
+        session = self._get_session()
+        async with session.request(method, f"{self.base_url}/{endpoint}", params=params, data=data) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise EUtilsHTTPError(response.status, body[:200].decode("utf-8", "replace"), response.headers)
+            return body
+
+    async def esearch(self, term: str, retstart: int = 0, retmax: int = 20, usehistory: bool = True) -> Dict[str, Any]:
+        """
+        执行 ESearch
+        :return: {'count', 'pmids', 'webenv', 'query_key'}
+        """
+        params = {
+            "db": "pubmed",
+            "term": term,
+            "retstart": retstart,
+            "retmax": retmax,
+            "retmode": "json",
+        }
+        if usehistory:
+            params["usehistory"] = "y"
+        body = await self._request("GET", "esearch.fcgi", params=params)
+        result = json.loads(body).get("esearchresult", {})
+        if "ERROR" in result:
+            raise ValueError(f"ESearch 错误: {result['ERROR']}")
+        return {
+            "count": int(result.get("count", 0)),
+            "pmids": result.get("idlist", []),
+            "webenv": result.get("webenv"),
+            "query_key": result.get("querykey"),
+        }
+
+    async def iter_efetch_pubmed_xml(self, pmids: List[str],
+                                     chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        通过一次 EFetch POST 获取多篇文章的 PubmedArticleSet XML，边接收边按块产出，不缓存整个响应体
+        :param chunk_size: 每块的最大字节数
+        """
+        data = {"db": "pubmed", "id": ",".join(pmids), "retmode": "xml"}
+        if self.api_key:
+            data["api_key"] = self.api_key
+        session = self._get_session()
+        async with session.post(f"{self.base_url}/efetch.fcgi", data=data) as response:
+            if response.status >= 400:
+                body = await response.read()
+                raise EUtilsHTTPError(response.status, body[:200].decode("utf-8", "replace"), response.headers)
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
+    async def efetch_history_pmids(self, webenv: str, query_key: str, retstart: int = 0,
+                                   retmax: int = 20) -> List[str]:
+        """从 history server 中分页读取 PMID"""
+        body = await self._request("GET", "efetch.fcgi", params={
+            "db": "pubmed",
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": retmax,
+            "rettype": "uilist",
+            "retmode": "text",
+        })
+        if b"<ERROR>" in body:
+            raise ValueError(f"history server 错误: {body.decode('utf-8', 'replace').strip()}")
+        return [line.strip() for line in body.decode().splitlines() if line.strip()]
+
+    async def elink(self, pmids: List[str], db: str = "pubmed", linkname: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        执行 ELink，按 PMID 分别返回关联记录
+        :param pmids: PMID 列表
+        :param db: 目标数据库
+        :param linkname: 链接类型，如 pubmed_pubmed（相似文章）、pubmed_pmc
+        :return: PMID -> 关联 ID 列表
+        """
+        data = [("dbfrom", "pubmed"), ("db", db), ("retmode", "json")]
+        data += [("id", pmid) for pmid in pmids]  # 每个 id 单独传入，结果按 PMID 分组
+        if linkname:
+            data.append(("linkname", linkname))
+        if self.api_key:
+            data.append(("api_key", self.api_key))
+        session = self._get_session()
+        async with session.post(f"{self.base_url}/elink.fcgi", data=data) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise EUtilsHTTPError(response.status, body[:200].decode("utf-8", "replace"), response.headers)
+        links = {}
+        for linkset in json.loads(body).get("linksets", []):
+            ids = linkset.get("ids", [])
+            if not ids:
+                continue
+            related = []
+            for linksetdb in linkset.get("linksetdbs", []):
+                related.extend(str(link) for link in linksetdb.get("links", []))
+            links[str(ids[0])] = related
+        return links
+
+    async def convert_ids(self, pmids: List[str], url: str = IDCONV_URL) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        通过 PMC ID Converter 一次请求转换多个 PMID
+        :param pmids: PMID 列表，不超过 IDCONV_BATCH_SIZE 个
+        :return: PMID -> {'doi', 'pmcid'}，不在 PMC 中的文章两者为 None
+        """
+        session = self._get_session()
+        params = {"ids": ",".join(pmids), "idtype": "pmid", "format": "json", "tool": "pubmed-agent"}
+        async with session.get(url, params=params) as response:
+            body = await response.read()
+            if response.status >= 400:
+                raise EUtilsHTTPError(response.status, body[:200].decode("utf-8", "replace"), response.headers)
+        converted = {}
+        for record in json.loads(body).get("records", []):
+            pmid = record.get("pmid") or record.get("requested-id")
+            if pmid:
+                converted[str(pmid)] = {"doi": record.get("doi"), "pmcid": record.get("pmcid")}
+        return converted
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_eutils_client: Optional[EUtilsClient] = None
+
+
+def get_eutils_client(config=None) -> EUtilsClient:
+    """获取进程内共享的 E-utilities 客户端"""
+    global _eutils_client
+    if _eutils_client is None:
+        _eutils_client = EUtilsClient(
+            base_url=(config.get("eutils.base_url") if config else None) or EUTILS_BASE_URL,
+            api_key=config.ncbi_api_key if config else None,
+            timeout=(config.get("eutils.timeout") if config else None) or 30,
+            pool_size=(config.get("eutils.pool_size") if config else None) or 20,
+        )
+    return _eutils_client
+
+
+async def close_eutils_client():
+    """关闭共享客户端，在应用退出时调用"""
+    if _eutils_client is not None:
+        await _eutils_client.close()
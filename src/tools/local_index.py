@@ -0,0 +1,422 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    pmid INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1,
+    year INTEGER,
+    journal_norm TEXT,
+    journal_title_norm TEXT,
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_journal ON articles(journal_norm);
+CREATE INDEX IF NOT EXISTS idx_articles_year ON articles(year);
+CREATE TABLE IF NOT EXISTS authors (
+    pmid INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    is_last INTEGER NOT NULL,
+    name_norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_authors_name ON authors(name_norm);
+CREATE INDEX IF NOT EXISTS idx_authors_pmid ON authors(pmid);
+CREATE TABLE IF NOT EXISTS mesh (
+    pmid INTEGER NOT NULL,
+    descriptor_norm TEXT NOT NULL,
+    major INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mesh_descriptor ON mesh(descriptor_norm);
+CREATE INDEX IF NOT EXISTS idx_mesh_pmid ON mesh(pmid);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, abstract, keywords, mesh, tokenize='porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    ingested_at REAL NOT NULL,
+    articles INTEGER NOT NULL,
+    deletions INTEGER NOT NULL
+);
+"""
+
+# 旧版本创建的索引没有 journal_title_norm 列，升级后再建该列的索引
+JOURNAL_TITLE_INDEX = "CREATE INDEX IF NOT EXISTS idx_articles_journal_title ON articles(journal_title_norm)"
+
+# PubMed 字段标签 -> 本地索引中的检索方式
+AUTHOR_FIELDS = {"au", "author", "auth", "full author name", "fau"}
+FIRST_AUTHOR_FIELDS = {"1au", "first author", "first author name"}
+LAST_AUTHOR_FIELDS = {"lastau", "last author", "last author name"}
+JOURNAL_FIELDS = {"ta", "journal", "jour", "jt"}
+YEAR_FIELDS = {"dp", "pdat", "year", "yr", "publication date"}
+MESH_FIELDS = {"mh", "mesh", "mesh terms", "majr", "mesh major topic"}
+FTS_COLUMNS = {
+    "ti": ["title"],
+    "title": ["title"],
+    "tiab": ["title", "abstract"],
+    "title/abstract": ["title", "abstract"],
+    "ab": ["abstract"],
+    "abstract": ["abstract"],
+    "ot": ["keywords"],
+    "kw": ["keywords"],
+    "keyword": ["keywords"],
+}
+PMID_FIELDS = {"pmid", "uid"}
+# 在全部文本列中检索，与不加字段标签相同
+ALL_TEXT_FIELDS = {"all", "all fields", "tw", "text word", "text words"}
+
+_TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|\[([^\]]+)\]|([^\s()\[\]"]+))')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def prepare_rows(record: Dict[str, Any]) -> Tuple:
+    """
+    将解析后的记录转换为写入索引所需的各行数据，可在子进程中执行以分摊 CPU
+    :return: (pmid, version, year, journal_norm, journal_title_norm, record_blob, fts_row, author_rows, mesh_rows)
+    """
+    pmid = int(record["pmid"])
+    year = int(record["year"]) if str(record.get("year", "")).isdigit() else None
+    authors = record.get("authors") or []
+    mesh_terms = record.get("mesh_terms") or {}
+    fts_row = (
+        pmid,
+        record.get("title", ""),
+        record.get("abstract", ""),
+        " ; ".join(record.get("keywords") or []),
+        " ; ".join(term.get("descriptor_name", "") for term in mesh_terms.values()),
+    )
+    author_rows = [
+        (pmid, position, int(position == len(authors) - 1), normalize(name))
+        for position, name in enumerate(authors)
+    ]
+    mesh_rows = [
+        (pmid, normalize(term.get("descriptor_name", "")), int(bool(term.get("major_topic"))))
+        for term in mesh_terms.values()
+    ]
+    blob = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    # journal 为 ISO 缩写（缺少时为全称），journal_title 为期刊全称
+    return (pmid, record.get("version", 1), year, normalize(record.get("journal", "")),
+            normalize(record.get("journal_title", "")), blob, fts_row, author_rows, mesh_rows)
+
+
+class LocalPubMedIndex:
+    """
+    基于 SQLite FTS5 的本地 PubMed 索引
+    - articles 表保存压缩后的完整记录，articles_fts 提供标题/摘要/关键词/MeSH 全文检索
+    - authors、mesh、期刊缩写和全称、year 单独建索引，用于 [au]、[mh]、[ta]/[jt]、[dp] 等字段检索
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            if not self._has_column("articles", "journal_title_norm"):
+                # 旧索引中已有的文章该列为空，期刊检索仍能匹配缩写；用 --force 重新导入后补齐全称
+                self._conn.execute("ALTER TABLE articles ADD COLUMN journal_title_norm TEXT")
+            self._conn.execute(JOURNAL_TITLE_INDEX)
+        # 只读打开未升级的旧索引时期刊检索只匹配缩写
+        self.has_journal_title = self._has_column("articles", "journal_title_norm")
+
+    def _has_column(self, table: str, column: str) -> bool:
+        return any(row[1] == column for row in self._conn.execute(f"PRAGMA table_info({table})"))
+
+    # ---------- 写入 ----------
+
+    def is_ingested(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM ingested_files WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def apply_file(self, name: str, rows: List[Tuple], deletions: List[str]):
+        """
+        在一个事务内写入一个文件的全部变更：先按文件中的顺序写入记录，再执行删除
+        版本号低于已有记录的修订会被忽略
+        """
+        with self._lock:
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert(rows)
+                self._delete([int(pmid) for pmid in deletions])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files (name, ingested_at, articles, deletions) VALUES (?, ?, ?, ?)",
+                    (name, time.time(), len(rows), len(deletions)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _upsert(self, rows: List[Tuple]):
+        if not rows:
+            return
+        latest = {}
+        for row in rows:
+            # 同一文件中出现多次时保留最后一次
+            latest[row[0]] = row
+        existing = {}
+        pmids = list(latest)
+        for start in range(0, len(pmids), 500):
+            part = pmids[start:start + 500]
+            existing.update(self._conn.execute(
+                f"SELECT pmid, version FROM articles WHERE pmid IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        rows = [row for pmid, row in latest.items() if row[1] >= existing.get(pmid, 0)]
+        self._delete_children([row[0] for row in rows if row[0] in existing])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO articles (pmid, version, year, journal_norm, journal_title_norm, record) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [row[:6] for row in rows],
+        )
+        self._conn.executemany(
+            "INSERT INTO articles_fts (rowid, title, abstract, keywords, mesh) VALUES (?, ?, ?, ?, ?)",
+            [row[6] for row in rows],
+        )
+        self._conn.executemany(
+            "INSERT INTO authors (pmid, position, is_last, name_norm) VALUES (?, ?, ?, ?)",
+            [author for row in rows for author in row[7]],
+        )
+        self._conn.executemany(
+            "INSERT INTO mesh (pmid, descriptor_norm, major) VALUES (?, ?, ?)",
+            [term for row in rows for term in row[8]],
+        )
+
+    def _delete_children(self, pmids: List[int]):
+        params = [(pmid,) for pmid in pmids]
+        self._conn.executemany("DELETE FROM articles_fts WHERE rowid = ?", params)
+        self._conn.executemany("DELETE FROM authors WHERE pmid = ?", params)
+        self._conn.executemany("DELETE FROM mesh WHERE pmid = ?", params)
+
+    def _delete(self, pmids: List[int]):
+        if not pmids:
+            return
+        self._delete_children(pmids)
+        self._conn.executemany("DELETE FROM articles WHERE pmid = ?", [(pmid,) for pmid in pmids])
+
+    def optimize(self):
+        """导入结束后合并 FTS 段并更新统计信息"""
+        with self._lock:
+            self._conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+            self._conn.execute("ANALYZE")
+
+    # ---------- 读取 ----------
+
+    def get_records(self, pmids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """按 PMID 读取完整记录，不存在的 PMID 不出现在结果中"""
+        ids = [int(pmid) for pmid in pmids if str(pmid).strip().isdigit()]
+        records = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                for pmid, blob in self._conn.execute(
+                    f"SELECT pmid, record FROM articles WHERE pmid IN ({','.join('?' * len(part))})", part
+                ):
+                    records[str(pmid)] = json.loads(zlib.decompress(blob).decode("utf-8"))
+        return records
+
+    def compile(self, query: str) -> Tuple[str, List[Any]]:
+        """
+        编译检索式
+        :raises ValueError: 检索式无法解析或包含不支持的字段标签
+        """
+        return QueryCompiler(query, journal_title=self.has_journal_title).compile()
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """
+        执行 PubMed 风格检索式，结果按 PMID 倒序（近似按时间由新到旧）
+        :return: {'count', 'pmids'}
+        """
+        condition, params = self.compile(query)
+        with self._lock:
+            count = self._conn.execute(
+                f"SELECT COUNT(*) FROM articles a WHERE {condition}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT a.pmid FROM articles a WHERE {condition} ORDER BY a.pmid DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return {"count": count, "pmids": [str(row[0]) for row in rows]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            files = self._conn.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0]
+        return {"articles": articles, "ingested_files": files}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QueryCompiler:
+    """
+    将 PubMed 检索式编译为 SQL 条件
+    支持 AND/OR/NOT（从左到右结合）、括号、引号短语、字段标签（如 [au]、[ta]、[dp]、[mh]、[tiab]）、
+    年份范围（2019:2021[dp]）和末尾通配符（leuk*）；未加字段标签的词在全部文本列中检索
+    期刊标签同时匹配 ISO 缩写和期刊全称；不支持的字段标签抛出 ValueError，不会退化为全文检索
+    """
+
+    def __init__(self, query: str, journal_title: bool = True):
+        """:param journal_title: 索引中有 journal_title_norm 列"""
+        self.tokens = self._tokenize(query or "")
+        self.position = 0
+        self.params: List[Any] = []
+        self.journal_title = journal_title
+
+    @staticmethod
+    def _tokenize(query: str) -> List[Tuple[str, str]]:
+        tokens = []
+        for lparen, rparen, quoted, field, word in _TOKEN_PATTERN.findall(query):
+            if lparen:
+                tokens.append(("(", lparen))
+            elif rparen:
+                tokens.append((")", rparen))
+            elif quoted:
+                tokens.append(("phrase", quoted))
+            elif field:
+                # 兼容 "[AND]" 这种把运算符写在方括号中的写法
+                if field.strip().upper() in _OPERATORS:
+                    tokens.append(("op", field.strip().upper()))
+                else:
+                    tokens.append(("field", field.strip().lower()))
+            elif word:
+                if word in _OPERATORS:
+                    tokens.append(("op", word))
+                else:
+                    tokens.append(("word", word))
+        return tokens
+
+    def compile(self) -> Tuple[str, List[Any]]:
+        if not self.tokens:
+            raise ValueError("检索式为空")
+        condition = self._expression()
+        if self.position < len(self.tokens):
+            raise ValueError(f"无法解析的检索式: {self.tokens[self.position][1]}")
+        return condition, self.params
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _expression(self) -> str:
+        left = self._term()
+        while True:
+            token = self._peek()
+            if token is None or token[0] == ")":
+                return left
+            if token[0] == "op":
+                self.position += 1
+                operator = token[1]
+            else:
+                operator = "AND"  # 相邻的检索单元之间默认为 AND
+            right = self._term()
+            if operator == "NOT":
+                left = f"({left} AND NOT {right})"
+            else:
+                left = f"({left} {operator} {right})"
+
+    def _term(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ValueError("检索式不完整")
+        if token[0] == "(":
+            self.position += 1
+            condition = self._expression()
+            if self._peek() is None or self._peek()[0] != ")":
+                raise ValueError("括号不匹配")
+            self.position += 1
+            return condition
+        words = []
+        while self._peek() is not None and self._peek()[0] in ("word", "phrase"):
+            kind, text = self.tokens[self.position]
+            words.append((kind, text))
+            self.position += 1
+        if not words:
+            raise ValueError(f"无法解析的检索式: {token[1]}")
+        field = None
+        if self._peek() is not None and self._peek()[0] == "field":
+            field = self._peek()[1]
+            self.position += 1
+        return self._atom(words, field)
+
+    def _atom(self, words: List[Tuple[str, str]], field: Optional[str]) -> str:
+        text = " ".join(text for _, text in words)
+        if field in AUTHOR_FIELDS | FIRST_AUTHOR_FIELDS | LAST_AUTHOR_FIELDS:
+            name = normalize(text)
+            clause = "name_norm >= ? AND name_norm < ?"
+            self.params.extend([name, name + "￿"])
+            if field in FIRST_AUTHOR_FIELDS:
+                clause += " AND position = 0"
+            elif field in LAST_AUTHOR_FIELDS:
+                clause += " AND is_last = 1"
+            return f"a.pmid IN (SELECT pmid FROM authors WHERE {clause})"
+        if field in JOURNAL_FIELDS:
+            if not self.journal_title:
+                self.params.append(normalize(text))
+                return "a.journal_norm = ?"
+            self.params.extend([normalize(text)] * 2)
+            return "(a.journal_norm = ? OR a.journal_title_norm = ?)"
+        if field in YEAR_FIELDS:
+            match = re.match(r"^\s*(\d{4})(?:[/\d]*)\s*(?::\s*(\d{4})[/\d]*)?\s*$", text)
+            if not match:
+                raise ValueError(f"无法解析的日期: {text}")
+            start, end = match.group(1), match.group(2) or match.group(1)
+            self.params.extend([int(start), int(end)])
+            return "a.year BETWEEN ? AND ?"
+        if field in MESH_FIELDS:
+            self.params.append(normalize(text))
+            major = " AND major = 1" if field in ("majr", "mesh major topic") else ""
+            return f"a.pmid IN (SELECT pmid FROM mesh WHERE descriptor_norm = ?{major})"
+        if field in PMID_FIELDS:
+            if not text.strip().isdigit():
+                raise ValueError(f"无效的 PMID: {text}")
+            self.params.append(int(text))
+            return "a.pmid = ?"
+        if field is not None and field not in FTS_COLUMNS and field not in ALL_TEXT_FIELDS:
+            raise ValueError(f"不支持的字段标签: [{field}]")
+        self.params.append(self._fts_query(words, FTS_COLUMNS.get(field)))
+        return "a.pmid IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)"
+
+    @staticmethod
+    def _fts_query(words: List[Tuple[str, str]], columns: Optional[List[str]]) -> str:
+        """构造 FTS5 查询：引号短语整体匹配，其余词分别匹配，末尾 * 表示前缀匹配"""
+        parts = []
+        for kind, text in words:
+            if kind == "phrase":
+                parts.append('"' + text.replace('"', '""') + '"')
+                continue
+            prefix = text.endswith("*")
+            term = text.rstrip("*").replace('"', '""')
+            if term:
+                parts.append(f'"{term}"' + ("*" if prefix else ""))
+        query = " AND ".join(parts)
+        if columns:
+            query = "{" + " ".join(columns) + "} : (" + query + ")"
+        return query
+
+
+_local_index: Optional[LocalPubMedIndex] = None
+
+
+def get_local_index(config=None) -> LocalPubMedIndex:
+    """获取进程内共享的本地索引（只读打开）"""
+    global _local_index
+    if _local_index is None:
+        path = (config.get("local_index.path") if config else None) or "./cache/medline.db"
+        _local_index = LocalPubMedIndex(path, readonly=True)
+    return _local_index
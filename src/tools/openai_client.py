@@ -0,0 +1,67 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+from src.tools.engine import ExecutionEngine
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# 共享连接池大小
+DEFAULT_POOL_SIZE = 20
+# 每个模型同时进行的 LLM 请求数
+DEFAULT_MODEL_CONCURRENCY = 8
+
+_openai_client: Optional["AsyncOpenAI"] = None
+_openai_loop = None
+_model_engines: Dict[str, ExecutionEngine] = {}
+
+
+def get_openai_client(config) -> "AsyncOpenAI":
+    """
+    获取进程内共享的 AsyncOpenAI 客户端
+    - 所有 LLM 调用共用一个 httpx 连接池（openai.pool_size），复用 keep-alive 连接，不占用线程
+    - 首次使用时才导入 openai；事件循环变化后（如 CLI 多次 asyncio.run）重建
+    - 关闭 SDK 自带的重试，重试统一由 BaseTool._execute_operation 按错误类型处理
+    """
+    global _openai_client, _openai_loop
+    loop = asyncio.get_running_loop()
+    if _openai_client is None or _openai_loop is not loop:
+        import httpx
+        from openai import AsyncOpenAI
+
+        pool_size = (config.get("openai.pool_size") if config else None) or DEFAULT_POOL_SIZE
+        _openai_client = AsyncOpenAI(
+            api_key=config.openai_api_key,
+            base_url=config.openai_base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            ),
+        )
+        _openai_loop = loop
+    return _openai_client
+
+
+def get_model_engine(model: str, config=None) -> ExecutionEngine:
+    """
+    获取按模型共享的执行引擎，同一模型的所有调用共用并发上限并按优先级排队
+    并发上限读取 openai.max_concurrent，可以是整数或 {模型: 整数}
+    """
+    if model not in _model_engines:
+        limit = config.get("openai.max_concurrent") if config else None
+        if isinstance(limit, dict):
+            limit = limit.get(model)
+        _model_engines[model] = ExecutionEngine(
+            f"openai:{model}",
+            max_concurrent=limit or DEFAULT_MODEL_CONCURRENCY,
+            bulk_max_share=(config.get("bulk_max_share") if config else None) or 0.75,
+            starvation_timeout=(config.get("starvation_timeout") if config else None) or 10.0,
+        )
+    return _model_engines[model]
+
+
+async def close_openai_client():
+    """关闭共享客户端，在应用退出时调用"""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+    _openai_client = None
@@ -0,0 +1,382 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from src.config import Config
+from src.metrics import PDF_DOWNLOAD_BYTES, PDF_DOWNLOADS
+from src.tools.base import BaseTool
+from src.tools.pdf_resolver import PdfResolverTool
+from src.tools.resilience import OperationError
+
+if TYPE_CHECKING:
+    import aiohttp
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+# 下载结果状态
+STATUS_DOWNLOADED = "downloaded"
+STATUS_EXISTS = "exists"
+STATUS_NOT_FOUND = "not_found"
+STATUS_FAILED = "failed"
+
+
+class PdfHTTPError(Exception):
+    """出版商返回非 2xx 状态码"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class NotPdfResponse(ValueError):
+    """响应不是 PDF（通常是 HTML 落地页或 Cloudflare 验证页），需要浏览器打开；重试纯 HTTP 请求无意义"""
+
+
+class HostLimiter:
+    """按主机限制并发下载数，避免对单个出版商同时发起过多连接"""
+
+    def __init__(self, per_host: int = 2, overrides: Optional[Dict[str, int]] = None):
+        """
+        :param per_host: 每个主机的默认并发数
+        :param overrides: 主机 -> 并发数，单独覆盖
+        """
+        self.per_host = per_host
+        self.overrides = overrides or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_use: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = (urlsplit(url).hostname or "").lower()
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.overrides.get(host, self.per_host))
+        async with semaphore:
+            self._in_use[host] = self._in_use.get(host, 0) + 1
+            try:
+                yield
+            finally:
+                self._in_use[host] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            host: {"limit": self.overrides.get(host, self.per_host), "in_use": self._in_use.get(host, 0)}
+            for host in self._semaphores
+        }
+
+
+class BrowserPool:
+    """
+    可复用的无头浏览器会话池
+    - 只用于纯 HTTP 拿不到 PDF 的页面（如 Cloudflare 验证页），打开页面后取出 cookie 交给 HTTP 下载
+    - 首次使用时才导入 selenium 并启动浏览器，最多 size 个会话，用完归还而不是关闭
+    - 浏览器操作是阻塞的，在专属线程池中执行，线程数等于会话数
+    """
+
+    def __init__(self, size: int = 2, page_timeout: float = 30.0, user_agent: str = DEFAULT_USER_AGENT):
+        """
+        :param size: 最大会话数
+        :param page_timeout: 页面加载和验证通过的等待上限（秒）
+        :param user_agent: 浏览器 User-Agent，之后的 HTTP 下载使用同一个
+        """
+        self.size = size
+        self.page_timeout = page_timeout
+        self.user_agent = user_agent
+        self._idle: List[Any] = []
+        self._created = 0
+        self._available: Optional[asyncio.Condition] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.opened = 0
+
+    def _create_driver(self):
+        from selenium import webdriver
+
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument(f"user-agent={self.user_agent}")
+        # selenium 4.6+ 自带 Selenium Manager，会自动匹配 ChromeDriver
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.page_timeout)
+        return driver
+
+    def _open_page(self, driver, url: str) -> Tuple[Dict[str, str], str]:
+        """打开页面并等待加载完成、通过验证页，返回 (cookies, 最终地址)"""
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver.get(url)
+        WebDriverWait(driver, self.page_timeout, poll_frequency=0.25).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+            and "just a moment" not in d.title.lower()
+        )
+        cookies = {cookie["name"]: cookie["value"] for cookie in driver.get_cookies()}
+        return cookies, driver.current_url
+
+    async def _run(self, operation, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="browser")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, operation, *args)
+
+    @asynccontextmanager
+    async def session(self):
+        """借出一个浏览器会话，用完归还；出错的会话直接关闭，下次按需重建"""
+        if self._available is None:
+            self._available = asyncio.Condition()
+        async with self._available:
+            while not self._idle and self._created >= self.size:
+                await self._available.wait()
+            driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                self._created += 1
+        try:
+            if driver is None:
+                driver = await self._run(self._create_driver)
+            yield driver
+        except BaseException:
+            if driver is not None:
+                await self._run(driver.quit)
+            driver = None
+            raise
+        finally:
+            async with self._available:
+                if driver is not None:
+                    self._idle.append(driver)
+                else:
+                    self._created -= 1
+                self._available.notify()
+
+    async def open(self, url: str) -> Tuple[Dict[str, str], str]:
+        """用浏览器打开 url，返回 (cookies, 最终地址)"""
+        async with self.session() as driver:
+            self.opened += 1
+            return await self._run(self._open_page, driver, url)
+
+    async def close(self):
+        """关闭所有空闲会话"""
+        drivers, self._idle = self._idle, []
+        for driver in drivers:
+            try:
+                await self._run(driver.quit)
+            except Exception:
+                pass
+        self._created -= len(drivers)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "created": self._created, "idle": len(self._idle), "opened": self.opened}
+
+
+class PdfDownloadTool(BaseTool):
+    """
+    并发下载文章 PDF
+    - 地址由 PdfResolverTool 解析（磁盘缓存 + 批量 ID 转换），每解析出一篇就开始下载
+    - 下载按主机限流，响应流式写入 <pmid>.pdf.part，重试或下次运行时用 Range 续传，完成后改名
+    - 纯 HTTP 拿到的不是 PDF 时，借用浏览器会话打开页面，带上其 cookie 重新下载
+    """
+    # 下载大文件的耗时远长于 API 请求
+    DEFAULT_TIMEOUT = 120
+    DEFAULT_MAX_TIMEOUT = 600
+
+    def __init__(self, name: str, config: Config = None):
+        super().__init__(name, config)
+        options = (config.get("pdf_download") if config else None) or {}
+        self.directory = options.get("directory", "./download")
+        self.chunk_size = options.get("chunk_size", 64 * 1024)
+        self.download_timeout = options.get("timeout", self.DEFAULT_TIMEOUT)
+        self.user_agent = options.get("user_agent", DEFAULT_USER_AGENT)
+        self.resolver = PdfResolverTool(name="PdfResolverTool", config=config)
+        self.host_limiter = HostLimiter(options.get("per_host", 2), options.get("host_limits"))
+        pool_size = options.get("browser_pool_size", 2)
+        self.browser_pool = BrowserPool(pool_size, options.get("page_timeout", 30.0), self.user_agent) if pool_size else None
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._loop = None
+        self._bytes_counter = PDF_DOWNLOAD_BYTES.labels()
+        # iter_download 同时存在的下载任务数上限；等待主机名额的任务不占执行引擎名额，因此留出余量
+        self.max_pending = options.get("max_pending", self.max_concurrent_tasks * 4)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """在当前事件循环中懒创建会话，事件循环变化后重建"""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrent_tasks * 2, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60),
+            )
+            self._loop = loop
+        return self._session
+
+    def pdf_path(self, pmid: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"{pmid}.pdf")
+
+    async def _download(self, url: str, path: str, cookies: Optional[Dict[str, str]] = None) -> int:
+        """
+        流式下载到 path.part，已有部分文件时用 Range 续传，校验 PDF 文件头后改名为 path
+        :return: 文件大小（字节）
+        """
+        part = path + ".part"
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"User-Agent": self.user_agent, "Accept": "application/pdf,*/*;q=0.8"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        while True:
+            async with self._get_session().get(url, headers=headers, cookies=cookies) as response:
+                content_type = response.headers.get("Content-Type", "").lower()
+                if response.status == 416 and "Range" in headers:
+                    # 部分文件与服务器上的文件不一致，删除后在本次尝试中不带 Range 从头请求
+                    os.remove(part)
+                    del headers["Range"]
+                    continue
+                if "html" in content_type and (response.status < 400 or response.status in (403, 503)):
+                    raise NotPdfResponse(f"返回的不是 PDF（HTTP {response.status}，{content_type}）")
+                if response.status >= 400:
+                    raise PdfHTTPError(response.status, response.reason or "")
+                # 服务器不支持 Range 时返回 200，从头写入
+                with open(part, "ab" if response.status == 206 else "wb") as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        f.write(chunk)
+                        self._bytes_counter.inc(len(chunk))
+            break
+        with open(part, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                os.remove(part)
+                raise NotPdfResponse("下载的文件不是 PDF")
+        os.replace(part, path)
+        return os.path.getsize(path)
+
+    async def _fetch(self, url: str, path: str) -> int:
+        """
+        先用纯 HTTP 下载，拿到的不是 PDF 时借用浏览器会话通过验证后再下载
+        先取得主机名额再进入 _execute_operation：等待繁忙的主机时不占用执行引擎名额，等待时间也不计入下载超时
+        """
+        try:
+            async with self.host_limiter.slot(url):
+                return await self._execute_operation(
+                    self._download, url, path, timeout=self.download_timeout, error_prefix="下载 PDF"
+                )
+        except OperationError as e:
+            if self.browser_pool is None or not isinstance(e.__cause__, NotPdfResponse):
+                raise
+        cookies, final_url = await self.browser_pool.open(url)
+        async with self.host_limiter.slot(final_url):
+            return await self._execute_operation(
+                self._download, final_url, path, cookies, timeout=self.download_timeout, error_prefix="浏览器下载 PDF"
+            )
+
+    async def download_one(self, pmid: str, directory: Optional[str] = None, force: bool = False,
+                           resolution: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        下载单篇 PDF
+        :param resolution: 已解析的地址记录，未传入时先解析
+        :return: {'pmid', 'status', 'path', 'url', 'size', 'error'}，status 为 downloaded / exists / not_found / failed
+        """
+        pmid = str(pmid).strip()
+        path = self.pdf_path(pmid, directory)
+        result: Dict[str, Any] = {"pmid": pmid, "path": path, "url": None, "size": None, "error": None}
+        if not force and os.path.exists(path):
+            result.update(status=STATUS_EXISTS, size=os.path.getsize(path))
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            try:
+                resolution = resolution or await self.resolver.resolve(pmid)
+                if resolution.get("error"):
+                    raise OperationError(resolution["error"])
+                url = result["url"] = resolution["url"]
+                if url is None:
+                    result.update(status=STATUS_NOT_FOUND, path=None, error="未找到 PDF 地址")
+                else:
+                    result.update(status=STATUS_DOWNLOADED, size=await self._fetch(url, path))
+            except Exception as e:
+                self.logger.warning(f"PMID {pmid} 的 PDF 下载失败: {str(e)}")
+                result.update(status=STATUS_FAILED, path=None, error=str(e))
+        PDF_DOWNLOADS.labels(result["status"]).inc()
+        return result
+
+    async def iter_download(self, pmids: List[str], directory: Optional[str] = None,
+                            force: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发下载，按完成顺序逐篇产出结果
+        - 已存在的文件不解析地址；其余 PMID 批量解析，每解析出一篇就开始下载，不等整批解析完成
+        - 并发度由工具执行引擎（max_concurrent_tasks）和按主机的限流共同决定；迭代提前结束时取消未完成的下载
+        - 同时存在的下载任务不超过 max_pending 个，名额满时暂停读取解析结果，大批量 PMID 不会一次创建全部任务
+        """
+        pmids = list(dict.fromkeys(str(pmid).strip() for pmid in pmids if str(pmid).strip()))
+        existing = [pmid for pmid in pmids if not force and os.path.exists(self.pdf_path(pmid, directory))]
+        skipped = set(existing)
+        to_resolve = [pmid for pmid in pmids if pmid not in skipped]
+        finished: "asyncio.Queue[asyncio.Future]" = asyncio.Queue()
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks: Set[asyncio.Future] = set()
+
+        def start(coroutine) -> asyncio.Future:
+            task = asyncio.ensure_future(coroutine)
+            task.add_done_callback(finished.put_nowait)
+            task.add_done_callback(tasks.discard)
+            tasks.add(task)
+            return task
+
+        def release(_):
+            pending.release()
+
+        async def start_download(pmid: str, resolution: Optional[Dict[str, Any]] = None):
+            await pending.acquire()
+            start(self.download_one(pmid, directory, force, resolution)).add_done_callback(release)
+
+        async def feed():
+            for pmid in existing:
+                await start_download(pmid)
+            async for resolution in self.resolver.iter_resolve(to_resolve):
+                await start_download(resolution["pmid"], resolution)
+
+        feeder = start(feed())
+        try:
+            remaining = len(pmids)
+            while remaining:
+                task = await finished.get()
+                if task is feeder:
+                    task.result()  # 解析阶段出错时直接抛出，避免一直等待
+                    continue
+                remaining -= 1
+                yield task.result()
+        finally:
+            for task in list(tasks):
+                task.cancel()
+
+    async def async_execute(self, pmids: List[str], directory: Optional[str] = None, force: bool = False):
+        """下载多篇 PDF，返回与去重后输入顺序一致的结果列表"""
+        results = {}
+        async for result in self.iter_download(pmids, directory, force):
+            results[result["pmid"]] = result
+        return [results[pmid] for pmid in dict.fromkeys(str(pmid).strip() for pmid in pmids) if pmid in results]
+
+    def execute(self, pmids: List[str], directory: Optional[str] = None, force: bool = False):
+        """同步入口，在新的事件循环中下载，结束后关闭会话"""
+        async def run():
+            try:
+                return await self.async_execute(pmids, directory, force)
+            finally:
+                await self.close()
+        return asyncio.run(run())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resolution_cache": self.resolver.cache.stats() if self.resolver.cache else None,
+            "hosts": self.host_limiter.stats(),
+            "browser_pool": self.browser_pool.stats() if self.browser_pool else None,
+        }
+
+    async def close(self):
+        """关闭 HTTP 会话和浏览器会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.browser_pool is not None:
+            await self.browser_pool.close()
@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from src.config import Config
+from src.metrics import PDF_EXTRACT_DURATION, PDF_EXTRACT_PAGES, PDF_EXTRACTIONS
+from src.tools.base import BaseTool
+from src.tools.cache import SQLiteCache
+
+# 提取结果状态
+STATUS_EXTRACTED = "extracted"
+STATUS_UNCHANGED = "unchanged"
+STATUS_MISSING = "missing"
+STATUS_FAILED = "failed"
+
+# 独占一行的章节标题，允许 "2."、"2.1"、"II." 等编号和结尾冒号
+_HEADING_PATTERN = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*"
+    r"(abstract|summary|introduction|background|methods?|materials and methods|patients and methods|"
+    r"results|results and discussion|discussion|conclusions?|limitations|acknowledge?ments?|funding|"
+    r"references|bibliography|literature cited)\s*:?$",
+    re.IGNORECASE,
+)
+_REFERENCE_START = re.compile(r"^(?:\[\d+\]|\d+\.)\s+")
+_ABSTRACT_HEADINGS = {"abstract", "summary"}
+_REFERENCE_HEADINGS = {"references", "bibliography", "literature cited"}
+
+
+def file_sha256(path: str) -> str:
+    """文件内容的 SHA-256（阻塞，hashlib 计算时释放 GIL，适合在线程中执行）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_pdf_text(path: str) -> Dict[str, Any]:
+    """
+    在子进程中解析 PDF 全文并划分章节
+    :return: {'pages', 'title', 'abstract', 'sections': [{'heading', 'text'}], 'references', 'seconds'}
+    """
+    from pypdf import PdfReader  # 只在工作进程中导入
+
+    started = time.process_time()
+    reader = PdfReader(path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    lines = [line.strip() for text in pages for line in text.splitlines()]
+
+    # 按独占一行的常见章节标题切分，第一个标题之前是标题和作者信息
+    sections: List[Dict[str, Any]] = []
+    front: List[str] = []
+    for line in lines:
+        match = _HEADING_PATTERN.match(line) if len(line) < 60 else None
+        if match:
+            sections.append({"heading": match.group(1).lower(), "lines": []})
+        elif sections:
+            sections[-1]["lines"].append(line)
+        elif line:
+            front.append(line)
+
+    abstract, references, body = None, [], []
+    for section in sections:
+        if section["heading"] in _ABSTRACT_HEADINGS and abstract is None:
+            abstract = _join_lines(section["lines"])
+        elif section["heading"] in _REFERENCE_HEADINGS:
+            references.extend(_split_references(section["lines"]))
+        else:
+            body.append({"heading": section["heading"], "text": _join_lines(section["lines"])})
+    if not sections:
+        # 找不到任何章节标题时整篇作为一个章节
+        body = [{"heading": None, "text": _join_lines(front)}]
+
+    title = (reader.metadata.title if reader.metadata else None) or ""
+    if len(title.strip()) < 10:
+        title = front[0] if front else ""
+    return {
+        "pages": len(pages),
+        "title": title.strip(),
+        "abstract": abstract,
+        "sections": [section for section in body if section["text"]],
+        "references": references,
+        "seconds": time.process_time() - started,
+    }
+
+
+def _join_lines(lines: List[str]) -> str:
+    """合并折行：行尾连字符直接拼接，空行视为段落分隔"""
+    text = "\n".join(lines)
+    text = re.sub(r"-\n(?=[a-z])", "", text)
+    text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
+    return re.sub(r"[ \t]+", " ", text).strip()
+
+
+def _split_references(lines: List[str]) -> List[str]:
+    """按 "[1]" 或 "1." 开头的行切分参考文献，没有编号时每个非空行一条"""
+    if not any(_REFERENCE_START.match(line) for line in lines):
+        return [line for line in lines if line]
+    references: List[str] = []
+    for line in lines:
+        if _REFERENCE_START.match(line) or not references:
+            references.append(line)
+        elif line:
+            references[-1] += " " + line
+    return [re.sub(r"\s+", " ", reference).strip() for reference in references]
+
+
+class PdfExtractTool(BaseTool):
+    """
+    PDF 全文提取
+    - 解析是 CPU 密集型操作，在进程池中执行（默认与 CPU 核数相同），不阻塞事件循环
+    - 结果按 PMID 存入文章缓存所在的数据库（fulltext 表），文件内容哈希不变时跳过
+    - 统计提取页数和有提取任务进行时的墙钟时间，得到页/秒吞吐
+    """
+
+    def __init__(self, name: str, config: Config = None):
+        super().__init__(name, config)
+        options = (config.get("pdf_extract") if config else None) or {}
+        download_options = (config.get("pdf_download") if config else None) or {}
+        self.directory = download_options.get("directory", "./download")
+        self.workers = options.get("workers") or os.cpu_count() or 1
+        default_path = (config.get("article_cache.path") if config else None) or "./cache/pubmed.db"
+        self.cache = SQLiteCache.from_config(config, "fulltext_cache", table="fulltext", default_path=default_path)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # iter_extract 进行中和待读取的提取数上限；略多于执行引擎名额，保持进程池不空闲
+        self.max_pending = options.get("max_pending", self.max_concurrent_tasks * 2)
+
+        self.counts = {status: 0 for status in (STATUS_EXTRACTED, STATUS_UNCHANGED, STATUS_MISSING, STATUS_FAILED)}
+        self.pages = 0
+        self.busy_seconds = 0.0
+        self._active = 0
+        self._busy_since = 0.0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """首次提取时才启动进程池；服务进程中有线程，使用 spawn 而不是 fork"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _enter_busy(self):
+        if self._active == 0:
+            self._busy_since = time.monotonic()
+        self._active += 1
+
+    def _leave_busy(self):
+        self._active -= 1
+        if self._active == 0:
+            self.busy_seconds += time.monotonic() - self._busy_since
+
+    async def extract(self, pmid: str, path: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        提取单篇 PDF，path 默认为下载目录中的 <pmid>.pdf
+        :param force: 内容未变也重新提取
+        :return: {'pmid', 'status', 'pages', 'sections', 'references', 'error'}，
+                 status 为 extracted / unchanged / missing / failed
+        """
+        pmid = str(pmid).strip()
+        path = path or os.path.join(self.directory, f"{pmid}.pdf")
+        result: Dict[str, Any] = {"pmid": pmid, "pages": None, "sections": None, "references": None, "error": None}
+        if not os.path.exists(path):
+            result.update(status=STATUS_MISSING, error="PDF 文件不存在")
+        else:
+            self._enter_busy()
+            try:
+                record = await self._extract_file(pmid, path, force)
+                result.update(
+                    status=record.pop("status"),
+                    pages=record["pages"],
+                    sections=len(record["sections"]),
+                    references=len(record["references"]),
+                )
+            except Exception as e:
+                self.logger.warning(f"PMID {pmid} 的 PDF 提取失败: {str(e)}")
+                result.update(status=STATUS_FAILED, error=str(e))
+            finally:
+                self._leave_busy()
+        self.counts[result["status"]] += 1
+        PDF_EXTRACTIONS.labels(result["status"]).inc()
+        return result
+
+    async def _extract_file(self, pmid: str, path: str, force: bool) -> Dict[str, Any]:
+        async with self.engine.slot():
+            sha256 = await self.engine.run_blocking(file_sha256, path)
+            entry = self.cache.get(pmid) if self.cache else None
+            if entry and entry.value.get("sha256") == sha256 and not force:
+                return {**entry.value, "status": STATUS_UNCHANGED}
+            pool = self.pool
+            try:
+                record = await asyncio.get_running_loop().run_in_executor(pool, extract_pdf_text, path)
+            except BrokenProcessPool:
+                # 工作进程异常退出（如解析时内存不足）后进程池不可再用，下次提取时重建
+                if self._pool is pool:
+                    self._pool = None
+                    pool.shutdown(wait=False)
+                raise
+        PDF_EXTRACT_DURATION.labels().observe(record.pop("seconds"))
+        PDF_EXTRACT_PAGES.labels().inc(record["pages"])
+        self.pages += record["pages"]
+        record = {"pmid": pmid, "sha256": sha256, **record, "extracted_at": time.time()}
+        if self.cache:
+            self.cache.set(pmid, record)
+        return {**record, "status": STATUS_EXTRACTED}
+
+    async def iter_extract(self, items: List[Tuple[str, Optional[str]]], force: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发提取，按完成顺序逐篇产出结果；同时进行的提取数受工具执行引擎限制
+        - 进行中和已完成未读取的提取合计不超过 max_pending 个，调用方暂停读取时不再启动新的提取；迭代提前结束时取消未完成的提取
+        :param items: [(pmid, path)]，path 为 None 时使用下载目录
+        """
+        started, pages = time.monotonic(), self.pages
+        finished: "asyncio.Queue[asyncio.Future]" = asyncio.Queue()
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks: Set[asyncio.Future] = set()
+
+        def start(coroutine) -> asyncio.Future:
+            task = asyncio.ensure_future(coroutine)
+            task.add_done_callback(finished.put_nowait)
+            task.add_done_callback(tasks.discard)
+            tasks.add(task)
+            return task
+
+        async def feed():
+            for pmid, path in items:
+                await pending.acquire()
+                start(self.extract(pmid, path, force))
+
+        feeder = start(feed())
+        try:
+            remaining = len(items)
+            while remaining:
+                task = await finished.get()
+                if task is feeder:
+                    task.result()
+                    continue
+                remaining -= 1
+                pending.release()
+                yield task.result()
+        finally:
+            for task in list(tasks):
+                task.cancel()
+        elapsed = time.monotonic() - started
+        if items:
+            self.logger.info(f"提取 {len(items)} 篇 PDF，共 {self.pages - pages} 页，"
+                             f"{(self.pages - pages) / elapsed if elapsed else 0:.1f} 页/秒")
+
+    async def async_execute(self, pmids: List[str], force: bool = False) -> List[Dict[str, Any]]:
+        """提取下载目录中这些 PMID 的 PDF，返回与去重后输入顺序一致的结果列表"""
+        pmids = list(dict.fromkeys(str(pmid).strip() for pmid in pmids if str(pmid).strip()))
+        results = {}
+        async for result in self.iter_extract([(pmid, None) for pmid in pmids], force):
+            results[result["pmid"]] = result
+        return [results[pmid] for pmid in pmids]
+
+    def get_text(self, pmid: str) -> Optional[Dict[str, Any]]:
+        """读取已提取的全文，未提取时返回 None"""
+        entry = self.cache.get(str(pmid).strip()) if self.cache else None
+        return entry.value if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        busy = self.busy_seconds + (time.monotonic() - self._busy_since if self._active else 0.0)
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            **self.counts,
+            "pages": self.pages,
+            "busy_seconds": busy,
+            "pages_per_second": self.pages / busy if busy else 0.0,
+        }
+
+    def close(self):
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
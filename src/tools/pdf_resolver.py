@@ -0,0 +1,195 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.config import Config
+from src.tools.base import BaseTool
+from src.tools.cache import SQLiteCache
+from src.tools.eutils import IDCONV_BATCH_SIZE, IDCONV_URL, chunked, get_eutils_client
+from src.tools.rate_limiter import TokenBucketRateLimiter, get_ncbi_rate_limiter
+from src.tools.resilience import get_circuit_breaker
+
+# PMC 文章的 PDF 地址
+PMC_PDF_URL = "https://pmc.ncbi.nlm.nih.gov/articles/{pmcid}/pdf/"
+# 一次 FindIt 向 NCBI 发出的请求数上限（EFetch 文章记录，以及部分出版商规则中的 PMC / ELink 查询）
+DEFAULT_FINDIT_NCBI_REQUESTS = 2
+# CrossRef 的请求速率（次/秒），与 NCBI 限流器分开计算
+DEFAULT_CROSSREF_RATE_LIMIT = 5
+
+_crossref_rate_limiter: Optional[TokenBucketRateLimiter] = None
+
+
+def get_crossref_rate_limiter(config=None) -> TokenBucketRateLimiter:
+    """获取进程内共享的 CrossRef 限流器，速率读取 pdf_download.crossref_rate_limit"""
+    global _crossref_rate_limiter
+    if _crossref_rate_limiter is None:
+        rate = (config.get("pdf_download.crossref_rate_limit") if config else None) or DEFAULT_CROSSREF_RATE_LIMIT
+        starvation_timeout = (config.get("starvation_timeout") if config else None) or 10.0
+        _crossref_rate_limiter = TokenBucketRateLimiter(rate, name="crossref", starvation_timeout=starvation_timeout)
+    return _crossref_rate_limiter
+
+
+def find_pdf_url(pmid: str, doi: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    用 metapub FindIt 按出版商规则推导 PMID 对应的 PDF 地址（阻塞，只请求 NCBI 和出版商）
+    :param doi: 已知的 DOI
+    :return: {'doi', 'url', 'source', 'title', 'journal'}，找不到时 url 为 None，title / journal 供 CrossRef 检索
+    """
+    from metapub import FindIt
+
+    source = FindIt(pmid)
+    pma = source.pma
+    doi = doi or getattr(source, "doi", None) or (pma.doi if pma is not None else None)
+    return {
+        "doi": doi,
+        "url": source.url,
+        "source": "findit" if source.url else None,
+        "title": pma.title if pma is not None else None,
+        "journal": pma.journal if pma is not None else None,
+    }
+
+
+def crossref_pdf_url(doi: Optional[str] = None, title: Optional[str] = None,
+                     journal: Optional[str] = None) -> Optional[str]:
+    """
+    从 CrossRef 记录的 link 中选出 PDF 链接（阻塞），有 DOI 时按 DOI 精确查找，否则按标题和期刊检索
+    """
+    from metapub import CrossRefFetcher
+
+    crossref = CrossRefFetcher().cr
+    if doi:
+        works = [crossref.works(ids=doi).get("message", {})]
+    else:
+        result = crossref.works(query_bibliographic=title, query_container_title=journal, limit=1)
+        works = result.get("message", {}).get("items", [])
+    for work in works:
+        links = [link for link in work.get("link", []) if isinstance(link, dict) and link.get("URL")]
+        for link in links:
+            if link.get("content-type") == "application/pdf" or link["URL"].lower().endswith(".pdf"):
+                return link["URL"]
+        if links:
+            return links[0]["URL"]
+    return None
+
+
+class PdfResolverTool(BaseTool):
+    """
+    PMID → DOI / PMCID → PDF 地址的解析层
+    - 结果持久化到 SQLite，找到地址和找不到地址的结果分别按 ttl 和 negative_ttl 过期，重复运行几乎不再请求上游
+    - 未命中缓存的 PMID 按每批 200 个通过 PMC ID Converter 批量换取 DOI 和 PMCID，PMC 中的文章直接得到 PDF 地址
+    - 其余文章才逐篇运行 FindIt，找不到时再查 CrossRef（阻塞，在工具线程池中执行），并复用批量阶段得到的 DOI
+    - FindIt 按其发出的 NCBI 请求数获取 NCBI 令牌；CrossRef 使用单独的限流器和熔断器，不占用 NCBI 的配额
+    - 逐篇解析由 max_concurrent_tasks 个工作协程依次领取，调用方读取变慢时暂停领取
+    """
+
+    def __init__(self, name: str, config: Config = None):
+        super().__init__(name, config)
+        options = (config.get("pdf_resolution_cache") if config else None) or {}
+        download_options = (config.get("pdf_download") if config else None) or {}
+        self.cache = SQLiteCache.from_config(config, "pdf_resolution_cache", table="pdf_urls")
+        self.negative_ttl = options.get("negative_ttl", 24 * 3600)
+        self.pmc_pdf_url = download_options.get("pmc_pdf_url", PMC_PDF_URL)
+        self.idconv_url = download_options.get("idconv_url", IDCONV_URL)
+        self.findit_ncbi_requests = download_options.get("findit_ncbi_requests", DEFAULT_FINDIT_NCBI_REQUESTS)
+        # FindIt 和 ID Converter 都会请求 NCBI
+        self.rate_limiter = get_ncbi_rate_limiter(config)
+        self.circuit_breaker = get_circuit_breaker("ncbi", config)
+        self.crossref_rate_limiter = get_crossref_rate_limiter(config)
+        self.crossref_circuit_breaker = get_circuit_breaker("crossref", config)
+        self.client = get_eutils_client(config)
+
+    def _store(self, records: List[Dict[str, Any]]):
+        """写入缓存，找不到地址的结果使用较短的 negative_ttl；出错的结果不缓存"""
+        if not self.cache:
+            return
+        found = {record["pmid"]: record for record in records if record["url"] and not record.get("error")}
+        missing = {record["pmid"]: record for record in records if not record["url"] and not record.get("error")}
+        self.cache.set_many(found)
+        self.cache.set_many(missing, ttl=self.negative_ttl)
+
+    async def resolve(self, pmid: str, doi: Optional[str] = None) -> Dict[str, Any]:
+        """
+        解析单篇文章的 PDF 地址
+        :param doi: 批量阶段已得到的 DOI
+        :return: {'pmid', 'doi', 'pmcid', 'url', 'source'}，失败时另含 error
+        """
+        pmid = str(pmid).strip()
+        entry = self.cache.get(pmid) if self.cache else None
+        if entry:
+            return entry.value
+        record = {"pmid": pmid, "doi": doi, "pmcid": None, "url": None, "source": None}
+        try:
+            found = await self._execute_operation(
+                find_pdf_url, pmid, doi,
+                rate_cost=self.findit_ncbi_requests,
+                error_prefix="解析 PDF 地址"
+            )
+            record.update(doi=found["doi"], url=found["url"], source=found["source"])
+            if record["url"] is None and (found["doi"] or found["title"]):
+                url = await self._execute_operation(
+                    crossref_pdf_url, found["doi"], found["title"], found["journal"],
+                    rate_limiter=self.crossref_rate_limiter,
+                    circuit_breaker=self.crossref_circuit_breaker,
+                    error_prefix="CrossRef 查询"
+                )
+                record.update(url=url, source="crossref" if url else None)
+        except Exception as e:
+            self.logger.warning(f"PMID {pmid} 的 PDF 地址解析失败: {str(e)}")
+            return {**record, "error": str(e)}
+        self._store([record])
+        return record
+
+    async def iter_resolve(self, pmids: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        批量解析，每个 PMID 产出一条记录：先产出缓存命中和 PMC 文章，再按完成顺序产出逐篇解析的结果
+        """
+        pmids = list(dict.fromkeys(str(pmid).strip() for pmid in pmids if str(pmid).strip()))
+        cached = self.cache.get_many(pmids) if self.cache else {}
+        for entry in cached.values():
+            yield entry.value
+
+        missing = [pmid for pmid in pmids if pmid not in cached]
+        converted: Dict[str, Dict[str, Optional[str]]] = {}
+        for chunk in chunked(missing, IDCONV_BATCH_SIZE):
+            try:
+                converted.update(await self._execute_operation(
+                    self.client.convert_ids, chunk, self.idconv_url, error_prefix="PMC ID 转换"
+                ))
+            except Exception as e:
+                # ID 转换失败不影响结果，只是这批文章都要逐篇解析
+                self.logger.warning(f"PMC ID 转换失败 ({len(chunk)} 篇): {str(e)}")
+            records = [
+                {"pmid": pmid, "doi": converted[pmid]["doi"], "pmcid": converted[pmid]["pmcid"],
+                 "url": self.pmc_pdf_url.format(pmcid=converted[pmid]["pmcid"]), "source": "pmc"}
+                for pmid in chunk if (converted.get(pmid) or {}).get("pmcid")
+            ]
+            self._store(records)
+            for record in records:
+                yield record
+
+        rest = [pmid for pmid in missing if not (converted.get(pmid) or {}).get("pmcid")]
+        # 固定数量的工作协程逐个领取，结果队列满时暂停领取，而不是一次性为全部 PMID 创建任务
+        resolved: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=self.max_concurrent_tasks)
+        pending = iter(rest)
+
+        async def worker():
+            for pmid in pending:
+                doi = (converted.get(pmid) or {}).get("doi")
+                try:
+                    record = await self.resolve(pmid, doi)
+                except Exception as e:
+                    record = {"pmid": pmid, "doi": doi, "pmcid": None, "url": None, "source": None, "error": str(e)}
+                await resolved.put(record)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.max_concurrent_tasks, len(rest)))]
+        try:
+            for _ in rest:
+                yield await resolved.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def async_execute(self, pmids: List[str]) -> List[Dict[str, Any]]:
+        """批量解析，返回与去重后输入顺序一致的结果列表"""
+        records = {}
+        async for record in self.iter_resolve(pmids):
+            records[record["pmid"]] = record
+        return [records[pmid] for pmid in dict.fromkeys(str(pmid).strip() for pmid in pmids) if pmid in records]
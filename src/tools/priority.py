@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+# 优先级：数值越小越优先
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BULK: "bulk"}
+PRIORITY_VALUES = {name: value for value, name in PRIORITY_NAMES.items()}
+
+# 当前调用链的优先级，由 EasyAgent 在创建工具任务时设置，执行引擎和限流器据此排队
+current_priority: ContextVar[int] = ContextVar("current_priority", default=NORMAL)
+
+
+def parse_priority(priority) -> int:
+    """接受 'interactive' / 'normal' / 'bulk' 或对应的整数"""
+    if isinstance(priority, int) and priority in PRIORITY_NAMES:
+        return priority
+    if isinstance(priority, str) and priority in PRIORITY_VALUES:
+        return PRIORITY_VALUES[priority]
+    raise ValueError(f"未知的优先级: {priority}")
+
+
+@contextmanager
+def priority_scope(priority):
+    """在 with 块内（包括其中创建的任务）使用指定优先级，priority 为 None 时不改变"""
+    if priority is None:
+        yield
+        return
+    token = current_priority.set(parse_priority(priority))
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "enqueued", "future")
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class PrioritySemaphore:
+    """
+    按优先级放行的信号量
+    - 有空闲名额时优先放行高优先级的等待者，同一优先级内先到先得
+    - class_limits 限制某个优先级最多占用的名额（如 bulk 只能用剩余容量，始终为交互请求留出余量）
+    - 防饿死：等待超过 starvation_timeout 的请求按最高优先级参与排序（仍受 class_limits 限制）
+    """
+
+    def __init__(self, value: int, class_limits: Optional[Dict[int, int]] = None,
+                 starvation_timeout: float = 10.0):
+        self._value = value
+        self._class_limits = class_limits or {}
+        self.starvation_timeout = starvation_timeout
+        self._in_use = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def waiting_by_class(self) -> Dict[int, int]:
+        counts = {priority: 0 for priority in PRIORITY_NAMES}
+        for waiter in self._waiters:
+            counts[waiter.priority] += 1
+        return counts
+
+    def _can_take(self, priority: int) -> bool:
+        return self._value > 0 and self._in_use[priority] < self._class_limits.get(priority, float("inf"))
+
+    def _pick(self) -> Optional[_Waiter]:
+        now = time.monotonic()
+        best, best_key = None, None
+        for waiter in self._waiters:
+            if waiter.future.done() or not self._can_take(waiter.priority):
+                continue
+            starving = now - waiter.enqueued >= self.starvation_timeout
+            key = (INTERACTIVE if starving else waiter.priority, waiter.seq)
+            if best_key is None or key < best_key:
+                best, best_key = waiter, key
+        return best
+
+    def _wake(self):
+        while self._value > 0:
+            waiter = self._pick()
+            if waiter is None:
+                return
+            self._waiters.remove(waiter)
+            self._value -= 1
+            self._in_use[waiter.priority] += 1
+            waiter.future.set_result(None)
+
+    async def acquire(self, priority: int = NORMAL):
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._wake()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已获得名额但调用方被取消，归还名额
+                self.release(priority)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, priority: int = NORMAL):
+        self._value += 1
+        self._in_use[priority] -= 1
+        self._wake()
+
+
+class WaitStats:
+    """按优先级统计排队等待时间，保留最近的样本用于计算分位数"""
+
+    def __init__(self, window: int = 1000):
+        self._count = {priority: 0 for priority in PRIORITY_NAMES}
+        self._total = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._max = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._recent: Dict[int, Deque[float]] = {priority: deque(maxlen=window) for priority in PRIORITY_NAMES}
+
+    def observe(self, priority: int, seconds: float):
+        self._count[priority] += 1
+        self._total[priority] += seconds
+        self._max[priority] = max(self._max[priority], seconds)
+        self._recent[priority].append(seconds)
+
+    def stats(self, waiting: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+        result = {}
+        for priority, name in PRIORITY_NAMES.items():
+            recent = sorted(self._recent[priority])
+            result[name] = {
+                "queue_depth": (waiting or {}).get(priority, 0),
+                "acquired": self._count[priority],
+                "avg_wait": self._total[priority] / self._count[priority] if self._count[priority] else 0.0,
+                "p99_wait": recent[min(len(recent) - 1, int(0.99 * len(recent)))] if recent else 0.0,
+                "max_wait": self._max[priority],
+            }
+        return result
@@ -1,6 +1,17 @@
-from typing import Any, Dict
-from metapub import PubMedFetcher
-from src.tools.base import BaseTool
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from src.tools.base import TIMEOUT_BATCH, TIMEOUT_SINGLE, BaseTool
+from src.tools.rate_limiter import get_ncbi_rate_limiter
+from src.tools.resilience import get_circuit_breaker
+from src.tools.cache import SQLiteCache
+from src.tools.eutils import (
+    DEFAULT_EFETCH_BATCH_SIZE,
+    chunked,
+    get_eutils_client,
+)
+from src.tools.local_index import get_local_index
+from src.tools.pubmed_parser import PubmedArticleSetParser, normalize_fields, project
+from src.tools.priority import priority_scope
 from src.logger import logger
 
 class PubMedGetArticleTool(BaseTool):
@@ -10,37 +21,179 @@ class PubMedGetArticleTool(BaseTool):
         :param config: 配置对象
         """
         super().__init__(name, config=config)
-        self.fetch = PubMedFetcher()
+        self.batch_size = (config.get("efetch_batch_size") if config else None) or DEFAULT_EFETCH_BATCH_SIZE
+        self.index = None
+        self.cache = None
+        if config and config.get("pubmed_backend") == "local":
+            # 本地 MEDLINE 索引本身就是持久化存储，不再叠加缓存和限流
+            self.index = get_local_index(config)
+        else:
+            self.rate_limiter = get_ncbi_rate_limiter(config)
+            self.circuit_breaker = get_circuit_breaker("ncbi", config)
+            self.client = get_eutils_client(config)
+            # 记录格式变化后使用新表，避免读到只含 6 个字段的旧缓存
+            self.cache = SQLiteCache.from_config(config, "article_cache", table="articles_v2")
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        # 文章写入缓存后的回调，参数为 {pmid: 文章记录}（如重排索引的增量更新）
+        self.listeners: List[Callable[[Dict[str, Dict]], None]] = []
 
-    def execute(self, pmid: str) -> dict:
-        """同步获取"""
-        try:
-            article = self.fetch.article_by_pmid(pmid)
-            return self._format_article(article, pmid)
-        except Exception as e:
-            self.logger.error(f"同步获取失败 PMID {pmid}: {str(e)}")
-            raise
+    def execute(self, pmid: str = None, pmids: List[str] = None, fields=None):
+        """
+        同步获取：在新的事件循环中走异步路径，与异步调用共用 EUtilsClient、文章缓存、限流器和熔断器
+        不能在正在运行的事件循环中调用，异步代码应使用 async_execute
+        """
+        return asyncio.run(self.async_execute(pmid=pmid, pmids=pmids, fields=fields))
 
-    async def async_execute(self, pmid: str) -> dict:
-        """异步获取"""
+    async def async_execute(self, pmid: str = None, pmids: List[str] = None, fields=None):
+        """
+        异步获取，传入 pmids 时走批量 EFetch
+        :param fields: 字段投影（逗号分隔或列表），只返回这些字段；未启用缓存时解析也只处理这些字段
+        """
+        fields = normalize_fields(fields)
+        if pmids is not None:
+            return await self._async_execute_batch(pmids, fields)
+        if self.cache:
+            entry = self.cache.get(str(pmid))
+            if entry:
+                if entry.stale:
+                    self._schedule_refresh([str(pmid)])
+                return project(entry.value, fields)
         try:
-            article = await self._execute_operation(
-                self.fetch.article_by_pmid,
-                pmid,
+            fetched = await self._execute_operation(
+                self._async_fetch_chunk,
+                [str(pmid)],
+                self._parse_fields(fields),
                 error_prefix="获取文章"
             )
-            return self._format_article(article, pmid)
+            result = fetched.get(str(pmid))
+            if result and self.cache:
+                self._store({str(pmid): result})
+            return project(result, fields) if result else None
         except Exception as e:
             self.logger.error(f"异步获取失败 PMID {pmid}: {str(e)}")
             raise
 
-    def _format_article(self, article, pmid):
-        """统一格式化文章信息"""
-        return {
-            'pmid': pmid,
-            'title': article.title,
-            'abstract': article.abstract,
-            'authors': article.authors,
-            'journal': article.journal,
-            'year': article.year
-        }
+    async def _async_execute_batch(self, pmids: List[str], fields: Optional[frozenset] = None) -> List[Dict]:
+        """
+        批量获取：按 batch_size 分组发起 EFetch POST，每组只请求一次上游
+        :param pmids: PMID 列表
+        :param fields: 字段投影
+        :return: 与输入顺序一致的结果列表，缺失的记录以 {'pmid', 'error'} 表示
+        """
+        normalized = self._normalize_pmids(pmids)
+        results = {}
+        missing = normalized
+        if self.cache:
+            cached = self.cache.get_many(normalized)
+            results = {pmid: entry.value for pmid, entry in cached.items()}
+            stale = [pmid for pmid, entry in cached.items() if entry.stale]
+            if stale:
+                self._schedule_refresh(stale)
+            missing = [pmid for pmid in normalized if pmid not in cached]
+
+        for chunk in chunked(missing, self.batch_size):
+            try:
+                fetched = await self._execute_operation(
+                    self._async_fetch_chunk,
+                    chunk,
+                    self._parse_fields(fields),
+                    error_prefix="批量获取文章",
+                    timeout_kind=self._timeout_kind(chunk)
+                )
+            except Exception as e:
+                self.logger.error(f"批量获取失败 ({len(chunk)} 篇): {str(e)}")
+                for pmid in chunk:
+                    results[pmid] = {"pmid": pmid, "error": str(e)}
+                continue
+            results.update(fetched)
+            if self.cache:
+                self._store(fetched)
+        return self._collect_results(pmids, results, fields)
+
+    def _schedule_refresh(self, pmids: List[str]):
+        """后台刷新过期的缓存条目，同一 PMID 同时只刷新一次"""
+        pending = [pmid for pmid in pmids if pmid not in self._refreshing]
+        if not pending:
+            return
+        self._refreshing.update(pending)
+        # 后台刷新不阻塞前台请求
+        with priority_scope("bulk"):
+            task = asyncio.create_task(self._refresh(pending))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, pmids: List[str]):
+        """重新获取过期条目并写回缓存"""
+        try:
+            for chunk in chunked(pmids, self.batch_size):
+                fetched = await self._execute_operation(
+                    self._async_fetch_chunk,
+                    chunk,
+                    error_prefix="刷新缓存",
+                    timeout_kind=self._timeout_kind(chunk)
+                )
+                self._store(fetched)
+        except Exception as e:
+            self.logger.warning(f"后台刷新缓存失败: {str(e)}")
+        finally:
+            self._refreshing.difference_update(pmids)
+
+    def _store(self, articles: Dict[str, Dict]):
+        """写入缓存并通知回调，回调出错不影响获取结果"""
+        self.cache.set_many(articles)
+        for listener in self.listeners:
+            try:
+                listener(articles)
+            except Exception as e:
+                self.logger.warning(f"缓存写入回调失败: {str(e)}")
+
+    @staticmethod
+    def _timeout_kind(chunk: List[str]) -> str:
+        """多 PMID 的 EFetch 与单篇获取分别统计超时"""
+        return TIMEOUT_BATCH if len(chunk) > 1 else TIMEOUT_SINGLE
+
+    def _parse_fields(self, fields: Optional[frozenset]) -> Optional[frozenset]:
+        """启用缓存时总是解析完整记录写入缓存，投影只作用于返回结果"""
+        return None if self.cache else fields
+
+    async def _async_fetch_chunk(self, pmids: List[str], fields: Optional[frozenset] = None) -> Dict[str, Dict]:
+        """通过异步客户端一次 EFetch 获取一组 PMID，返回 PMID -> 记录"""
+        if self.index is not None:
+            return await self.engine.run_blocking(self.index.get_records, pmids)
+        records = {}
+        async for record in self._aiter_fetch_chunk(pmids, fields):
+            records[record["pmid"]] = record
+        return records
+
+    async def _aiter_fetch_chunk(self, pmids: List[str], fields: Optional[frozenset] = None) -> AsyncIterator[Dict]:
+        """
+        流式 EFetch：每收到一块响应就增量解析，逐篇产出记录，不保留完整响应体和整棵 XML 树
+        每块只有几十 KB，直接在事件循环中解析，单次占用时间很短
+        """
+        parser = PubmedArticleSetParser(fields)
+        async for data in self.client.iter_efetch_pubmed_xml(pmids):
+            for record in parser.feed(data):
+                yield project(record, fields)
+        for record in parser.close():
+            yield project(record, fields)
+
+    @staticmethod
+    def _normalize_pmids(pmids: List[str]) -> List[str]:
+        """去重并保持顺序"""
+        return list(dict.fromkeys(str(pmid).strip() for pmid in pmids))
+
+    @staticmethod
+    def _collect_results(pmids: List[str], results: Dict[str, Dict],
+                         fields: Optional[frozenset] = None) -> List[Dict]:
+        """按输入顺序组装结果并应用字段投影，未返回的 PMID 记录错误"""
+        collected = []
+        for pmid in pmids:
+            result = results.get(str(pmid).strip())
+            if result is None:
+                collected.append({"pmid": str(pmid).strip(), "error": "文章未找到"})
+            elif "error" in result:
+                collected.append(result)
+            else:
+                collected.append(project(result, fields))
+        return collected
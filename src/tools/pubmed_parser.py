@@ -0,0 +1,268 @@
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_YEAR_PATTERN = re.compile(r"(\d{4})")
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    """元素的完整文本（包含 <i>、<sup> 等内联标签中的文本）"""
+    if elem is None:
+        return ""
+    return "".join(elem.itertext()).strip()
+
+
+def _author_name(author: ET.Element) -> str:
+    """与 metapub 一致的作者格式：LastName Initials，团体作者使用 CollectiveName"""
+    collective = author.findtext("CollectiveName")
+    if collective:
+        return collective.strip()
+    last_name = (author.findtext("LastName") or "").strip()
+    initials = (author.findtext("Initials") or "").strip()
+    return f"{last_name} {initials}".strip()
+
+
+def _pub_year(article: ET.Element) -> str:
+    """出版年份，依次查找 PubDate/Year、PubDate/MedlineDate 和 ArticleDate"""
+    pub_date = article.find("Journal/JournalIssue/PubDate")
+    if pub_date is not None:
+        year = pub_date.findtext("Year")
+        if year:
+            return year.strip()
+        match = _YEAR_PATTERN.search(pub_date.findtext("MedlineDate") or "")
+        if match:
+            return match.group(1)
+    return (article.findtext("ArticleDate/Year") or "").strip()
+
+
+# 与 API Article 模型一致的字段
+ARTICLE_FIELDS = (
+    "pmid", "title", "abstract", "authors", "first_author", "last_author",
+    "journal", "year", "mesh_terms", "keywords",
+)
+_AUTHOR_FIELDS = {"authors", "first_author", "last_author"}
+
+
+def normalize_fields(fields) -> Optional[frozenset]:
+    """
+    解析字段投影，接受逗号分隔的字符串或列表；None 或空表示全部字段
+    :raises ValueError: 包含未知字段
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    requested = {field.strip() for field in fields if field and field.strip()}
+    unknown = requested - set(ARTICLE_FIELDS)
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(sorted(unknown))}，可选字段: {', '.join(ARTICLE_FIELDS)}")
+    return frozenset(requested | {"pmid"})
+
+
+def project(record: Dict[str, Any], fields: Optional[frozenset]) -> Dict[str, Any]:
+    """按字段投影裁剪完整记录"""
+    if fields is None:
+        return {key: value for key, value in record.items() if key in ARTICLE_FIELDS}
+    return {key: value for key, value in record.items() if key in fields}
+
+
+def _mesh_terms(citation: ET.Element) -> Dict[str, Dict[str, Any]]:
+    """MeSH 主题词，键为 Descriptor UI；多个副主题词以 '; ' 连接"""
+    mesh_terms = {}
+    for heading in citation.iterfind("MeshHeadingList/MeshHeading"):
+        descriptor = heading.find("DescriptorName")
+        if descriptor is None:
+            continue
+        qualifiers = heading.findall("QualifierName")
+        mesh_terms[descriptor.get("UI", _text(descriptor))] = {
+            "descriptor_name": _text(descriptor),
+            # 主题词或任一副主题词标记为主要主题时即为主要主题，与 PubMed 的 [majr] 一致
+            "major_topic": descriptor.get("MajorTopicYN") == "Y"
+            or any(qualifier.get("MajorTopicYN") == "Y" for qualifier in qualifiers),
+            "qualifier_name": "; ".join(_text(qualifier) for qualifier in qualifiers) or None,
+            "qualifier_ui": "; ".join(qualifier.get("UI", "") for qualifier in qualifiers) or None,
+        }
+    return mesh_terms
+
+
+def _abstract(parent: Optional[ET.Element]) -> str:
+    if parent is None:
+        return ""
+    return "\n".join(
+        (f"{text.get('Label')}: " if text.get("Label") else "") + _text(text)
+        for text in parent.iterfind("Abstract/AbstractText")
+    )
+
+
+def _authors(parent: Optional[ET.Element]) -> List[str]:
+    if parent is None:
+        return []
+    return [name for name in (_author_name(author) for author in parent.iterfind("AuthorList/Author")) if name]
+
+
+def parse_pubmed_article(elem: ET.Element, fields: Optional[frozenset] = None) -> Optional[Dict[str, Any]]:
+    """
+    单次遍历解析一个 PubmedArticle / PubmedBookArticle 元素
+    :param fields: normalize_fields 的结果，只解析其中的字段；None 表示全部字段（另含 version 和 journal_title）
+    :return: 记录字典，无法识别的元素返回 None
+    """
+    if elem.tag == "PubmedBookArticle":
+        return _parse_book_article(elem, fields)
+    citation = elem.find("MedlineCitation")
+    if citation is None:
+        return None
+    article = citation.find("Article")
+    if article is None:
+        return None
+    pmid_elem = citation.find("PMID")
+
+    def wanted(field: str) -> bool:
+        return fields is None or field in fields
+
+    record: Dict[str, Any] = {"pmid": _text(pmid_elem)}
+    if fields is None:
+        record["version"] = int(pmid_elem.get("Version", "1")) if pmid_elem is not None else 1
+    if wanted("title"):
+        record["title"] = _text(article.find("ArticleTitle"))
+    if wanted("abstract"):
+        record["abstract"] = _abstract(article)
+    if fields is None or fields & _AUTHOR_FIELDS:
+        authors = _authors(article)
+        if wanted("authors"):
+            record["authors"] = authors
+        if wanted("first_author"):
+            record["first_author"] = authors[0] if authors else ""
+        if wanted("last_author"):
+            record["last_author"] = authors[-1] if authors else ""
+    if wanted("journal"):
+        record["journal"] = (article.findtext("Journal/ISOAbbreviation") or _text(article.find("Journal/Title"))).strip()
+    if fields is None:
+        # 期刊全称只在完整记录中保留，供本地索引的 [jt] 检索
+        record["journal_title"] = _text(article.find("Journal/Title")).strip()
+    if wanted("year"):
+        record["year"] = _pub_year(article)
+    if wanted("mesh_terms"):
+        record["mesh_terms"] = _mesh_terms(citation)
+    if wanted("keywords"):
+        record["keywords"] = [_text(keyword) for keyword in citation.iterfind("KeywordList/Keyword") if _text(keyword)]
+    return record
+
+
+def _parse_book_article(elem: ET.Element, fields: Optional[frozenset]) -> Optional[Dict[str, Any]]:
+    """解析 PubmedBookArticle（如 GeneReviews、StatPearls 章节），没有 MeSH 和期刊信息"""
+    document = elem.find("BookDocument")
+    if document is None:
+        return None
+    authors = _authors(document)
+    year = (document.findtext("Book/PubDate/Year") or "").strip()
+    record = {
+        "pmid": _text(document.find("PMID")),
+        "title": _text(document.find("ArticleTitle")) or _text(document.find("Book/BookTitle")),
+        "abstract": _abstract(document),
+        "authors": authors,
+        "first_author": authors[0] if authors else "",
+        "last_author": authors[-1] if authors else "",
+        "journal": "",
+        "year": year,
+        "mesh_terms": {},
+        "keywords": [_text(keyword) for keyword in document.iterfind("KeywordList/Keyword") if _text(keyword)],
+    }
+    return record if fields is None else project(record, fields)
+
+
+_ARTICLE_TAGS = ("PubmedArticle", "PubmedBookArticle")
+
+
+class PubmedArticleSetParser:
+    """
+    增量解析 EFetch 返回的 PubmedArticleSet：按块喂入字节，每篇文章结束时立即解析并清除对应元素，
+    峰值内存只与单篇文章大小有关，与整批文章数无关
+    """
+
+    def __init__(self, fields: Optional[frozenset] = None):
+        """
+        :param fields: normalize_fields 的结果，None 表示全部字段
+        """
+        self.fields = fields
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def _stop_start_events(self):
+        """
+        只有根节点需要 start 事件，取得根节点后改为只报告 end 事件，省去每个元素一次的 start 事件
+        XMLPullParser 没有公开的接口修改事件类型，这里调用它构造时使用的 XMLParser._setevents；
+        该方法不存在时继续接收并跳过 start 事件
+        """
+        setevents = getattr(getattr(self._parser, "_parser", None), "_setevents", None)
+        events_queue = getattr(self._parser, "_events_queue", None)
+        if setevents is not None and events_queue is not None:
+            setevents(events_queue, ("end",))
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """喂入一块数据，返回这块数据中完成的记录"""
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        """数据结束，返回剩余的记录；XML 不完整时抛出 ET.ParseError"""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        records = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                    self._stop_start_events()
+                continue
+            if elem.tag in _ARTICLE_TAGS:
+                record = parse_pubmed_article(elem, self.fields)
+                if record and record["pmid"]:
+                    records.append(record)
+                # 已解析的文章从根节点移除，元素随即释放
+                self._root.clear()
+        return records
+
+
+def iter_pubmed_article_set(chunks: Iterable[bytes], fields: Optional[frozenset] = None) -> Iterator[Dict[str, Any]]:
+    """
+    流式解析 PubmedArticleSet，逐篇产出记录
+    :param chunks: XML 字节块（如 HTTP 响应的分块）
+    """
+    parser = PubmedArticleSetParser(fields)
+    for data in chunks:
+        yield from parser.feed(data)
+    yield from parser.close()
+
+
+def parse_pubmed_article_set(xml: bytes, fields: Optional[frozenset] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    解析完整的 PubmedArticleSet
+    :return: PMID -> 记录
+    """
+    return {record["pmid"]: record for record in iter_pubmed_article_set([xml], fields)}
+
+
+def iter_medline_file(path: str) -> Iterator[Tuple[str, Any]]:
+    """
+    流式解析 MEDLINE baseline/update 文件（支持 .gz），逐篇产出后立即释放元素
+    :return: ("article", 记录字典) 或 ("delete", PMID 列表)
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end":
+                continue
+            if elem.tag == "PubmedArticle":
+                record = parse_pubmed_article(elem)
+                if record:
+                    yield "article", record
+                root.clear()
+            elif elem.tag == "DeleteCitation":
+                yield "delete", [_text(pmid) for pmid in elem.findall("PMID")]
+                root.clear()
+
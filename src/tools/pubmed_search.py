@@ -1,6 +1,9 @@
-from typing import Any, Dict, List
-from metapub import PubMedFetcher
+from typing import Any, Dict, List, Optional
 from src.tools.base import BaseTool
+from src.tools.rate_limiter import get_ncbi_rate_limiter
+from src.tools.resilience import get_circuit_breaker
+from src.tools.eutils import get_eutils_client, get_pubmed_fetcher
+from src.tools.local_index import get_local_index
 from src.logger import logger
 from src.config import Config
 
@@ -11,33 +14,138 @@ class PubMedSearchTool(BaseTool):
         :param config: 配置对象
         """
         super().__init__(name, config=config)
-        self.fetch = PubMedFetcher()
+        self.index = None
+        if config and config.get("pubmed_backend") == "local":
+            # 本地 MEDLINE 索引不访问 NCBI，无需限流
+            self.index = get_local_index(config)
+        else:
+            self.rate_limiter = get_ncbi_rate_limiter(config)
+            self.circuit_breaker = get_circuit_breaker("ncbi", config)
+            self.client = get_eutils_client(config)
+
+    @property
+    def fetch(self):
+        """metapub 只用于同步路径，首次使用时才创建"""
+        return get_pubmed_fetcher()
 
     def execute(self, query: str, max_results: int = 100) -> list:
         """同步执行"""
         try:
-            pmids = self.fetch.pmids_for_query(query, retmax=max_results)
+            if self.index is not None:
+                pmids = self.index.search(query, 0, max_results)["pmids"]
+            else:
+                pmids = self.fetch.pmids_for_query(query, retmax=max_results)
             self.logger.info(f"同步找到 {len(pmids)} 篇文献")
             return pmids
         except Exception as e:
             self.logger.error(f"同步搜索失败: {str(e)}")
             raise
 
-    async def async_execute(self, query: str, max_results: int = 100) -> list:
-        """异步执行"""
+    async def async_execute(self, query: str = None, max_results: int = 100, offset: int = 0,
+                            limit: Optional[int] = None, history: Optional[Dict] = None):
+        """
+        异步执行
+        传入 limit 时按页检索，返回 {'count', 'pmids', 'offset', 'webenv', 'query_key'}，
+        否则返回前 max_results 个 PMID 列表
+        """
+        if limit is not None:
+            return await self._async_search_page(query, offset, limit, history)
         try:
-            pmids = await self._execute_operation(
-                self.fetch.pmids_for_query,
-                query,
-                retmax=max_results,
-                error_prefix="PubMed搜索"
-            )
-            self.logger.info(f"异步找到 {len(pmids)} 篇文献")
+            pmids = await self._search_pmids(query, max_results)
+            self.logger.debug(f"异步找到 {len(pmids)} 篇文献")
             return pmids
         except Exception as e:
             self.logger.error(f"异步搜索失败: {str(e)}")
             raise
 
+    async def _async_search_page(self, query: str, offset: int, limit: int,
+                                 history: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        分页检索：首次检索保存到 ESearch history server，之后的页直接从 history 读取
+        :param history: 之前检索返回的 {'webenv', 'query_key', 'count'}
+        """
+        if self.index is not None:
+            # 检索式错误直接抛出 ValueError（接口返回 400），不经过重试
+            self.index.compile(query)
+            page = await self._execute_operation(
+                self.index.search,
+                query,
+                offset,
+                limit,
+                max_retries=1,
+                error_prefix="本地检索"
+            )
+            page.update({"offset": offset, "webenv": None, "query_key": None})
+            return page
+
+        if history and history.get("webenv") and history.get("query_key"):
+            try:
+                pmids = await self._execute_operation(
+                    self.client.efetch_history_pmids,
+                    history["webenv"],
+                    history["query_key"],
+                    retstart=offset,
+                    retmax=limit,
+                    max_retries=1,
+                    error_prefix="读取检索历史"
+                )
+                return {
+                    "count": history.get("count", 0),
+                    "pmids": pmids,
+                    "offset": offset,
+                    "webenv": history["webenv"],
+                    "query_key": history["query_key"],
+                }
+            except Exception as e:
+                # WebEnv 过期后重新检索
+                self.logger.warning(f"检索历史不可用，重新检索: {str(e)}")
+
+        page = await self._execute_operation(
+            self.client.esearch,
+            query,
+            retstart=offset,
+            retmax=limit,
+            error_prefix="PubMed搜索"
+        )
+        page["offset"] = offset
+        return page
+
+    async def _search_pmids(self, query: str, max_results: int = 100, timeout=None, max_retries=None) -> List[str]:
+        """执行一次不保存历史的 ESearch，返回 PMID 列表"""
+        if self.index is not None:
+            self.index.compile(query)
+            page = await self._execute_operation(
+                self.index.search,
+                query,
+                0,
+                max_results,
+                timeout=timeout,
+                max_retries=1,
+                error_prefix="本地检索"
+            )
+            return page["pmids"]
+        page = await self._execute_operation(
+            self.client.esearch,
+            query,
+            retmax=max_results,
+            usehistory=False,
+            timeout=timeout,
+            max_retries=max_retries,
+            error_prefix="PubMed搜索"
+        )
+        return page["pmids"]
+
+    @staticmethod
+    def _build_term(params: Dict[str, str]) -> str:
+        """将字段参数组装为 PubMed 检索式"""
+        field_tags = {
+            'journal': 'Journal',
+            'first author': '1au',
+            'year': 'dp',
+            'keyword': 'All Fields',
+        }
+        return " AND ".join(f'"{value}"[{field_tags[key]}]' for key, value in params.items())
+
     async def execute_async(self, input_data: Dict[str, str]) -> Dict[str, Any]:
         """
         执行 PubMed 搜索，接受一个包含搜索参数的字典。
@@ -55,14 +163,7 @@ class PubMedSearchTool(BaseTool):
         try:
             if query:
                 self.logger.info(f"搜索查询字符串: {query}")
-                result = await self._execute_operation(
-                    self.fetch.pmids_for_query,
-                    query,
-                    timeout=timeout,
-                    max_retries=max_retries,
-                    error_prefix="PubMed搜索"
-                )
-                return result
+                return await self._search_pmids(query, timeout=timeout, max_retries=max_retries)
             else:
                 params = {}
                 if journal:
@@ -75,13 +176,9 @@ class PubMedSearchTool(BaseTool):
                     params['keyword'] = keyword
                 if params:
                     self.logger.info(f"搜索参数: {params}")
-                    result = await self._execute_operation(
-                        lambda: self.fetch.pmids_for_query(**params),
-                        timeout=timeout,
-                        max_retries=max_retries,
-                        error_prefix="PubMed搜索"
+                    return await self._search_pmids(
+                        self._build_term(params), timeout=timeout, max_retries=max_retries
                     )
-                    return result
                 return []
 
         except Exception as e:
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from src.metrics import RATE_LIMIT_QUEUE_DEPTH, RATE_LIMIT_THROTTLED, RATE_LIMIT_WAIT
+from src.tools.priority import PRIORITY_NAMES, PrioritySemaphore, WaitStats, current_priority
+
+# NCBI E-utilities 的请求速率上限（次/秒）
+NCBI_RATE_WITHOUT_KEY = 3
+NCBI_RATE_WITH_KEY = 10
+
+
+class TokenBucketRateLimiter:
+    """
+    异步令牌桶限流器
+    - 调用方按优先级排队，同一优先级内按到达顺序，不会因超额而失败；长时间等待的低优先级调用会被提升
+    - 收到 429 后调用 backoff()，在退避期内暂停发放令牌，连续限流时退避时间指数增长
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0, name: str = "default",
+                 starvation_timeout: float = 10.0):
+        """
+        :param rate: 每秒发放的令牌数
+        :param burst: 桶容量，默认等于 rate
+        :param base_backoff: 首次限流的退避时间（秒）
+        :param max_backoff: 退避时间上限（秒）
+        :param name: 上游名称，用于指标标签
+        :param starvation_timeout: 低优先级调用等待超过该时间（秒）后按最高优先级排队
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = burst or rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._gate = PrioritySemaphore(1, starvation_timeout=starvation_timeout)
+        self.wait_stats = WaitStats()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._queue_depth_gauge = RATE_LIMIT_QUEUE_DEPTH.labels(name)
+        self._wait_histograms = {
+            priority: RATE_LIMIT_WAIT.labels(name, priority_name)
+            for priority, priority_name in PRIORITY_NAMES.items()
+        }
+        self._throttled_counter = RATE_LIMIT_THROTTLED.labels(name)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: Optional[int] = None, tokens: float = 1) -> float:
+        """
+        获取令牌，必要时排队等待
+        :param priority: 排队优先级，默认取当前调用链的优先级
+        :param tokens: 需要的令牌数，一次调用会向上游发出多个请求时按请求数获取（不超过桶容量）
+        :return: 本次等待时间（秒）
+        """
+        priority = current_priority.get() if priority is None else priority
+        tokens = min(tokens, self.capacity)
+        start = time.monotonic()
+        self.waiting += 1
+        self._queue_depth_gauge.inc()
+        try:
+            # 同一时间只有队首的调用方在等待令牌，其余按优先级排在 _gate 上
+            await self._gate.acquire(priority)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._blocked_until:
+                        await asyncio.sleep(self._blocked_until - now)
+                        continue
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        break
+                    await asyncio.sleep((tokens - self._tokens) / self.rate)
+            finally:
+                self._gate.release(priority)
+        finally:
+            self.waiting -= 1
+            self._queue_depth_gauge.dec()
+        waited = time.monotonic() - start
+        self._wait_histograms[priority].observe(waited)
+        self.wait_stats.observe(priority, waited)
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def backoff(self, retry_after: Optional[float] = None):
+        """
+        上游返回 429 时调用，暂停发放令牌
+        :param retry_after: 上游给出的 Retry-After（秒），未给出时按连续限流次数指数退避
+        """
+        self.throttled += 1
+        self._throttled_counter.inc()
+        self._consecutive_throttles += 1
+        delay = retry_after if retry_after is not None else min(
+            self.max_backoff, self.base_backoff * 2 ** (self._consecutive_throttles - 1)
+        )
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        self._tokens = 0
+
+    def record_success(self):
+        """请求成功后重置连续限流计数"""
+        self._consecutive_throttles = 0
+
+    def waiting_by_class(self) -> Dict[int, int]:
+        """各优先级正在排队的调用数（不含正在等待令牌的队首）"""
+        return self._gate.waiting_by_class()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回排队深度和等待时间统计"""
+        return {
+            "rate": self.rate,
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait,
+            "backoff_remaining": max(0.0, self._blocked_until - time.monotonic()),
+            "priorities": self.wait_stats.stats(self._gate.waiting_by_class()),
+        }
+
+
+_ncbi_rate_limiter: Optional[TokenBucketRateLimiter] = None
+
+
+def get_ncbi_rate_limiter(config=None) -> TokenBucketRateLimiter:
+    """
+    获取进程内共享的 NCBI 限流器
+    配置了 API key 时为 10 次/秒，否则为 3 次/秒；可通过 ncbi_rate_limit 覆盖
+    """
+    global _ncbi_rate_limiter
+    if _ncbi_rate_limiter is None:
+        api_key = getattr(config, "ncbi_api_key", None) if config else None
+        rate = config.get("ncbi_rate_limit") if config else None
+        if not rate:
+            rate = NCBI_RATE_WITH_KEY if api_key else NCBI_RATE_WITHOUT_KEY
+        starvation_timeout = (config.get("starvation_timeout") if config else None) or 10.0
+        _ncbi_rate_limiter = TokenBucketRateLimiter(rate, name="ncbi", starvation_timeout=starvation_timeout)
+    return _ncbi_rate_limiter
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """从异常携带的响应中读取 Retry-After 头"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
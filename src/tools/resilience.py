@@ -0,0 +1,253 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from src.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+# 错误分类
+ERROR_THROTTLED = "throttled"  # 429，由限流器退避后重试
+ERROR_TIMEOUT = "timeout"
+ERROR_TRANSIENT = "transient"  # 5xx、连接错误等，退避后重试
+ERROR_PERMANENT = "permanent"  # 4xx、参数错误等，重试无意义
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class OperationError(Exception):
+    """
+    上游操作失败
+    :param category: 错误分类（ERROR_*）
+    :param retryable: 调用方稍后重试是否可能成功
+    """
+
+    def __init__(self, message: str, category: str = ERROR_TRANSIENT, retryable: bool = True):
+        super().__init__(message)
+        self.category = category
+        self.retryable = retryable
+
+
+class OperationTimeoutError(OperationError, TimeoutError):
+    """重试后仍然超时，同时是 TimeoutError 以兼容原有的调用方"""
+
+    def __init__(self, message: str):
+        super().__init__(message, category=ERROR_TIMEOUT, retryable=True)
+
+
+class CircuitOpenError(OperationError):
+    """熔断器处于打开状态，请求未发往上游"""
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"上游 {upstream} 已熔断，{retry_in:.1f} 秒后重试", category=ERROR_TRANSIENT, retryable=True)
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """读取异常携带的 HTTP 状态码（requests / aiohttp / openai / EUtilsHTTPError）"""
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(response, "status_code", None),
+                   getattr(error, "status", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify_error(error: BaseException) -> str:
+    """将异常归类为 throttled / timeout / transient / permanent"""
+    if isinstance(error, OperationError):
+        return error.category
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return ERROR_TIMEOUT
+    status = error_status(error)
+    if status == 429 or "Too Many Requests" in str(error):
+        return ERROR_THROTTLED
+    if status is not None:
+        return ERROR_TRANSIENT if status in RETRYABLE_STATUS or status >= 500 else ERROR_PERMANENT
+    if isinstance(error, (ValueError, TypeError, KeyError, NotImplementedError)):
+        return ERROR_PERMANENT
+    # 连接错误以及无法识别的异常按瞬时错误处理
+    return ERROR_TRANSIENT
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """
+    指数退避 + 全抖动：在 [0, min(cap, base * 2^attempt)] 内均匀取值，避免重试同时到达上游
+    :param attempt: 已失败的次数（从 0 开始）
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveTimeout:
+    """
+    根据最近的耗时分位数自适应的超时时间
+    超时 = clamp(multiplier * 分位数耗时, minimum, maximum)，样本不足时使用 initial
+    """
+
+    def __init__(self, initial: float = 30.0, minimum: float = 2.0, maximum: float = 60.0,
+                 percentile: float = 0.99, multiplier: float = 2.0, window: int = 200, min_samples: int = 20):
+        """
+        :param initial: 样本不足时的超时时间（秒）
+        :param minimum: 超时下限（秒）
+        :param maximum: 超时上限（秒）
+        :param percentile: 参考的耗时分位数
+        :param multiplier: 分位数耗时的倍数
+        :param window: 保留的最近样本数
+        :param min_samples: 开始自适应所需的最少样本数
+        """
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        """记录一次耗时；超时的请求按当时的超时时间记录"""
+        self._samples.append(seconds)
+
+    def quantile(self) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def current(self) -> float:
+        """当前的超时时间（秒）"""
+        value = self.quantile()
+        if value is None:
+            return self.initial
+        return max(self.minimum, min(self.maximum, value * self.multiplier))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "timeout": self.current(),
+            "percentile": self.percentile,
+            "observed": self.quantile(),
+            "samples": len(self._samples),
+        }
+
+
+class CircuitBreaker:
+    """
+    按上游划分的熔断器
+    - closed：正常放行，连续失败达到阈值后打开
+    - open：直接拒绝（快速失败），recovery_timeout 后进入 half_open
+    - half_open：只放行 half_open_max_calls 个探测请求，成功则关闭，失败则重新打开
+    只有瞬时错误、超时和限流计为失败；4xx 等永久错误说明上游仍在正常响应，不计入
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        :param name: 上游名称
+        :param failure_threshold: 连续失败多少次后打开
+        :param recovery_timeout: 打开后多久进入半开状态（秒）
+        :param half_open_max_calls: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+        self.opened = 0
+        self.rejected = 0
+        self._state_gauge = CIRCUIT_STATE.labels(name)
+        self._rejected_counter = CIRCUIT_REJECTED.labels(name)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._state_gauge.set(self._STATE_VALUES[state])
+
+    def before_call(self):
+        """发起请求前调用，熔断时抛出 CircuitOpenError"""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self._set_state(self.HALF_OPEN)
+            self._probes = 0
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self._reject(self.recovery_timeout)
+            self._probes += 1
+
+    def _reject(self, retry_in: float):
+        self.rejected += 1
+        self._rejected_counter.inc()
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self):
+        self._consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self._set_state(self.OPEN)
+            self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """
+        半开探测请求被调用方取消时归还名额（既不算成功也不算失败），以免熔断器停在半开状态
+        探测请求以永久错误结束时说明上游仍在正常响应，调用方应改为调用 record_success
+        """
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": retry_in,
+        }
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(upstream: str, config=None) -> CircuitBreaker:
+    """
+    获取进程内共享的熔断器，同一上游的所有工具共用一个
+    配置依次查找 circuit_breaker.<upstream>.* 和 circuit_breaker.*
+    """
+    if upstream not in _circuit_breakers:
+        def option(key, default):
+            value = None
+            if config:
+                value = config.get(f"circuit_breaker.{upstream}.{key}")
+                if value is None:
+                    value = config.get(f"circuit_breaker.{key}")
+            return default if value is None else value
+
+        _circuit_breakers[upstream] = CircuitBreaker(
+            upstream,
+            failure_threshold=option("failure_threshold", 5),
+            recovery_timeout=option("recovery_timeout", 30.0),
+            half_open_max_calls=option("half_open_max_calls", 1),
+        )
+    return _circuit_breakers[upstream]
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器的状态"""
+    return {name: breaker.stats() for name, breaker in _circuit_breakers.items()}
@@ -1,10 +1,27 @@
-from typing import Any, Dict
-from src.tools.base import BaseTool
-from src.config import Config 
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.tools.base import TIMEOUT_BATCH, BaseTool
+from src.tools.cache import SQLiteCache
+from src.tools.openai_client import get_model_engine, get_openai_client
+from src.tools.priority import INTERACTIVE
+from src.tools.resilience import ERROR_PERMANENT, OperationError, classify_error, get_circuit_breaker
+from src.config import Config
+
+# 批量翻译时每个请求的输入 token 预算和文章数上限
+DEFAULT_MAX_BATCH_TOKENS = 3000
+DEFAULT_MAX_BATCH_ARTICLES = 10
 
 
 class TranslateTool(BaseTool):
+    # 批量翻译的生成时间明显长于 E-utilities 请求
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_MAX_TIMEOUT = 180
+    DEFAULT_BATCH_MIN_TIMEOUT = 30
+
     def __init__(self, name: str, config: Config):
         """
         翻译工具，继承自 EasyTool 类。
@@ -12,15 +29,79 @@ class TranslateTool(BaseTool):
         :param config: 配置对象，包含API密钥等信息
         """
         super().__init__(name, config)
-        self.client = OpenAI(
-            api_key=config.openai_api_key,
-            base_url=config.openai_base_url
+        self.circuit_breaker = get_circuit_breaker("openai", config)
+        self.llm_model = (config.get('openai.model') or config.get('model')) if config else None
+        self.max_batch_tokens = self._get_option("max_batch_tokens", DEFAULT_MAX_BATCH_TOKENS)
+        self.max_batch_articles = self._get_option("max_batch_articles", DEFAULT_MAX_BATCH_ARTICLES)
+        self.cache = SQLiteCache.from_config(config, "translation_cache", table="translations")
+        # 同一模型的调用共用一个执行引擎，并发上限按模型而不是按工具计算
+        self.engine = get_model_engine(self.llm_model, config)
+
+    @property
+    def client(self):
+        """共享的 AsyncOpenAI 客户端，首次翻译时才导入和创建"""
+        return get_openai_client(self.config)
+
+    async def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """调用 LLM 并返回回复文本"""
+        response = await self.client.chat.completions.create(
+            model=self.llm_model,
+            messages=messages,
+            temperature=0.3
         )
-        self.llm_model = config.get('model') if config else None
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.config.openai_api_key}"
-        }
+        return response.choices[0].message.content.strip()
+
+    async def _stream_complete(self, messages: List[Dict[str, str]], priority: int = INTERACTIVE) -> AsyncIterator[str]:
+        """
+        流式调用 LLM，逐段产出生成的文本
+        - 建立流的等待受自适应超时限制，首个片段到达的耗时计入单条操作的超时样本
+        - 开始输出后不再重试，避免重复发送已产出的文本
+        """
+        if self.circuit_breaker:
+            self.circuit_breaker.before_call()
+        try:
+            async with self.engine.slot(priority):
+                timeout = self.adaptive_timeout.current()
+                started = time.perf_counter()
+                try:
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.llm_model,
+                            messages=messages,
+                            temperature=0.3,
+                            stream=True
+                        ),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.adaptive_timeout.observe(timeout)
+                    raise
+                first_chunk = True
+                try:
+                    async for chunk in stream:
+                        if first_chunk:
+                            self.adaptive_timeout.observe(time.perf_counter() - started)
+                            first_chunk = False
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+        except (asyncio.CancelledError, GeneratorExit):
+            # 客户端断开时归还半开探测名额
+            if self.circuit_breaker:
+                self.circuit_breaker.release_probe()
+            raise
+        except Exception as e:
+            category = classify_error(e)
+            if self.circuit_breaker:
+                if category == ERROR_PERMANENT:
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+            raise OperationError(f"流式翻译失败: {str(e)}", category=category,
+                                 retryable=category != ERROR_PERMANENT) from e
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success()
 
     async def _translate_text(self, text: str, target_lang: str) -> str:
         """
@@ -39,14 +120,166 @@ class TranslateTool(BaseTool):
                 "content": text
             }
         ]
+        return await self._complete(messages)
 
-        response = await self.client.chat.completions.create(
-            model=self.llm_model,
-            messages=messages,
-            temperature=0.3
-        )
-        
-        return response.choices[0].message.content.strip()
+    async def _translate_batch(self, items: List[Dict[str, str]], target_lang: str) -> Dict[str, Dict[str, str]]:
+        """
+        一次请求翻译多篇文章的 title 和 abstract
+        :param items: [{'id', 'title', 'abstract'}]
+        :return: id -> {'title', 'abstract'}，回复中缺失的 id 不出现在结果中
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": f"你是一个专业的医学领域翻译。输入是一个 JSON 数组，每个元素包含 id、title、abstract。请将每个元素的 title 和 abstract 翻译成{target_lang}，保持专业性和准确性。id 保持不变，以相同结构的 JSON 数组返回，不要添加任何解释。"
+            },
+            {
+                "role": "user",
+                "content": json.dumps(items, ensure_ascii=False)
+            }
+        ]
+        return _parse_batch_reply(await self._complete(messages))
+
+    def _cache_key(self, title: str, abstract: str, target_lang: str) -> str:
+        """内容哈希 + 目标语言 + 模型作为缓存键"""
+        digest = hashlib.sha256(f"{title}\0{abstract}".encode("utf-8")).hexdigest()
+        return f"{self.llm_model}:{target_lang}:{digest}"
+
+    def _text_cache_key(self, text: str, target_lang: str) -> str:
+        """单段文本的缓存键，使用 text: 前缀与文章缓存键区分（值分别为字符串和 {'title', 'abstract'}）"""
+        return f"text:{self._cache_key(text, '', target_lang)}"
+
+    def _pack_batches(self, items: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """按 token 预算和文章数上限将文章打包成批"""
+        batches, current, budget = [], [], 0
+        for item in items:
+            tokens = _estimate_tokens(item["title"]) + _estimate_tokens(item["abstract"])
+            if current and (budget + tokens > self.max_batch_tokens or len(current) >= self.max_batch_articles):
+                batches.append(current)
+                current, budget = [], 0
+            current.append(item)
+            budget += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def translate_articles(self, articles: List[Dict[str, Any]], target_lang: str = "中文",
+                                 timeout: Optional[float] = None, max_retries: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        批量翻译文章的 title 和 abstract，命中缓存的文章不调用 LLM
+        :param articles: 文章列表，至少包含 pmid、title、abstract
+        :param target_lang: 目标语言
+        :return: 与输入顺序一致的 [{'pmid', 'title', 'abstract', 'target_language'}]，失败的文章包含 error
+        """
+        if not self.config.openai_api_key:
+            self.logger.error("未配置OpenAI API密钥")
+            return [{"pmid": str(article.get("pmid", "")), "error": "未配置OpenAI翻译服务API密钥"} for article in articles]
+
+        items, keys = [], []
+        for index, article in enumerate(articles):
+            title = article.get("title") or ""
+            abstract = article.get("abstract") or ""
+            items.append({"id": str(index), "title": title, "abstract": abstract})
+            keys.append(self._cache_key(title, abstract, target_lang))
+
+        cached = self.cache.get_many(set(keys)) if self.cache else {}
+        # 修复前单段文本也写在同一键下（值为字符串），忽略这类旧条目
+        translated: Dict[str, Dict[str, str]] = {
+            key: entry.value for key, entry in cached.items() if isinstance(entry.value, dict)
+        }
+        # 内容相同的文章只翻译一次
+        pending, seen = [], set()
+        for item, key in zip(items, keys):
+            if key not in translated and key not in seen:
+                seen.add(key)
+                pending.append(item)
+
+        errors: Dict[str, str] = {}
+        batches = self._pack_batches(pending)
+        replies = await asyncio.gather(*(
+            self._execute_operation(
+                self._translate_batch,
+                batch,
+                target_lang,
+                timeout=timeout,
+                max_retries=max_retries,
+                error_prefix="批量翻译",
+                timeout_kind=TIMEOUT_BATCH
+            )
+            for batch in batches
+        ), return_exceptions=True)
+
+        fresh = {}
+        for batch, reply in zip(batches, replies):
+            for item in batch:
+                key = keys[int(item["id"])]
+                if isinstance(reply, Exception):
+                    errors[key] = str(reply)
+                elif item["id"] in reply:
+                    fresh[key] = reply[item["id"]]
+                else:
+                    errors[key] = "翻译结果中缺少该文章"
+        if fresh and self.cache:
+            self.cache.set_many(fresh)
+        translated.update(fresh)
+        self.logger.debug(f"翻译 {len(articles)} 篇文章: 缓存命中 {len(cached)}，LLM 请求 {len(batches)} 次")
+
+        results = []
+        for article, key in zip(articles, keys):
+            pmid = str(article.get("pmid", ""))
+            if key in translated:
+                results.append({"pmid": pmid, **translated[key], "target_language": target_lang})
+            else:
+                results.append({"pmid": pmid, "error": f"翻译失败: {errors.get(key, '未知错误')}"})
+        return results
+
+    async def stream_translate_article(self, article: Dict[str, Any], target_lang: str = "中文",
+                                       priority: int = INTERACTIVE) -> AsyncIterator[Dict[str, str]]:
+        """
+        流式翻译单篇文章的 title 和 abstract，LLM 生成的片段立即产出
+        全部完成后写入与 translate_articles 共用的缓存；命中缓存时直接产出完整译文
+        :return: 依次产出 {'field': 'title' | 'abstract', 'delta': 文本片段}
+        :raises OperationError: 未配置 API 密钥或 LLM 调用失败
+        """
+        if not self.config.openai_api_key:
+            raise OperationError("未配置OpenAI翻译服务API密钥", category=ERROR_PERMANENT, retryable=False)
+        title = article.get("title") or ""
+        abstract = article.get("abstract") or ""
+        cache_key = self._cache_key(title, abstract, target_lang)
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry and isinstance(entry.value, dict):
+            for field in ("title", "abstract"):
+                if entry.value.get(field):
+                    yield {"field": field, "delta": entry.value[field]}
+            return
+
+        translated = {}
+        for field, text in (("title", title), ("abstract", abstract)):
+            parts = []
+            if text:
+                messages = [
+                    {
+                        "role": "system",
+                        "content": f"你是一个专业的医学领域翻译。请将以下文本翻译成{target_lang}，保持专业性和准确性。只返回译文，不要添加任何解释。"
+                    },
+                    {
+                        "role": "user",
+                        "content": text
+                    }
+                ]
+                async for delta in self._stream_complete(messages, priority):
+                    parts.append(delta)
+                    yield {"field": field, "delta": delta}
+            translated[field] = "".join(parts).strip()
+        if self.cache:
+            self.cache.set(cache_key, translated)
+
+    async def async_execute(self, input_data: Optional[Dict[str, Any]] = None,
+                            articles: Optional[List[Dict[str, Any]]] = None, target_lang: str = "中文"):
+        """异步执行入口：传入 articles 时批量翻译文章，否则翻译 input_data 中的文本"""
+        if articles is not None:
+            return await self.translate_articles(articles, target_lang)
+        return await self.execute(input_data)
 
     async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -71,6 +304,15 @@ class TranslateTool(BaseTool):
             self.logger.error("未配置OpenAI API密钥")
             return {"error": "未配置OpenAI翻译服务API密钥"}
 
+        cache_key = self._text_cache_key(text, target_lang)
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry:
+            return {
+                "original_text": text,
+                "translated_text": entry.value,
+                "target_language": target_lang
+            }
+
         try:
             translated_text = await self._execute_operation(
                 self._translate_text,
@@ -80,6 +322,8 @@ class TranslateTool(BaseTool):
                 max_retries=max_retries,
                 error_prefix="翻译操作"
             )
+            if self.cache:
+                self.cache.set(cache_key, translated_text)
 
             self.logger.info(f"成功将文本翻译成{target_lang}")
             return {
@@ -94,4 +338,27 @@ class TranslateTool(BaseTool):
             return {"error": error_msg}
 
     def __str__(self):
-        return f"TranslatorTool(name={self.name})" 
\ No newline at end of file
+        return f"TranslatorTool(name={self.name})"
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 个 token，其他字符约 4 个字符 1 个 token"""
+    cjk = len(re.findall(r"[぀-ヿ㐀-鿿가-힯]", text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def _parse_batch_reply(reply: str) -> Dict[str, Dict[str, str]]:
+    """解析批量翻译的回复，容忍 markdown 代码块包裹"""
+    reply = re.sub(r"^```(?:json)?\s*|\s*```$", "", reply.strip())
+    data = json.loads(reply)
+    if isinstance(data, dict):
+        # 部分模型会把数组包在对象里返回
+        data = next((value for value in data.values() if isinstance(value, list)), [])
+    results = {}
+    for item in data:
+        if isinstance(item, dict) and "id" in item:
+            results[str(item["id"])] = {
+                "title": item.get("title", ""),
+                "abstract": item.get("abstract", ""),
+            }
+    return results
@@ -0,0 +1,38 @@
+"""
+测试共用的夹具：在后台线程中运行 bench/mock_servers.py 提供的模拟 E-utilities 和 OpenAI 服务
+"""
+import asyncio
+import socket
+import threading
+import pytest
+
+
+@pytest.fixture
+def mock_upstream():
+    """在后台线程的事件循环中运行 bench/mock_servers.py，返回根地址和请求计数"""
+    web = pytest.importorskip("aiohttp.web")
+    from bench.mock_servers import MockBehavior, create_app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    behavior = MockBehavior(seed=1)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(create_app(behavior))
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait(5)
+    yield f"http://127.0.0.1:{port}", behavior
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
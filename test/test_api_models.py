@@ -0,0 +1,28 @@
+"""
+接口模型检查：文章结果转换只设置结果中存在的字段，配合 exclude_unset 实现字段投影
+
+    python -m pytest test/test_api_models.py
+"""
+import json
+
+from src.api.models import convert_to_article
+
+
+def test_convert_full_article():
+    article = convert_to_article({
+        "pmid": 123,
+        "title": "Aspirin",
+        "authors": None,
+        "year": 2001,
+        "mesh_terms": {"D001241": {"descriptor_name": "Aspirin", "major_topic": True}, "bad": "x"},
+    })
+
+    assert article.pmid == "123" and article.year == "2001" and article.authors == []
+    assert list(article.mesh_terms) == ["D001241"]
+    assert article.mesh_terms["D001241"].major_topic
+
+
+def test_convert_projection_excludes_unrequested_fields():
+    article = convert_to_article({"pmid": "1", "title": "Aspirin", "abstract": None})
+
+    assert json.loads(article.model_dump_json(exclude_unset=True)) == {"pmid": "1", "title": "Aspirin", "abstract": ""}
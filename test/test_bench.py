@@ -0,0 +1,112 @@
+"""
+基准测试工具检查：模拟 E-utilities / OpenAI 服务的响应、注入的限流、错误和缺失记录，以及延迟统计
+
+    python -m pytest test/test_bench.py
+"""
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp import test_utils
+from bench.mock_servers import MockBehavior, create_app
+
+
+def run_with_client(behavior, scenario, total_count=50):
+    async def run():
+        async with test_utils.TestClient(test_utils.TestServer(create_app(behavior, total_count=total_count))) as client:
+            return await scenario(client)
+    return asyncio.run(run())
+
+
+def test_esearch_history_and_uilist():
+    async def scenario(client):
+        response = await client.get("/entrez/eutils/esearch.fcgi",
+                                    params={"term": "aspirin", "retstart": "5", "retmax": "3", "usehistory": "y"})
+        result = (await response.json())["esearchresult"]
+        again = (await (await client.post("/entrez/eutils/esearch.fcgi",
+                                          data={"term": "aspirin", "retmax": "8"})).json())["esearchresult"]
+        uilist = await client.get("/entrez/eutils/efetch.fcgi", params={
+            "rettype": "uilist", "WebEnv": result["webenv"], "query_key": "1", "retstart": "5", "retmax": "3"})
+        expired = await client.get("/entrez/eutils/efetch.fcgi", params={"rettype": "uilist", "WebEnv": "MCID_x"})
+        return result, again, await uilist.text(), await expired.text()
+
+    result, again, uilist, expired = run_with_client(MockBehavior(), scenario)
+
+    assert result["count"] == "50" and result["querykey"] == "1" and result["webenv"].startswith("MCID_")
+    # 同一检索式的 PMID 序列是确定的
+    assert result["idlist"] == again["idlist"][5:8] and "webenv" not in again
+    assert uilist.split() == result["idlist"]
+    assert "<ERROR>" in expired
+
+
+def test_efetch_returns_parseable_articles_and_missing_rate():
+    from src.tools.pubmed_parser import parse_pubmed_article_set
+
+    async def scenario(client):
+        full = await client.post("/entrez/eutils/efetch.fcgi", data={"id": "101,102"})
+        return await full.read()
+
+    records = parse_pubmed_article_set(run_with_client(MockBehavior(), scenario))
+    assert list(records) == ["101", "102"]
+    assert records["101"]["journal"] == "J Synth Med 4"
+
+    empty = parse_pubmed_article_set(run_with_client(MockBehavior(missing_rate=1.0), scenario))
+    assert empty == {}
+
+
+def test_throttle_and_error_injection():
+    async def statuses(client):
+        codes = []
+        for _ in range(4):
+            response = await client.get("/entrez/eutils/esearch.fcgi", params={"term": "q"})
+            codes.append((response.status, response.headers.get("Retry-After")))
+        stats = await (await client.get("/_stats")).json()
+        return codes, stats
+
+    codes, stats = run_with_client(MockBehavior(max_rps=2), statuses)
+    assert [status for status, _ in codes] == [200, 200, 429, 429]
+    assert codes[-1][1] == "1"
+    assert stats == {"requests": 4, "throttled": 2, "errors": 0}
+
+    codes, stats = run_with_client(MockBehavior(error_rate=1.0), statuses)
+    assert {status for status, _ in codes} == {500}
+    assert stats["errors"] == 4
+
+
+def test_chat_completions_echo_and_stream():
+    message = {"model": "m", "messages": [{"role": "user", "content": "[{\"id\": \"0\", \"title\": \"Aspirin\"}]"}]}
+
+    async def scenario(client):
+        plain = await (await client.post("/v1/chat/completions", json=message)).json()
+        stream = await client.post("/v1/chat/completions", json={**message, "stream": True})
+        return plain, stream.headers["Content-Type"], await stream.text()
+
+    plain, content_type, body = run_with_client(MockBehavior(), scenario)
+
+    content = message["messages"][-1]["content"]
+    assert plain["choices"][0]["message"]["content"] == content
+    assert content_type.startswith("text/event-stream")
+    events = [line[len("data: "):] for line in body.split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    assert "".join(json.loads(event)["choices"][0]["delta"]["content"] for event in events[:-1]) == content
+
+
+def test_run_load_and_percentile():
+    pytest.importorskip("yaml")
+    from bench.run_bench import percentile, run_load
+
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
+
+    async def operation(index):
+        if index % 5 == 0:
+            raise RuntimeError(f"failed {index}")
+        await asyncio.sleep(0)
+
+    result = asyncio.run(run_load(operation, concurrency=3, total=10))
+
+    assert (result["requests"], result["errors"]) == (10, 2)
+    assert result["error_samples"] == ["failed 0", "failed 5"]
+    assert result["latency_s"]["p50"] is not None and result["requests_per_s"] > 0
@@ -0,0 +1,142 @@
+"""
+SQLite 持久化缓存检查：读写、TTL 与过期条目、LRU 淘汰、多个连接共享同一文件、命中统计
+
+    python -m pytest test/test_cache.py
+"""
+import asyncio
+import time
+import pytest
+
+from src.tools.cache import SQLiteCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "pubmed.db")
+
+
+def test_roundtrip_and_stats(cache_path):
+    cache = SQLiteCache(cache_path, table="articles")
+    cache.set_many({"1": {"title": "阿司匹林", "authors": ["Smith J"]}, "2": {"title": "B"}})
+
+    found = cache.get_many(["1", "2", "3"])
+
+    assert found["1"].value == {"title": "阿司匹林", "authors": ["Smith J"]} and not found["1"].stale
+    assert "3" not in found and cache.get("3") is None
+    assert cache.existing(["1", "3"]) == {"1"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+    assert stats["hit_rate"] == 0.5
+
+    cache.delete("1")
+    assert cache.get("1") is None
+    cache.close()
+
+
+def test_expired_entries_hidden_or_served_stale(cache_path):
+    cache = SQLiteCache(cache_path, ttl=0.05)
+    cache.set("1", "old")
+    cache.set("2", "forever", ttl=0)  # ttl=0 使用永不过期
+    time.sleep(0.06)
+
+    assert cache.get("1") is None
+    assert cache.existing(["1", "2"]) == {"2"}
+
+    stale_cache = SQLiteCache(cache_path, serve_stale=True)
+    entry = stale_cache.get("1")
+    assert entry.value == "old" and entry.stale
+    assert stale_cache.stats()["stale_hits"] == 1
+
+
+def test_lru_eviction_by_entries(cache_path):
+    cache = SQLiteCache(cache_path, max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")  # 访问后 a 比 b 新
+    time.sleep(0.01)
+    cache.set("c", 3)
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_eviction_by_bytes(cache_path):
+    cache = SQLiteCache(cache_path, max_bytes=200)
+    for i in range(20):
+        cache.set(str(i), f"value-{i}" * 5)
+        time.sleep(0.002)
+
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 200
+    assert cache.get("19") is not None and cache.get("0") is None
+
+
+def test_connections_share_file_and_tables(cache_path):
+    writer = SQLiteCache(cache_path, table="articles")
+    reader = SQLiteCache(cache_path, table="articles")
+    other_table = SQLiteCache(cache_path, table="translations")
+
+    writer.set("1", {"title": "A"})
+
+    assert reader.get("1").value == {"title": "A"}
+    assert other_table.get("1") is None
+
+
+class FakeConfig:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+def test_from_config(cache_path):
+    assert SQLiteCache.from_config(None, "article_cache", table="articles") is None
+    assert SQLiteCache.from_config(FakeConfig({"article_cache": {"enabled": False}}), "article_cache", table="articles") is None
+
+    cache = SQLiteCache.from_config(
+        FakeConfig({"article_cache": {"path": cache_path, "ttl": 60, "serve_stale": True}}), "article_cache", table="articles"
+    )
+    assert (cache.path, cache.table, cache.ttl, cache.serve_stale) == (cache_path, "articles", 60, True)
+
+
+def test_article_tool_serves_stale_and_refreshes_in_background(tmp_path, monkeypatch):
+    pytest.importorskip("yaml")
+    from src.config import Config
+    from src.tools import eutils
+    from src.tools.priority import BULK, current_priority
+    from src.tools.pubmed_get_article import PubMedGetArticleTool
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "article_cache:\n"
+        f"  path: {tmp_path / 'cache.db'}\n"
+        "  ttl: 0.05\n"
+        "  serve_stale: true\n"
+    )
+    monkeypatch.setattr(eutils, "_eutils_client", None)
+    tool = PubMedGetArticleTool("PubMedGetArticleTool", Config(str(config_file)))
+    fetches = []
+
+    async def fake_fetch_chunk(pmids, fields=None):
+        fetches.append((list(pmids), current_priority.get()))
+        return {pmid: {"pmid": pmid, "title": f"new {pmid}"} for pmid in pmids}
+
+    tool._async_fetch_chunk = fake_fetch_chunk
+    stored = []
+    tool.listeners.append(stored.append)
+    tool.cache.set_many({"1": {"pmid": "1", "title": "old 1"}})
+    time.sleep(0.06)
+
+    async def run():
+        results = await tool.async_execute(pmids=["1", "2"], fields=["title"])
+        # 过期条目立即返回，后台以 bulk 优先级刷新
+        assert results == [{"pmid": "1", "title": "old 1"}, {"pmid": "2", "title": "new 2"}]
+        await asyncio.gather(*tool._refresh_tasks)
+
+    asyncio.run(run())
+
+    assert sorted(fetches) == [(["1"], BULK), (["2"], current_priority.get())]
+    assert tool.cache.get("1").value["title"] == "new 1"
+    assert sorted(list(articles) for articles in stored) == [["1"], ["2"]]
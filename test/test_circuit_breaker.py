@@ -0,0 +1,194 @@
+"""
+熔断器状态机和错误分类检查
+
+    python -m pytest test/test_circuit_breaker.py
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+
+from src.tools.base import TIMEOUT_BATCH, TIMEOUT_SINGLE, BaseTool
+from src.tools.resilience import (
+    ERROR_PERMANENT,
+    ERROR_THROTTLED,
+    ERROR_TIMEOUT,
+    ERROR_TRANSIENT,
+    CircuitBreaker,
+    CircuitOpenError,
+    OperationError,
+    OperationTimeoutError,
+    backoff_delay,
+    classify_error,
+)
+
+
+def open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05, **kwargs)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # 成功后重新计数
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 1
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert 0 < excinfo.value.retry_in <= 10
+    assert breaker.rejected == 1
+
+
+def test_half_open_allows_limited_probes_then_closes():
+    breaker = open_breaker(half_open_max_calls=1)
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 探测请求进行中，其余调用仍被拒绝
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_half_open_failure_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_release_probe_returns_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    breaker.release_probe()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()  # 名额已归还，可以再发一个探测请求
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def http_error(status):
+    error = Exception(f"HTTP {status}")
+    error.response = SimpleNamespace(status_code=status)
+    return error
+
+
+@pytest.mark.parametrize("error, category", [
+    (OperationError("x", category=ERROR_PERMANENT), ERROR_PERMANENT),
+    (OperationTimeoutError("x"), ERROR_TIMEOUT),
+    (asyncio.TimeoutError(), ERROR_TIMEOUT),
+    (http_error(429), ERROR_THROTTLED),
+    (Exception("429 Too Many Requests"), ERROR_THROTTLED),
+    (http_error(503), ERROR_TRANSIENT),
+    (http_error(408), ERROR_TRANSIENT),
+    (http_error(599), ERROR_TRANSIENT),
+    (http_error(400), ERROR_PERMANENT),
+    (http_error(404), ERROR_PERMANENT),
+    (ValueError("bad pmid"), ERROR_PERMANENT),
+    (KeyError("pmid"), ERROR_PERMANENT),
+    (ConnectionResetError(), ERROR_TRANSIENT),
+    (RuntimeError("unknown"), ERROR_TRANSIENT),
+])
+def test_classify_error(error, category):
+    assert classify_error(error) == category
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, base=0.5, cap=4.0) for _ in range(50)]
+        assert all(0 <= delay <= min(4.0, 0.5 * 2 ** attempt) for delay in delays)
+
+
+def make_tool(breaker) -> BaseTool:
+    tool = BaseTool("test")
+    tool.circuit_breaker = breaker
+    tool.retry_base_delay = 0.0
+    return tool
+
+
+def test_execute_operation_opens_breaker_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10)
+    tool = make_tool(breaker)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        raise ConnectionResetError("reset")
+
+    async def run():
+        with pytest.raises(OperationError):
+            await tool._execute_operation(flaky, max_retries=2)
+        with pytest.raises(CircuitOpenError):
+            await tool._execute_operation(flaky, max_retries=2)
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_execute_operation_permanent_error_not_counted():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10)
+    tool = make_tool(breaker)
+    calls = []
+
+    async def invalid():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    async def run():
+        with pytest.raises(OperationError) as excinfo:
+            await tool._execute_operation(invalid, max_retries=3)
+        return excinfo.value
+
+    error = asyncio.run(run())
+
+    # 永久错误不重试，也不打开熔断器
+    assert len(calls) == 1
+    assert error.category == ERROR_PERMANENT and not error.retryable
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_single_and_batch_operations_use_separate_timeouts():
+    """快速的单条请求只拉低单条超时，批量操作保留独立的样本窗口和下限"""
+    tool = BaseTool("test")
+
+    async def fast():
+        return "ok"
+
+    async def run():
+        for _ in range(30):
+            await tool._execute_operation(fast)
+        await tool._execute_operation(fast, timeout_kind=TIMEOUT_BATCH)
+
+    asyncio.run(run())
+
+    single, batch = tool.adaptive_timeouts[TIMEOUT_SINGLE], tool.adaptive_timeouts[TIMEOUT_BATCH]
+    assert tool.adaptive_timeout is single
+    assert single.current() == single.minimum == 2.0
+    assert batch.stats()["samples"] == 1
+    assert batch.current() == BaseTool.DEFAULT_TIMEOUT
+    assert batch.minimum == BaseTool.DEFAULT_BATCH_MIN_TIMEOUT
@@ -0,0 +1,129 @@
+"""
+单飞合并检查：相同参数的并发调用共享任务、按优先级通道合并、调用方取消不影响共享任务、不可哈希参数按身份区分
+
+    python -m pytest test/test_coalescing.py
+"""
+import asyncio
+
+from src.agents.base import EasyAgent
+from src.tools.base import BaseTool
+from src.tools.priority import BULK, INTERACTIVE, current_priority
+
+
+class Unhashable:
+    __hash__ = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Unhashable) and other.value == self.value
+
+
+class GatedTool(BaseTool):
+    """每次执行记录参数和优先级，等待 gate 打开后返回"""
+
+    def __init__(self):
+        super().__init__("GatedTool")
+        self.calls = []
+        self.gate = asyncio.Event()
+
+    async def async_execute(self, *args, **kwargs):
+        self.calls.append((args, kwargs, current_priority.get()))
+        await self.gate.wait()
+        return {"args": args, "kwargs": kwargs}
+
+
+def make_agent():
+    agent = EasyAgent("test")
+    tool = GatedTool()
+    agent.register_tool(tool)
+    return agent, tool
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_identical_calls_share_one_task():
+    async def run():
+        agent, tool = make_agent()
+        calls = [
+            asyncio.create_task(agent.execute_tool_async("GatedTool", pmids=["1", "2"], fields={"title": 1})),
+            asyncio.create_task(agent.execute_tool_async("GatedTool", fields={"title": 1}, pmids=["1", "2"])),
+            asyncio.create_task(agent.execute_tool_async("GatedTool", pmids=["2", "1"])),
+        ]
+        await settle()
+        tool.gate.set()
+        results = await asyncio.gather(*calls)
+        return agent, tool, results
+
+    agent, tool, results = asyncio.run(run())
+
+    # 关键字参数顺序不影响合并，列表内容不同则分别执行
+    assert len(tool.calls) == 2
+    assert results[0] is results[1]
+    assert agent.coalesce_stats == {"calls": 3, "coalesced": 1}
+    assert agent._inflight == {}
+
+
+def test_lanes_interactive_does_not_join_bulk():
+    async def run():
+        agent, tool = make_agent()
+        bulk = asyncio.create_task(agent.execute_tool_async("GatedTool", "q", priority="bulk"))
+        await settle()
+        interactive = asyncio.create_task(agent.execute_tool_async("GatedTool", "q", priority="interactive"))
+        await settle()
+        # 在 interactive 任务之后到达的 bulk 调用加入更高优先级的在途任务
+        late_bulk = asyncio.create_task(agent.execute_tool_async("GatedTool", "q", priority="bulk"))
+        await settle()
+        tool.gate.set()
+        await asyncio.gather(bulk, interactive, late_bulk)
+        return agent, tool
+
+    agent, tool = asyncio.run(run())
+
+    assert [priority for _, _, priority in tool.calls] == [BULK, INTERACTIVE]
+    assert agent.coalesce_stats["coalesced"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_shared_task():
+    async def run():
+        agent, tool = make_agent()
+        first = asyncio.create_task(agent.execute_tool_async("GatedTool", "q"))
+        second = asyncio.create_task(agent.execute_tool_async("GatedTool", "q"))
+        await settle()
+        first.cancel()
+        await settle()
+        assert first.cancelled()
+        tool.gate.set()
+        return tool, await second
+
+    tool, result = asyncio.run(run())
+
+    assert len(tool.calls) == 1
+    assert result == {"args": ("q",), "kwargs": {}}
+
+
+def test_unhashable_arguments_coalesce_by_identity():
+    async def run():
+        agent, tool = make_agent()
+        shared = Unhashable(1)
+        calls = [
+            asyncio.create_task(agent.execute_tool_async("GatedTool", shared)),
+            asyncio.create_task(agent.execute_tool_async("GatedTool", shared)),
+            # 相等但不是同一个对象：无法判断是否等价，不合并
+            asyncio.create_task(agent.execute_tool_async("GatedTool", Unhashable(1))),
+            asyncio.create_task(agent.execute_tool_async("GatedTool", items=[shared, {"k": [1]}])),
+            asyncio.create_task(agent.execute_tool_async("GatedTool", items=[shared, {"k": [1]}])),
+        ]
+        await settle()
+        tool.gate.set()
+        await asyncio.gather(*calls)
+        return agent, tool
+
+    agent, tool = asyncio.run(run())
+
+    assert len(tool.calls) == 3
+    assert agent.coalesce_stats["coalesced"] == 2
@@ -0,0 +1,130 @@
+"""
+批量 EFetch 行为检查：按 efetch_batch_size 分组请求，结果保持输入顺序，缺失或失败的 PMID 以 {'pmid', 'error'} 表示
+
+    python -m pytest test/test_efetch_batch.py
+
+上游默认使用假客户端；安装了 aiohttp 时另以 bench/mock_servers.py 作为上游跑一遍完整链路
+"""
+import asyncio
+import socket
+import pytest
+
+pytest.importorskip("yaml")
+
+from src.config import Config
+from src.tools.eutils import EUtilsClient
+from src.tools.pubmed_get_article import PubMedGetArticleTool
+from src.tools.rate_limiter import TokenBucketRateLimiter
+from src.tools.resilience import CircuitBreaker
+
+
+def article_xml(pmid: str) -> str:
+    return (
+        "<PubmedArticle><MedlineCitation>"
+        f"<PMID Version=\"1\">{pmid}</PMID>"
+        f"<Article><ArticleTitle>Article {pmid}</ArticleTitle></Article>"
+        "</MedlineCitation></PubmedArticle>"
+    )
+
+
+class FakeEUtilsClient:
+    """只返回 available 中的 PMID，响应体切成小块逐块产出；记录每次请求的 PMID 分组"""
+
+    def __init__(self, available, fail_on=()):
+        self.available = set(available)
+        self.fail_on = set(fail_on)
+        self.requests = []
+
+    async def iter_efetch_pubmed_xml(self, pmids):
+        self.requests.append(list(pmids))
+        if self.fail_on & set(pmids):
+            raise ValueError("bad request")
+        body = "<?xml version=\"1.0\" ?><PubmedArticleSet>"
+        body += "".join(article_xml(pmid) for pmid in pmids if pmid in self.available)
+        body += "</PubmedArticleSet>"
+        data = body.encode("utf-8")
+        for start in range(0, len(data), 64):
+            yield data[start:start + 64]
+
+
+def make_tool(tmp_path, client, batch_size=2) -> PubMedGetArticleTool:
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        f"efetch_batch_size: {batch_size}\n"
+        "max_retries: 1\n"
+        "article_cache:\n"
+        "  enabled: false\n"
+    )
+    tool = PubMedGetArticleTool("PubMedGetArticleTool", Config(str(config_file)))
+    # 限流器和熔断器是进程内共享的，测试中换成独立实例
+    tool.rate_limiter = TokenBucketRateLimiter(1000, name="test")
+    tool.circuit_breaker = CircuitBreaker("test")
+    tool.client = client
+    return tool
+
+
+def test_batch_keeps_input_order_and_reports_missing(tmp_path):
+    client = FakeEUtilsClient(available=["1", "2", "3", "5"])
+    tool = make_tool(tmp_path, client, batch_size=2)
+
+    results = asyncio.run(tool.async_execute(pmids=["5", "3", " 1", "4", "2", "3"]))
+
+    # 去重后按 batch_size 分组，每组只请求一次上游
+    assert client.requests == [["5", "3"], ["1", "4"], ["2"]]
+    assert [result["pmid"] for result in results] == ["5", "3", "1", "4", "2", "3"]
+    assert [result.get("title") for result in results] == [
+        "Article 5", "Article 3", "Article 1", None, "Article 2", "Article 3",
+    ]
+    assert results[3] == {"pmid": "4", "error": "文章未找到"}
+
+
+def test_failed_chunk_only_affects_its_pmids(tmp_path):
+    client = FakeEUtilsClient(available=["1", "2", "3", "4"], fail_on=["3"])
+    tool = make_tool(tmp_path, client, batch_size=2)
+
+    results = asyncio.run(tool.async_execute(pmids=["1", "2", "3", "4"]))
+
+    assert [result["pmid"] for result in results] == ["1", "2", "3", "4"]
+    assert "error" not in results[0] and "error" not in results[1]
+    assert "bad request" in results[2]["error"]
+    assert "bad request" in results[3]["error"]
+
+
+def test_fields_projection(tmp_path):
+    tool = make_tool(tmp_path, FakeEUtilsClient(available=["7"]))
+
+    results = asyncio.run(tool.async_execute(pmids=["7"], fields=["title"]))
+
+    assert results == [{"pmid": "7", "title": "Article 7"}]
+
+
+def test_mock_server_upstream(tmp_path):
+    """以 bench/mock_servers.py 为上游：部分记录缺失时其余记录仍按输入顺序返回"""
+    pytest.importorskip("aiohttp")
+    from aiohttp import web
+    from bench.mock_servers import MockBehavior, create_app
+
+    pmids = [str(pmid) for pmid in range(1000, 1025)]
+
+    async def run():
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        runner = web.AppRunner(create_app(MockBehavior(missing_rate=0.2, seed=1)))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        client = EUtilsClient(base_url=f"http://127.0.0.1:{port}/entrez/eutils")
+        try:
+            tool = make_tool(tmp_path, client, batch_size=10)
+            return await tool.async_execute(pmids=pmids)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    results = asyncio.run(run())
+
+    assert [result["pmid"] for result in results] == pmids
+    missing = [result for result in results if "error" in result]
+    assert all(result["error"] == "文章未找到" for result in missing)
+    assert 0 < len(missing) < len(pmids)
+    assert all(result["title"].startswith("Synthetic article") for result in results if "error" not in result)
@@ -0,0 +1,120 @@
+"""
+工具执行引擎检查：在途调用数上限、排队统计、阻塞操作在专属有界线程池中执行、工具级配置
+
+    python -m pytest test/test_engine.py
+"""
+import asyncio
+import threading
+import time
+
+from src.tools.base import BaseTool
+from src.tools.engine import ExecutionEngine
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_slot_limits_in_flight_and_records_stats():
+    async def run():
+        engine = ExecutionEngine("test", max_concurrent=2)
+        gate = asyncio.Event()
+        peak = {"running": 0}
+
+        async def call():
+            async with engine.slot():
+                peak["running"] = max(peak["running"], engine.running)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(5)]
+        await settle()
+        queued = engine.stats()
+        await asyncio.sleep(0.02)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return engine, peak["running"], queued
+
+    engine, peak, queued = asyncio.run(run())
+
+    assert peak == 2
+    assert (queued["queue_depth"], queued["in_flight"], queued["completed"]) == (3, 2, 0)
+    stats = engine.stats()
+    assert (stats["queue_depth"], stats["in_flight"], stats["completed"]) == (0, 0, 5)
+    # 排队的 3 个调用至少等待了 20ms
+    assert stats["max_queue_wait"] >= 0.02 and stats["avg_queue_wait"] > 0
+    assert stats["avg_exec_time"] > 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def run():
+        engine = ExecutionEngine("test", max_concurrent=1)
+        async with engine.slot():
+            waiter = asyncio.create_task(engine.slot().__aenter__())
+            await settle()
+            assert engine.waiting == 1
+            waiter.cancel()
+            await settle()
+        async with engine.slot():
+            pass
+        return engine
+
+    engine = asyncio.run(run())
+
+    assert engine.waiting == 0 and engine.running == 0 and engine.completed == 2
+
+
+def test_run_blocking_uses_bounded_private_pool():
+    engine = ExecutionEngine("blocking", max_concurrent=4, max_workers=2)
+    threads = []
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def work(value, scale=1):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        threads.append(threading.current_thread().name)
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return value * scale
+
+    async def run():
+        return await asyncio.gather(*(engine.run_blocking(work, i, scale=10) for i in range(6)))
+
+    assert asyncio.run(run()) == [0, 10, 20, 30, 40, 50]
+    assert active["peak"] == 2
+    assert all(name.startswith("blocking-worker") for name in threads)
+    engine.shutdown()
+    assert engine._executor is None
+
+
+class FakeConfig:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+class SyncTool(BaseTool):
+    def execute(self, value):
+        return threading.current_thread().name, value
+
+
+def test_tool_options_and_sync_execute_through_engine():
+    config = FakeConfig({
+        "max_concurrent_tasks": 8,
+        "tools.SyncTool.max_concurrent_tasks": 3,
+        "tools.SyncTool.max_workers": 1,
+        "bulk_max_share": 0.5,
+    })
+    tool = SyncTool("SyncTool", config)
+
+    assert (tool.engine.max_concurrent, tool.engine.max_workers, tool.engine.bulk_max_share) == (3, 1, 0.5)
+    assert BaseTool("Other", config).engine.max_concurrent == 8
+
+    thread_name, value = asyncio.run(tool.async_execute("x"))
+    assert value == "x" and thread_name.startswith("SyncTool-worker")
+    assert tool.engine.completed == 1
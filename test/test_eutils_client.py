@@ -0,0 +1,88 @@
+"""
+E-utilities 客户端检查：同步入口与异步路径共用客户端、缓存和限流器，会话随事件循环结束关闭
+
+    python -m pytest test/test_eutils_client.py
+"""
+import asyncio
+import gc
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("aiohttp")
+
+from src.config import Config
+from src.tools import eutils
+from src.tools.eutils import EUtilsClient
+from src.tools.pubmed_get_article import PubMedGetArticleTool
+from src.tools.rate_limiter import TokenBucketRateLimiter
+from src.tools.resilience import CircuitBreaker
+
+
+def make_tool(tmp_path, monkeypatch, base_url) -> PubMedGetArticleTool:
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "eutils:\n"
+        f"  base_url: {base_url}/entrez/eutils\n"
+        "article_cache:\n"
+        f"  path: {tmp_path / 'cache.db'}\n"
+    )
+    # 共享客户端是进程内单例，测试中按本次配置重新创建
+    monkeypatch.setattr(eutils, "_eutils_client", None)
+    tool = PubMedGetArticleTool("PubMedGetArticleTool", Config(str(config_file)))
+    tool.rate_limiter = TokenBucketRateLimiter(1000, name="test")
+    tool.circuit_breaker = CircuitBreaker("test")
+    return tool
+
+
+def test_sync_execute_uses_configured_upstream_cache_and_limiter(tmp_path, monkeypatch, mock_upstream):
+    base_url, behavior = mock_upstream
+    tool = make_tool(tmp_path, monkeypatch, base_url)
+    assert tool.client.base_url == f"{base_url}/entrez/eutils"
+
+    results = tool.execute(pmids=["101", "102", "103"])
+    assert [result["pmid"] for result in results] == ["101", "102", "103"]
+    assert all(result["title"].startswith("Synthetic article") for result in results)
+    assert tool.rate_limiter.acquired == 1
+    requests = behavior.requests
+
+    # 第二次同步调用命中文章缓存，不再请求上游
+    single = tool.execute(pmid="102")
+    assert single["pmid"] == "102"
+    assert tool.execute(pmids=["103", "101"])[0]["pmid"] == "103"
+    assert behavior.requests == requests
+    assert tool.rate_limiter.acquired == 1
+
+
+def test_session_closed_when_event_loop_ends():
+    client = EUtilsClient(base_url="http://127.0.0.1:9/entrez/eutils")
+    sessions = []
+
+    async def use_session():
+        sessions.append(client._get_session())
+        await asyncio.sleep(0)
+
+    asyncio.run(use_session())
+    asyncio.run(use_session())
+
+    # 每次 asyncio.run 结束前关闭本次事件循环中创建的会话
+    assert len(sessions) == 2 and sessions[0] is not sessions[1]
+    assert all(session.closed for session in sessions)
+
+
+def test_explicit_close_then_reuse_in_same_loop():
+    client = EUtilsClient(base_url="http://127.0.0.1:9/entrez/eutils")
+
+    async def run():
+        first = client._get_session()
+        await asyncio.sleep(0)
+        await client.close()
+        second = client._get_session()
+        await asyncio.sleep(0)
+        # 旧会话的守护生成器被替换、回收后不会关闭新会话
+        gc.collect()
+        await asyncio.sleep(0)
+        assert first.closed and not second.closed
+        return second
+
+    second = asyncio.run(run())
+    assert second.closed
@@ -0,0 +1,55 @@
+"""
+启动耗时预算检查：在全新的子进程中导入入口模块，超出预算或提前导入重量级依赖时失败
+
+    python -m pytest test/test_import_time.py
+
+预算可通过环境变量 CLI_IMPORT_BUDGET_MS / API_IMPORT_BUDGET_MS 调整
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 只在首次使用对应工具时才允许导入的依赖
+HEAVY_MODULES = ["metapub", "openai", "aiohttp", "requests"]
+
+CLI_IMPORT_BUDGET_MS = float(os.getenv("CLI_IMPORT_BUDGET_MS", "300"))
+API_IMPORT_BUDGET_MS = float(os.getenv("API_IMPORT_BUDGET_MS", "1500"))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str) -> dict:
+    """在子进程中导入模块，返回耗时（毫秒）和已加载的重量级依赖，取三次中的最小值以降低抖动"""
+    runs = []
+    for _ in range(3):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run["ms"])
+
+
+def test_agent_import_is_lazy():
+    """CLI 入口（src/main.py）依赖的 PubMedAssistant 不应在导入时加载 metapub/openai/aiohttp"""
+    pytest.importorskip("yaml")
+    result = measure_import("src.agents.pubmed_assistant")
+    assert result["loaded"] == [], f"导入时加载了重量级依赖: {result['loaded']}"
+    assert result["ms"] < CLI_IMPORT_BUDGET_MS, f"导入耗时 {result['ms']:.0f}ms 超出预算 {CLI_IMPORT_BUDGET_MS:.0f}ms"
+
+
+def test_api_import_is_lazy():
+    """API 入口导入时只加载 FastAPI 本身，工具和上游客户端在首次请求时创建"""
+    pytest.importorskip("fastapi")
+    result = measure_import("src.api_server")
+    assert result["loaded"] == [], f"导入时加载了重量级依赖: {result['loaded']}"
+    assert result["ms"] < API_IMPORT_BUDGET_MS, f"导入耗时 {result['ms']:.0f}ms 超出预算 {API_IMPORT_BUDGET_MS:.0f}ms"
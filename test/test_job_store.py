@@ -0,0 +1,153 @@
+"""
+批量任务检查点存储检查：租约领取与过期接管、按块检查点、取消和恢复
+
+    python -m pytest test/test_job_store.py
+"""
+import asyncio
+import time
+import pytest
+
+from src.agents.bulk_jobs import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+    BulkJobManager,
+    JobStore,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+def results_for(pmids):
+    return [{"pmid": pmid, "title": f"Article {pmid}"} for pmid in pmids]
+
+
+def test_lease_blocks_other_owners_until_expired(store):
+    job_id = store.create(["1", "2", "3"], chunk_size=2)
+
+    assert store.claim("a", lease=0.05) == job_id
+    assert store.get(job_id)["status"] == JOB_RUNNING
+    assert store.claim("b", lease=10) is None
+
+    time.sleep(0.06)
+    # 租约过期后由其他进程接管，原持有者的写入被拒绝
+    assert store.claim("b", lease=10) == job_id
+    assert not store.save_chunk(job_id, "a", 0, results_for(["1", "2"]), failed=0)
+    assert store.save_chunk(job_id, "b", 0, results_for(["1", "2"]), failed=0)
+
+
+def test_renew_extends_lease(store):
+    job_id = store.create(["1"], chunk_size=1)
+    store.claim("a", lease=0.05)
+
+    store.renew("a", lease=10)
+    time.sleep(0.06)
+
+    assert store.claim("b", lease=10) is None
+    assert store.save_chunk(job_id, "a", 0, results_for(["1"]), failed=0)
+
+
+def test_chunk_checkpoints(store):
+    job_id = store.create([str(pmid) for pmid in range(6)], chunk_size=2)
+    store.claim("a", lease=10)
+
+    store.save_chunk(job_id, "a", 0, results_for(["0", "1"]), failed=0)
+    store.save_chunk(job_id, "a", 2, [{"pmid": "4", "error": "文章未找到"}, *results_for(["5"])], failed=1)
+
+    assert store.done_chunks(job_id) == {0, 2}
+    job = store.get(job_id)
+    assert (job["processed"], job["failed"]) == (4, 1)
+    chunks = store.get_chunks(job_id, 0, 2)
+    assert sorted(chunks) == [0, 2]
+    assert [result["pmid"] for result in chunks[2]] == ["4", "5"]
+
+
+def test_cancel_stops_writes_and_resume_keeps_checkpoints(store):
+    job_id = store.create(["1", "2", "3", "4"], chunk_size=2)
+    store.claim("a", lease=10)
+    store.save_chunk(job_id, "a", 0, results_for(["1", "2"]), failed=0)
+
+    assert store.cancel(job_id)
+    assert store.get(job_id)["status"] == JOB_CANCELLED
+    assert not store.save_chunk(job_id, "a", 1, results_for(["3", "4"]), failed=0)
+
+    assert store.resume(job_id)
+    assert store.get(job_id)["status"] == JOB_PENDING
+    assert store.done_chunks(job_id) == {0}
+    # 恢复后租约已清空，任何进程都可以立即领取
+    assert store.claim("b", lease=10) == job_id
+
+
+def test_resume_only_failed_or_cancelled(store):
+    job_id = store.create(["1"], chunk_size=1)
+    assert not store.resume(job_id)
+
+    store.claim("a", lease=10)
+    store.finish(job_id, "a", JOB_FAILED, "upstream down")
+    assert store.get(job_id)["error"] == "upstream down"
+    assert store.resume(job_id)
+    assert store.get(job_id)["error"] is None
+
+    store.claim("a", lease=10)
+    store.finish(job_id, "a", JOB_COMPLETED)
+    assert not store.resume(job_id)
+    assert not store.cancel(job_id)
+
+
+def test_purge_removes_finished_jobs(store):
+    finished = store.create(["1"], chunk_size=1)
+    store.claim("a", lease=10)
+    store.save_chunk(finished, "a", 0, results_for(["1"]), failed=0)
+    store.finish(finished, "a", JOB_COMPLETED)
+    pending = store.create(["2"], chunk_size=1)
+
+    assert store.purge(time.time() + 1) == 1
+    assert store.get(finished) is None
+    assert store.get_chunks(finished, 0, 0) == {}
+    assert store.get(pending) is not None
+
+
+class FakeConfig:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = []
+
+    async def batch_get_details(self, pmids, priority=None):
+        self.calls.append((list(pmids), priority))
+        return results_for(pmids)
+
+
+def test_manager_resumes_from_checkpoint(tmp_path):
+    agent = FakeAgent()
+    manager = BulkJobManager(agent, FakeConfig({"bulk_jobs": {"path": str(tmp_path / "jobs.db")}}))
+    pmids = [str(pmid) for pmid in range(7)]
+    job_id = manager.store.create(pmids, chunk_size=3)
+
+    # 之前的进程完成第一块后退出，租约过期
+    manager.store.claim("crashed", lease=0)
+    manager.store.save_chunk(job_id, "crashed", 0, results_for(pmids[:3]), failed=0)
+    assert manager.store.claim(manager.owner, lease=10) == job_id
+
+    asyncio.run(manager._run_job(job_id))
+
+    assert agent.calls == [(["3", "4", "5"], "bulk"), (["6"], "bulk")]
+    assert manager.get_job(job_id)["status"] == JOB_COMPLETED
+    page = manager.get_results(job_id, offset=2, limit=4)
+    assert [result["pmid"] for result in page["results"]] == ["2", "3", "4", "5"]
+    assert page["next_offset"] == 6
+    assert manager.get_results(job_id, offset=6)["next_offset"] is None
+    manager.store.close()
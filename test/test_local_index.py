@@ -0,0 +1,111 @@
+"""
+本地 MEDLINE 索引检查：导入和删除、字段检索（期刊缩写与全称）、不支持的字段标签、旧索引升级
+
+    python -m pytest test/test_local_index.py
+"""
+import asyncio
+import gzip
+import sqlite3
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from bench.mock_servers import _article_xml
+from src.config import Config
+from src.ingest_medline import parse_file
+from src.tools import local_index
+from src.tools.local_index import LocalPubMedIndex, QueryCompiler, prepare_rows
+from src.tools.pubmed_parser import parse_pubmed_article_set
+from src.tools.pubmed_search import PubMedSearchTool
+
+
+def write_medline(path, pmids, deleted=()):
+    body = "".join(_article_xml(pmid) for pmid in pmids)
+    if deleted:
+        body += "<DeleteCitation>" + "".join(f"<PMID Version=\"1\">{pmid}</PMID>" for pmid in deleted) + "</DeleteCitation>"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(f"<?xml version=\"1.0\"?><PubmedArticleSet>{body}</PubmedArticleSet>")
+
+
+@pytest.fixture
+def index(tmp_path):
+    # PMID % 97：101 -> 4，102 -> 5，103 -> 6
+    write_medline(tmp_path / "pubmed00001.xml.gz", ["101", "102", "103"])
+    write_medline(tmp_path / "pubmed00002.xml.gz", [], deleted=["103"])
+    index = LocalPubMedIndex(str(tmp_path / "medline.db"))
+    for name in ("pubmed00001.xml.gz", "pubmed00002.xml.gz"):
+        index.apply_file(*parse_file(str(tmp_path / name)))
+    yield index
+    index.close()
+
+
+def test_ingest_and_delete(index):
+    assert index.stats() == {"articles": 2, "ingested_files": 2}
+    assert index.is_ingested("pubmed00002.xml.gz")
+    records = index.get_records(["101", "103", "x"])
+    assert list(records) == ["101"]
+    assert records["101"]["journal"] == "J Synth Med 4"
+    assert records["101"]["journal_title"] == "Journal of Synthetic Medicine 4"
+
+
+@pytest.mark.parametrize("query, pmids", [
+    ("leukemia", ["102", "101"]),
+    ("smith[au] AND author5[au]", ["102"]),
+    ("author4[lastau]", ["101"]),
+    ("j synth med 4[ta]", ["101"]),
+    ("Journal of Synthetic Medicine 5[jt]", ["102"]),
+    ("J Synth Med 5[jt]", ["102"]),
+    ('"journal of synthetic medicine 4"[journal] OR 102[pmid]', ["102", "101"]),
+    ("leukemia[majr] NOT 102[uid]", ["101"]),
+    ("synth*[all]", ["102", "101"]),
+])
+def test_field_search(index, query, pmids):
+    assert index.search(query)["pmids"] == pmids
+
+
+@pytest.mark.parametrize("query", ["leukemia[xyz]", "leukemia[affiliation]", "(leukemia", "abc[pmid]", ""])
+def test_invalid_query_raises_value_error(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
+
+
+def test_journal_fields_compile_to_both_columns():
+    condition, params = QueryCompiler("Lancet[jt]").compile()
+    assert "journal_title_norm" in condition and params == ["lancet", "lancet"]
+
+    condition, params = QueryCompiler("Lancet[jt]", journal_title=False).compile()
+    assert condition == "a.journal_norm = ?" and params == ["lancet"]
+
+
+def test_old_index_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (pmid INTEGER PRIMARY KEY, version INTEGER NOT NULL DEFAULT 1, "
+                 "year INTEGER, journal_norm TEXT, record BLOB NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    # 只读打开未升级的索引时期刊检索只匹配缩写
+    readonly = LocalPubMedIndex(path, readonly=True)
+    assert not readonly.has_journal_title
+    readonly.close()
+
+    index = LocalPubMedIndex(path)
+    assert index.has_journal_title
+    record = parse_pubmed_article_set(_article_xml("101").encode())["101"]
+    index.apply_file("manual", [prepare_rows(record)], [])
+    assert index.search("Journal of Synthetic Medicine 4[jt]")["pmids"] == ["101"]
+    index.close()
+
+
+def test_search_tool_raises_value_error_for_invalid_query(index, tmp_path, monkeypatch):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("pubmed_backend: local\n")
+    monkeypatch.setattr(local_index, "_local_index", index)
+    tool = PubMedSearchTool("PubMedSearchTool", Config(str(config_file)))
+
+    # 检索式错误不包装成 OperationError，接口据此返回 400
+    with pytest.raises(ValueError):
+        asyncio.run(tool.async_execute(query="leukemia[xyz]", offset=0, limit=10))
+    page = asyncio.run(tool.async_execute(query="J Synth Med 4[jt]", offset=0, limit=10))
+    assert page["pmids"] == ["101"] and page["count"] == 1
@@ -0,0 +1,110 @@
+"""
+指标检查：注册表按 Prometheus 文本格式输出、直方图累计分桶、标签转义、工具调用计数和 /metrics 接口
+
+    python -m pytest test/test_metrics.py
+"""
+import asyncio
+import pytest
+
+from src.agents.base import EasyAgent
+from src.metrics import REGISTRY, TOOL_CALLS, TOOL_COALESCED, MetricsRegistry
+from src.tools.base import BaseTool
+
+
+def test_render_counter_gauge_and_labels():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ["tool", "status"])
+    in_flight = registry.gauge("in_flight", "In flight")
+
+    calls.labels("Search", "success").inc()
+    calls.labels("Search", "success").inc(2)
+    calls.labels('a"b\\c\nd', "error").inc(0.5)
+    in_flight.labels().inc(3)
+    in_flight.labels().dec()
+
+    # 同名指标重复注册时返回已有的指标
+    assert registry.counter("calls_total", "Calls", ["tool", "status"]) is calls
+    assert registry.render().splitlines() == [
+        "# HELP calls_total Calls",
+        "# TYPE calls_total counter",
+        'calls_total{tool="Search",status="success"} 3',
+        'calls_total{tool="a\\"b\\\\c\\nd",status="error"} 0.5',
+        "# HELP in_flight In flight",
+        "# TYPE in_flight gauge",
+        "in_flight 2",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["tool"], buckets=(1.0, 0.1))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("Search").observe(value)
+
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'latency_seconds_bucket{tool="Search",le="0.1"} 2',
+        'latency_seconds_bucket{tool="Search",le="1"} 3',
+        'latency_seconds_bucket{tool="Search",le="+Inf"} 4',
+        'latency_seconds_sum{tool="Search"} 3.65',
+        'latency_seconds_count{tool="Search"} 4',
+    ]
+
+
+class EchoTool(BaseTool):
+    def __init__(self):
+        super().__init__("MetricsEchoTool")
+
+    async def async_execute(self, value):
+        await asyncio.sleep(0)
+        if value == "bad":
+            raise RuntimeError("bad value")
+        return value
+
+
+def test_agent_records_tool_calls_and_coalescing():
+    agent = EasyAgent("test")
+    agent.register_tool(EchoTool())
+    success = TOOL_CALLS.labels("MetricsEchoTool", "success").value
+    errors = TOOL_CALLS.labels("MetricsEchoTool", "error").value
+    coalesced = TOOL_COALESCED.labels("MetricsEchoTool").value
+
+    async def run():
+        await asyncio.gather(
+            agent.execute_tool_async("MetricsEchoTool", "x"),
+            agent.execute_tool_async("MetricsEchoTool", "x"),
+        )
+        with pytest.raises(RuntimeError):
+            await agent.execute_tool_async("MetricsEchoTool", "bad")
+
+    asyncio.run(run())
+
+    assert TOOL_CALLS.labels("MetricsEchoTool", "success").value == success + 1
+    assert TOOL_CALLS.labels("MetricsEchoTool", "error").value == errors + 1
+    assert TOOL_COALESCED.labels("MetricsEchoTool").value == coalesced + 1
+
+
+def test_metrics_endpoint_does_not_create_assistant():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api.depends import get_pubmed_assistant
+    from src.api.routes.metrics_service import router
+
+    def fail():
+        raise AssertionError("抓取指标时不应创建 PubMedAssistant")
+
+    app = FastAPI()
+    app.include_router(router, prefix="/metrics")
+    app.dependency_overrides[get_pubmed_assistant] = fail
+    TOOL_CALLS.labels("MetricsEchoTool", "success")
+
+    response = TestClient(app).get("/metrics/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE pubmed_tool_calls_total counter" in response.text
+    assert 'pubmed_tool_calls_total{tool="MetricsEchoTool",status="success"}' in response.text
+    assert response.text == REGISTRY.render()
@@ -0,0 +1,92 @@
+"""
+多检索式集合运算检查：并集/交集/差集、命中数超过取回数量时标记截断、请求参数上限
+
+    python -m pytest test/test_multi_search.py
+"""
+import asyncio
+import pytest
+
+from src.agents.pubmed_assistant import MAX_MULTI_SEARCH_QUERIES, PubMedAssistant
+from src.tools.base import BaseTool
+
+HITS = {
+    "aspirin": ["5", "4", "3", "2", "1"],
+    "stroke": ["4", "3", "9"],
+}
+
+
+class FakeSearchTool(BaseTool):
+    def __init__(self):
+        super().__init__("PubMedSearchTool")
+        self.limits = []
+
+    async def async_execute(self, query=None, offset=0, limit=10):
+        self.limits.append(limit)
+        pmids = HITS.get(query, [])
+        return {"pmids": pmids[offset:offset + limit], "count": len(pmids)}
+
+
+@pytest.fixture
+def agent():
+    agent = PubMedAssistant("test")
+    agent.register_tool(FakeSearchTool())
+    return agent
+
+
+@pytest.mark.parametrize("operation, pmids", [
+    ("union", ["9", "5", "4", "3", "2", "1"]),
+    ("intersection", ["4", "3"]),
+    ("difference", ["5", "2", "1"]),
+])
+def test_set_operations(agent, operation, pmids):
+    result = asyncio.run(agent.search_pubmed_multi(["aspirin", "stroke", "aspirin"], operation=operation))
+
+    assert result["pmids"] == pmids and result["count"] == len(pmids)
+    assert not result["truncated"]
+    assert [item["query"] for item in result["queries"]] == ["aspirin", "stroke"]
+
+
+def test_truncated_when_count_exceeds_retrieved(agent):
+    result = asyncio.run(agent.search_pubmed_multi(["aspirin", "stroke"], operation="intersection", max_results=3))
+
+    assert agent.get_tool("PubMedSearchTool").limits == [3, 3]
+    assert result["truncated"]
+    assert result["queries"] == [
+        {"query": "aspirin", "count": 5, "retrieved": 3, "truncated": True},
+        {"query": "stroke", "count": 3, "retrieved": 3, "truncated": False},
+    ]
+
+
+def test_invalid_arguments(agent):
+    with pytest.raises(ValueError):
+        asyncio.run(agent.search_pubmed_multi(["aspirin"], operation="xor"))
+    with pytest.raises(ValueError):
+        asyncio.run(agent.search_pubmed_multi([" ", ""]))
+    with pytest.raises(ValueError):
+        asyncio.run(agent.search_pubmed_multi([f"q{i}" for i in range(MAX_MULTI_SEARCH_QUERIES + 1)]))
+
+
+def test_route_validates_limits(agent):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api.depends import get_pubmed_assistant
+    from src.api.routes.search_service import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/search")
+    app.dependency_overrides[get_pubmed_assistant] = lambda: agent
+    client = TestClient(app)
+
+    response = client.post("/search/multi", json={"queries": ["aspirin", "stroke"], "max_results": 2})
+    assert response.status_code == 200
+    assert response.json()["truncated"] is True
+
+    for body in (
+        {"queries": ["aspirin"], "max_results": 0},
+        {"queries": ["aspirin"], "max_results": 10001},
+        {"queries": [f"q{i}" for i in range(MAX_MULTI_SEARCH_QUERIES + 1)]},
+    ):
+        assert client.post("/search/multi", json=body).status_code == 422
+    assert client.post("/search/multi", json={"queries": ["aspirin"], "operation": "xor"}).status_code == 400
@@ -0,0 +1,256 @@
+"""
+PDF 下载检查：按主机限流、Range 续传和 416 时从头下载、非 PDF 响应改用浏览器会话、
+已存在的文件不解析地址、同时存在的下载任务数上限、提前结束时取消下载
+
+    python -m pytest test/test_pdf_download.py
+"""
+import asyncio
+import os
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("aiohttp")
+
+from aiohttp import test_utils, web
+from src.config import Config
+from src.tools import eutils
+from src.tools.pdf_download import (
+    STATUS_DOWNLOADED,
+    STATUS_EXISTS,
+    STATUS_FAILED,
+    STATUS_NOT_FOUND,
+    HostLimiter,
+    NotPdfResponse,
+    PdfDownloadTool,
+)
+from src.tools.resilience import OperationError
+
+PDF = b"%PDF-1.4\n" + b"0123456789" * 100
+
+
+@pytest.fixture
+def make_tool(tmp_path, monkeypatch):
+    def make(**options):
+        lines = ["pdf_download:", f"  directory: {tmp_path / 'download'}"]
+        lines += [f"  {key}: {value}" for key, value in options.items()]
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("\n".join(lines) + "\nmax_retries: 1\n")
+        monkeypatch.setattr(eutils, "_eutils_client", None)
+        return PdfDownloadTool("PdfDownloadTool", Config(str(config_file)))
+    return make
+
+
+def test_host_limiter_limits_each_host():
+    limiter = HostLimiter(per_host=2, overrides={"slow.example": 1})
+    active, peak = {}, {}
+
+    async def download(url, host):
+        async with limiter.slot(url):
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    async def run():
+        await asyncio.gather(
+            *(download(f"https://a.example/{i}.pdf", "a") for i in range(5)),
+            *(download(f"https://SLOW.example/{i}.pdf", "slow") for i in range(3)),
+        )
+
+    asyncio.run(run())
+
+    assert peak == {"a": 2, "slow": 1}
+    assert limiter.stats() == {
+        "a.example": {"limit": 2, "in_use": 0},
+        "slow.example": {"limit": 1, "in_use": 0},
+    }
+
+
+def publisher_app(requests):
+    """模拟出版商：支持 Range 的 PDF、对 Range 返回 416 的 PDF、HTML 落地页、内容不是 PDF 的文件"""
+
+    async def pdf(request):
+        requests.append((request.path, request.headers.get("Range")))
+        header = request.headers.get("Range")
+        if header:
+            start = int(header[len("bytes="):-1])
+            return web.Response(status=206, body=PDF[start:], content_type="application/pdf")
+        return web.Response(body=PDF, content_type="application/pdf")
+
+    async def mismatch(request):
+        requests.append((request.path, request.headers.get("Range")))
+        if request.headers.get("Range"):
+            return web.Response(status=416)
+        return web.Response(body=PDF, content_type="application/pdf")
+
+    async def landing(request):
+        requests.append((request.path, request.cookies.get("cf_clearance")))
+        if request.cookies.get("cf_clearance"):
+            return web.Response(body=PDF, content_type="application/pdf")
+        return web.Response(text="<html>Just a moment...</html>", content_type="text/html")
+
+    async def fake(request):
+        return web.Response(body=b"not a pdf", content_type="application/octet-stream")
+
+    app = web.Application()
+    app.router.add_get("/file.pdf", pdf)
+    app.router.add_get("/mismatch.pdf", mismatch)
+    app.router.add_get("/landing", landing)
+    app.router.add_get("/fake.pdf", fake)
+    return app
+
+
+def run_with_publisher(tool, scenario):
+    requests = []
+
+    async def run():
+        server = test_utils.TestServer(publisher_app(requests))
+        await server.start_server()
+        try:
+            return await scenario(lambda path: str(server.make_url(path)))
+        finally:
+            await tool.close()
+            await server.close()
+
+    return asyncio.run(run()), requests
+
+
+def test_download_resumes_and_restarts_on_416(make_tool, tmp_path):
+    tool = make_tool(browser_pool_size=0)
+    resumed, restarted = str(tmp_path / "1.pdf"), str(tmp_path / "2.pdf")
+    for path in (resumed, restarted):
+        with open(path + ".part", "wb") as f:
+            f.write(PDF[:100])
+
+    async def scenario(url):
+        return [await tool._download(url("/file.pdf"), resumed), await tool._download(url("/mismatch.pdf"), restarted)]
+
+    sizes, requests = run_with_publisher(tool, scenario)
+
+    assert sizes == [len(PDF), len(PDF)]
+    assert requests == [("/file.pdf", "bytes=100-"), ("/mismatch.pdf", "bytes=100-"), ("/mismatch.pdf", None)]
+    for path in (resumed, restarted):
+        assert open(path, "rb").read() == PDF and not os.path.exists(path + ".part")
+
+
+def test_non_pdf_responses(make_tool, tmp_path):
+    tool = make_tool(browser_pool_size=0)
+    path = str(tmp_path / "3.pdf")
+
+    async def scenario(url):
+        with pytest.raises(NotPdfResponse):
+            await tool._download(url("/landing"), path)
+        with pytest.raises(NotPdfResponse):
+            await tool._download(url("/fake.pdf"), path)
+        # 没有浏览器会话时直接失败
+        with pytest.raises(OperationError):
+            await tool._fetch(url("/landing"), path)
+
+    run_with_publisher(tool, scenario)
+
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+
+
+class FakeBrowserPool:
+    def __init__(self):
+        self.opened = []
+
+    async def open(self, url):
+        self.opened.append(url)
+        return {"cf_clearance": "ok"}, url
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"opened": len(self.opened)}
+
+
+def test_landing_page_falls_back_to_browser_cookies(make_tool, tmp_path):
+    tool = make_tool()
+    tool.browser_pool = FakeBrowserPool()
+    path = str(tmp_path / "4.pdf")
+
+    async def scenario(url):
+        return await tool._fetch(url("/landing"), path), url("/landing")
+
+    (size, landing_url), requests = run_with_publisher(tool, scenario)
+
+    assert size == len(PDF)
+    assert tool.browser_pool.opened == [landing_url]
+    assert requests == [("/landing", None), ("/landing", "ok")]
+
+
+class FakeResolver:
+    def __init__(self, urls):
+        self.urls = urls
+        self.resolved = []
+        self.cache = None
+
+    async def iter_resolve(self, pmids):
+        for pmid in pmids:
+            self.resolved.append(pmid)
+            yield {"pmid": pmid, "url": self.urls.get(pmid), "source": None}
+
+
+def test_iter_download_statuses_and_order(make_tool, tmp_path):
+    tool = make_tool(browser_pool_size=0)
+    tool.resolver = FakeResolver({"2": "https://a.example/2.pdf", "3": "https://a.example/3.pdf"})
+    os.makedirs(tool.directory, exist_ok=True)
+    with open(tool.pdf_path("1"), "wb") as f:
+        f.write(PDF)
+
+    async def fake_fetch(url, path):
+        if url.endswith("3.pdf"):
+            raise OperationError("HTTP 404")
+        with open(path, "wb") as f:
+            f.write(PDF)
+        return len(PDF)
+
+    tool._fetch = fake_fetch
+
+    results = asyncio.run(tool.async_execute(["2", "1", " 3", "4", "2", ""]))
+
+    assert [(result["pmid"], result["status"]) for result in results] == [
+        ("2", STATUS_DOWNLOADED), ("1", STATUS_EXISTS), ("3", STATUS_FAILED), ("4", STATUS_NOT_FOUND),
+    ]
+    # 已存在的文件不解析地址
+    assert tool.resolver.resolved == ["2", "3", "4"]
+    assert results[0]["size"] == len(PDF) and results[2]["path"] is None and "404" in results[2]["error"]
+
+
+def test_iter_download_bounds_pending_tasks_and_cancels_on_close(make_tool):
+    tool = make_tool(browser_pool_size=0, max_pending=3)
+    pmids = [str(i) for i in range(20)]
+    tool.resolver = FakeResolver({pmid: f"https://a.example/{pmid}.pdf" for pmid in pmids})
+    started, cancelled = [], []
+    gate = {}
+
+    async def fake_download_one(pmid, directory=None, force=False, resolution=None):
+        started.append(pmid)
+        try:
+            await gate["event"].wait()
+        except asyncio.CancelledError:
+            cancelled.append(pmid)
+            raise
+        return {"pmid": pmid, "status": STATUS_DOWNLOADED}
+
+    tool.download_one = fake_download_one
+
+    async def run():
+        gate["event"] = asyncio.Event()
+        stream = tool.iter_download(pmids)
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        # 名额满时不再读取解析结果
+        assert len(started) == 3 and len(tool.resolver.resolved) <= 4
+        gate["event"].set()
+        await first
+        gate["event"] = asyncio.Event()
+        await asyncio.sleep(0.01)
+        await stream.aclose()
+
+    asyncio.run(run())
+
+    assert len(started) < len(pmids)
+    assert cancelled and set(cancelled) <= set(started)
@@ -0,0 +1,87 @@
+"""
+PDF 全文提取检查：折行合并、参考文献切分、批量提取的任务窗口和 PMID 规范化
+
+    python -m pytest test/test_pdf_extract.py
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("yaml")
+
+from src.config import Config
+from src.tools.pdf_extract import STATUS_EXTRACTED, STATUS_MISSING, PdfExtractTool, _join_lines, _split_references
+
+
+def test_join_lines():
+    lines = ["Aspirin re-", "duces stroke", "risk.", "", "Second  paragraph", "ends here."]
+    assert _join_lines(lines) == "Aspirin reduces stroke risk.\n\nSecond paragraph ends here."
+
+
+def test_split_numbered_references():
+    lines = ["[1] Smith J. Aspirin.", "Lancet 2001.", "[2] Doe A. Stroke.", "", "3. Roe B. Trials."]
+    assert _split_references(lines) == ["[1] Smith J. Aspirin. Lancet 2001.", "[2] Doe A. Stroke.", "3. Roe B. Trials."]
+
+
+def test_split_unnumbered_references():
+    assert _split_references(["Smith J. Aspirin.", "", "Doe A. Stroke."]) == ["Smith J. Aspirin.", "Doe A. Stroke."]
+
+
+@pytest.fixture
+def tool(tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "pdf_download:\n"
+        f"  directory: {tmp_path}\n"
+        "pdf_extract:\n"
+        "  workers: 1\n"
+        "  max_pending: 3\n"
+        "fulltext_cache:\n"
+        "  enabled: false\n"
+    )
+    return PdfExtractTool("PdfExtractTool", Config(str(config_file)))
+
+
+def test_iter_extract_keeps_bounded_window(tool, tmp_path):
+    pmids = [str(pmid) for pmid in range(30)]
+    for pmid in pmids:
+        (tmp_path / f"{pmid}.pdf").write_bytes(b"%PDF-1.4")
+    state = {"started": 0, "active": 0, "max_active": 0}
+
+    async def fake_extract_file(pmid, path, force):
+        state["started"] += 1
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(0.005)
+        state["active"] -= 1
+        return {"status": STATUS_EXTRACTED, "pages": 1, "sections": [], "references": []}
+
+    tool._extract_file = fake_extract_file
+
+    async def run():
+        iterator = tool.iter_extract([(pmid, None) for pmid in pmids])
+        first = await iterator.__anext__()
+        # 调用方暂停读取时不再创建新的提取任务
+        await asyncio.sleep(0.05)
+        started = state["started"]
+        rest = [result async for result in iterator]
+        return first, started, rest
+
+    first, started, rest = asyncio.run(run())
+
+    assert started <= 3 + 1
+    assert state["max_active"] <= 3
+    assert sorted([first["pmid"], *(result["pmid"] for result in rest)], key=int) == pmids
+
+
+def test_async_execute_normalises_pmids(tool, tmp_path):
+    (tmp_path / "7.pdf").write_bytes(b"%PDF-1.4")
+
+    async def fake_extract_file(pmid, path, force):
+        return {"status": STATUS_EXTRACTED, "pages": 2, "sections": [{}], "references": []}
+
+    tool._extract_file = fake_extract_file
+
+    results = asyncio.run(tool.async_execute([" 7", "8", "7 ", 7, ""]))
+
+    assert [(result["pmid"], result["status"]) for result in results] == [("7", STATUS_EXTRACTED), ("8", STATUS_MISSING)]
+    assert tool.counts[STATUS_EXTRACTED] == 1
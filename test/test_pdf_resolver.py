@@ -0,0 +1,171 @@
+"""
+PDF 地址解析检查：缓存命中、PMC ID 批量转换、FindIt 按请求数占用 NCBI 配额、CrossRef 单独限流、逐篇解析的并发上限
+
+    python -m pytest test/test_pdf_resolver.py
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+pytest.importorskip("yaml")
+
+from src.config import Config
+from src.tools import pdf_resolver
+from src.tools.pdf_resolver import PdfResolverTool
+from src.tools.resilience import CircuitBreaker
+
+
+class RecordingLimiter:
+    """记录每次获取的令牌数，不做等待"""
+
+    def __init__(self):
+        self.tokens = []
+
+    async def acquire(self, priority=None, tokens=1):
+        self.tokens.append(tokens)
+        return 0.0
+
+    def record_success(self):
+        pass
+
+    def backoff(self, retry_after=None):
+        pass
+
+
+class FakeEUtilsClient:
+    def __init__(self, pmc):
+        self.pmc = pmc
+        self.requests = []
+
+    async def convert_ids(self, pmids, url=None):
+        self.requests.append(list(pmids))
+        return {pmid: {"doi": f"10.1/{pmid}", "pmcid": self.pmc.get(pmid)} for pmid in pmids}
+
+
+class FakeFinder:
+    """代替 FindIt 和 CrossRef：found 中的 PMID 由 FindIt 找到，其余交给 CrossRef；记录同时进行的调用数"""
+
+    def __init__(self, found=(), crossref=(), delay=0.0):
+        self.found = set(found)
+        self.crossref = set(crossref)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def find_pdf_url(self, pmid, doi=None):
+        with self._lock:
+            self.calls.append(("findit", pmid, doi))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        url = f"https://publisher.example/{pmid}.pdf" if pmid in self.found else None
+        return {"doi": doi, "url": url, "source": "findit" if url else None, "title": f"Title {pmid}", "journal": "J"}
+
+    def crossref_pdf_url(self, doi=None, title=None, journal=None):
+        self.calls.append(("crossref", doi))
+        pmid = doi.rsplit("/", 1)[-1]
+        return f"https://crossref.example/{pmid}.pdf" if pmid in self.crossref else None
+
+
+@pytest.fixture
+def make_resolver(tmp_path, monkeypatch):
+    def make(finder, pmc=None, workers=4):
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            "pdf_resolution_cache:\n"
+            f"  path: {tmp_path / 'cache.db'}\n"
+            "pdf_download:\n"
+            "  findit_ncbi_requests: 3\n"
+            "tools:\n"
+            "  PdfResolverTool:\n"
+            f"    max_concurrent_tasks: {workers}\n"
+        )
+        monkeypatch.setattr(pdf_resolver, "find_pdf_url", finder.find_pdf_url)
+        monkeypatch.setattr(pdf_resolver, "crossref_pdf_url", finder.crossref_pdf_url)
+        resolver = PdfResolverTool("PdfResolverTool", Config(str(config_file)))
+        resolver.client = FakeEUtilsClient(pmc or {})
+        resolver.rate_limiter = RecordingLimiter()
+        resolver.circuit_breaker = CircuitBreaker("test-ncbi")
+        resolver.crossref_rate_limiter = RecordingLimiter()
+        resolver.crossref_circuit_breaker = CircuitBreaker("test-crossref")
+        return resolver
+    return make
+
+
+def test_resolution_sources_and_cache(make_resolver):
+    finder = FakeFinder(found=["2"], crossref=["3"])
+    resolver = make_resolver(finder, pmc={"1": "PMC1"})
+
+    records = asyncio.run(resolver.async_execute(["1", "2", "3", "4", "2"]))
+
+    assert [(record["pmid"], record["source"]) for record in records] == [
+        ("1", "pmc"), ("2", "findit"), ("3", "crossref"), ("4", None),
+    ]
+    assert records[0]["url"] == "https://pmc.ncbi.nlm.nih.gov/articles/PMC1/pdf/"
+    # PMC 中的文章不运行 FindIt；FindIt 复用 ID 转换得到的 DOI
+    assert sorted(call[1] for call in finder.calls if call[0] == "findit") == ["2", "3", "4"]
+    assert ("findit", "3", "10.1/3") in finder.calls
+
+    # 第二次全部命中缓存（包括找不到地址的结果）
+    finder.calls.clear()
+    again = asyncio.run(resolver.async_execute(["4", "3", "2", "1"]))
+    assert [record["pmid"] for record in again] == ["4", "3", "2", "1"]
+    assert finder.calls == []
+
+
+def test_findit_and_crossref_use_separate_limiters(make_resolver):
+    finder = FakeFinder(found=["2"], crossref=["3"])
+    resolver = make_resolver(finder)
+
+    asyncio.run(resolver.async_execute(["2", "3", "4"]))
+
+    # ID 转换 1 个令牌；每次 FindIt 按 findit_ncbi_requests 个令牌计算
+    assert sorted(resolver.rate_limiter.tokens) == [1, 3, 3, 3]
+    # 只有 FindIt 找不到地址的文章查询 CrossRef，且不占用 NCBI 配额
+    assert resolver.crossref_rate_limiter.tokens == [1, 1]
+
+
+def test_crossref_errors_do_not_open_ncbi_breaker(make_resolver, monkeypatch):
+    finder = FakeFinder()
+
+    def failing_crossref(doi=None, title=None, journal=None):
+        raise ConnectionResetError("crossref down")
+
+    resolver = make_resolver(finder)
+    resolver.crossref_circuit_breaker = CircuitBreaker("test-crossref", failure_threshold=1)
+    resolver.retry_base_delay = 0.0
+    monkeypatch.setattr(pdf_resolver, "crossref_pdf_url", failing_crossref)
+
+    record = asyncio.run(resolver.resolve("9"))
+
+    # 第一次失败后 CrossRef 熔断，重试被直接拒绝；出错的结果不写入缓存
+    assert "test-crossref" in record["error"]
+    assert resolver.cache.get("9") is None
+    assert resolver.crossref_circuit_breaker.state == CircuitBreaker.OPEN
+    assert resolver.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_per_pmid_resolution_is_bounded(make_resolver):
+    finder = FakeFinder(delay=0.01)
+    resolver = make_resolver(finder, workers=3)
+    pmids = [str(pmid) for pmid in range(100, 140)]
+
+    async def run():
+        iterator = resolver.iter_resolve(pmids)
+        first = await iterator.__anext__()
+        # 调用方暂停读取时，工作协程最多再解析满结果队列
+        await asyncio.sleep(0.2)
+        started = sum(1 for call in finder.calls if call[0] == "findit")
+        rest = [record async for record in iterator]
+        return first, started, rest
+
+    first, started, rest = asyncio.run(run())
+
+    assert finder.max_active <= 3
+    assert started <= 3 + 3 + 1
+    assert sorted([first["pmid"], *(record["pmid"] for record in rest)]) == pmids
@@ -0,0 +1,155 @@
+"""
+下一页预取检查：同一次检索多取 size 个 PMID、只预取缓存中没有的文章并以 bulk 优先级执行、
+命中统计、前台排队时跳过或取消预取
+
+    python -m pytest test/test_prefetch.py
+"""
+import asyncio
+import pytest
+
+from src.agents.prefetch import ArticlePrefetcher
+from src.agents.pubmed_assistant import PubMedAssistant
+from src.tools.base import BaseTool
+from src.tools.cache import SQLiteCache
+from src.tools.priority import BULK, INTERACTIVE, current_priority
+
+PMIDS = [str(pmid) for pmid in range(101, 131)]
+
+
+class FakeConfig:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+class FakeSearchTool(BaseTool):
+    def __init__(self):
+        super().__init__("PubMedSearchTool")
+        self.limits = []
+
+    async def async_execute(self, query=None, offset=0, limit=10, history=None):
+        self.limits.append(limit)
+        return {"pmids": PMIDS[offset:offset + limit], "count": len(PMIDS), "webenv": None, "query_key": None}
+
+
+class FakeArticleTool(BaseTool):
+    """获取的文章写入缓存，记录每次请求的 PMID 和优先级"""
+
+    def __init__(self, cache):
+        super().__init__("PubMedGetArticleTool")
+        self.cache = cache
+        self.requests = []
+        self.gate = None
+
+    async def async_execute(self, pmid=None, pmids=None, fields=None):
+        self.requests.append((list(pmids), current_priority.get()))
+        if self.gate is not None:
+            await self.gate.wait()
+        self.cache.set_many({pmid: {"pmid": pmid} for pmid in pmids})
+        return [{"pmid": pmid} for pmid in pmids]
+
+
+@pytest.fixture
+def agent(tmp_path):
+    agent = PubMedAssistant("test")
+    agent.register_tool(FakeSearchTool())
+    agent.register_tool(FakeArticleTool(SQLiteCache(str(tmp_path / "cache.db"), table="articles")))
+    agent.prefetcher = ArticlePrefetcher(agent, FakeConfig({
+        "prefetch": {"enabled": True, "size": 5, "check_interval": 0.01},
+    }))
+    return agent
+
+
+def test_next_page_is_prefetched_and_usage_counted(agent):
+    search = agent.get_tool("PubMedSearchTool")
+    articles = agent.get_tool("PubMedGetArticleTool")
+    articles.cache.set("12", {"pmid": "12"})
+
+    async def run():
+        page = await agent.search_pubmed_page("q", limit=10)
+        await asyncio.gather(*agent.prefetcher._tasks)
+        # 已在缓存中的 PMID 不再请求
+        agent.prefetcher.schedule(["12", "13"])
+        await asyncio.gather(*agent.prefetcher._tasks)
+        await agent.batch_get_details(PMIDS[10:13])
+        return page
+
+    page = asyncio.run(run())
+
+    assert search.limits == [15]
+    assert page["pmids"] == PMIDS[:10] and page["next_cursor"]
+    assert articles.requests[0] == (PMIDS[10:15], BULK)
+    assert articles.requests[1] == (["13"], BULK)
+    stats = agent.prefetcher.stats()
+    assert (stats["scheduled"], stats["prefetched"], stats["used"]) == (2, 6, 3)
+    assert stats["used_rate"] == 0.5
+
+
+def test_disabled_prefetch_requests_one_page(agent):
+    agent.prefetcher.enabled = False
+
+    page = asyncio.run(agent.search_pubmed_page("q", limit=10))
+
+    assert agent.get_tool("PubMedSearchTool").limits == [10]
+    assert len(page["pmids"]) == 10
+    assert agent.prefetcher.stats()["scheduled"] == 0
+
+
+def test_skipped_when_foreground_calls_are_queued(agent):
+    search = agent.get_tool("PubMedSearchTool")
+    search.engine.max_concurrent = 1
+
+    async def run():
+        async with search.engine.slot(INTERACTIVE):
+            waiter = asyncio.create_task(search.engine.slot(INTERACTIVE).__aenter__())
+            await asyncio.sleep(0)
+            agent.prefetcher.schedule(["1", "2"])
+            waiter.cancel()
+
+    asyncio.run(run())
+
+    assert agent.prefetcher.counters["skipped"] == 1
+    assert agent.get_tool("PubMedGetArticleTool").requests == []
+
+
+def test_running_prefetch_cancelled_when_load_appears(agent):
+    search = agent.get_tool("PubMedSearchTool")
+    articles = agent.get_tool("PubMedGetArticleTool")
+    search.engine.max_concurrent = 1
+
+    async def run():
+        articles.gate = asyncio.Event()
+        agent.prefetcher.schedule(["1", "2"])
+        await asyncio.sleep(0.02)
+        async with search.engine.slot(INTERACTIVE):
+            waiter = asyncio.create_task(search.engine.slot(INTERACTIVE).__aenter__())
+            await asyncio.gather(*agent.prefetcher._tasks)
+            waiter.cancel()
+
+    asyncio.run(run())
+
+    assert agent.prefetcher.counters["cancelled"] == 1
+    assert articles.cache.existing(["1", "2"]) == set()
+    assert agent.prefetcher.stats()["prefetched"] == 0
+
+
+def test_failures_are_counted_and_max_tasks_respected(agent):
+    articles = agent.get_tool("PubMedGetArticleTool")
+    agent.prefetcher.max_tasks = 1
+
+    async def fail(**kwargs):
+        raise RuntimeError("upstream error")
+
+    articles.async_execute = fail
+
+    async def run():
+        agent.prefetcher.schedule(["1"])
+        agent.prefetcher.schedule(["2"])
+        await asyncio.gather(*agent.prefetcher._tasks)
+
+    asyncio.run(run())
+
+    counters = agent.prefetcher.counters
+    assert (counters["scheduled"], counters["skipped"], counters["failed"]) == (1, 1, 1)
@@ -0,0 +1,166 @@
+"""
+优先级信号量检查：按优先级放行、bulk 名额上限、防饿死提升和取消时归还名额
+
+    python -m pytest test/test_priority_semaphore.py
+"""
+import asyncio
+import pytest
+
+from src.tools.engine import ExecutionEngine
+from src.tools.priority import (
+    BULK,
+    INTERACTIVE,
+    NORMAL,
+    PrioritySemaphore,
+    current_priority,
+    parse_priority,
+    priority_scope,
+)
+
+
+async def settle():
+    """让已就绪的任务都运行到下一个等待点"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_releases_by_priority_then_fifo():
+    order = []
+
+    async def run():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(NORMAL)
+
+        async def waiter(priority, label):
+            await semaphore.acquire(priority)
+            order.append(label)
+            semaphore.release(priority)
+
+        tasks = [
+            asyncio.create_task(waiter(BULK, "bulk-1")),
+            asyncio.create_task(waiter(NORMAL, "normal-1")),
+            asyncio.create_task(waiter(INTERACTIVE, "interactive-1")),
+            asyncio.create_task(waiter(BULK, "bulk-2")),
+            asyncio.create_task(waiter(INTERACTIVE, "interactive-2")),
+        ]
+        await settle()
+        assert semaphore.waiting_by_class() == {INTERACTIVE: 2, NORMAL: 1, BULK: 2}
+        semaphore.release(NORMAL)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["interactive-1", "interactive-2", "normal-1", "bulk-1", "bulk-2"]
+
+
+def test_bulk_share_leaves_room_for_interactive():
+    async def run():
+        semaphore = PrioritySemaphore(4, class_limits={BULK: 2})
+        holders = [asyncio.create_task(semaphore.acquire(BULK)) for _ in range(3)]
+        await settle()
+        # 只有两个 bulk 调用拿到名额，另外两个名额仍空闲
+        assert sum(task.done() for task in holders) == 2
+        assert semaphore.waiting_by_class()[BULK] == 1
+
+        await asyncio.wait_for(semaphore.acquire(INTERACTIVE), timeout=0.1)
+        await asyncio.wait_for(semaphore.acquire(NORMAL), timeout=0.1)
+
+        # bulk 归还名额后排队的 bulk 调用才能继续
+        semaphore.release(BULK)
+        await settle()
+        assert all(task.done() for task in holders)
+
+    asyncio.run(run())
+
+
+def test_starving_waiter_is_promoted():
+    async def run():
+        semaphore = PrioritySemaphore(1, starvation_timeout=0.05)
+        await semaphore.acquire(NORMAL)
+        order = []
+
+        async def waiter(priority):
+            await semaphore.acquire(priority)
+            order.append(priority)
+            semaphore.release(priority)
+
+        bulk = asyncio.create_task(waiter(BULK))
+        await asyncio.sleep(0.06)
+        # bulk 已等待超过 starvation_timeout，排在随后到达的 interactive 之前
+        interactive = asyncio.create_task(waiter(INTERACTIVE))
+        await settle()
+        semaphore.release(NORMAL)
+        await asyncio.gather(bulk, interactive)
+        return order
+
+    assert asyncio.run(run()) == [BULK, INTERACTIVE]
+
+
+def test_promotion_still_respects_class_limits():
+    async def run():
+        semaphore = PrioritySemaphore(2, class_limits={BULK: 1}, starvation_timeout=0.01)
+        await semaphore.acquire(BULK)
+        starving = asyncio.create_task(semaphore.acquire(BULK))
+        await asyncio.sleep(0.02)
+        await settle()
+        assert not starving.done()
+        semaphore.release(BULK)
+        await asyncio.wait_for(starving, timeout=0.1)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def run():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(NORMAL)
+        cancelled = asyncio.create_task(semaphore.acquire(INTERACTIVE))
+        queued = asyncio.create_task(semaphore.acquire(BULK))
+        await settle()
+
+        cancelled.cancel()
+        await settle()
+        assert semaphore.waiting == 1
+
+        semaphore.release(NORMAL)
+        await asyncio.wait_for(queued, timeout=0.1)
+        semaphore.release(BULK)
+        await asyncio.wait_for(semaphore.acquire(NORMAL), timeout=0.1)
+
+    asyncio.run(run())
+
+
+def test_engine_slot_uses_bulk_share_and_current_priority():
+    async def run():
+        engine = ExecutionEngine("test", max_concurrent=4, bulk_max_share=0.5)
+        running = {"bulk": 0, "max_bulk": 0}
+        gate = asyncio.Event()
+
+        async def bulk_call():
+            async with engine.slot():
+                running["bulk"] += 1
+                running["max_bulk"] = max(running["max_bulk"], running["bulk"])
+                await gate.wait()
+                running["bulk"] -= 1
+
+        with priority_scope("bulk"):
+            tasks = [asyncio.create_task(bulk_call()) for _ in range(4)]
+        await settle()
+        assert running["bulk"] == 2
+
+        # bulk 占满自己的份额时交互调用仍能立即执行
+        async with engine.slot(INTERACTIVE):
+            pass
+        gate.set()
+        await asyncio.gather(*tasks)
+        return running["max_bulk"]
+
+    assert asyncio.run(run()) == 2
+    assert current_priority.get() == NORMAL
+
+
+def test_parse_priority():
+    assert parse_priority("interactive") == INTERACTIVE
+    assert parse_priority(BULK) == BULK
+    with pytest.raises(ValueError):
+        parse_priority("urgent")
@@ -0,0 +1,133 @@
+"""
+EFetch XML 解析检查：任意切块喂入、逐篇清除已解析的文章、取得根节点后不再产生 start 事件、
+字段投影、内联标签和结构化摘要、图书章节
+
+    python -m pytest test/test_pubmed_parser.py
+"""
+import xml.etree.ElementTree as ET
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from bench.mock_servers import _article_xml
+from src.tools.pubmed_parser import (
+    ARTICLE_FIELDS,
+    PubmedArticleSetParser,
+    iter_pubmed_article_set,
+    normalize_fields,
+    parse_pubmed_article,
+    parse_pubmed_article_set,
+    project,
+)
+
+PMIDS = [str(pmid) for pmid in range(101, 106)]
+XML = (
+    "<?xml version=\"1.0\"?><!DOCTYPE PubmedArticleSet><PubmedArticleSet>"
+    + "".join(_article_xml(pmid) for pmid in PMIDS)
+    + "</PubmedArticleSet>"
+).encode("utf-8")
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096, len(XML)])
+def test_any_chunking_yields_same_records(size):
+    chunks = [XML[i:i + size] for i in range(0, len(XML), size)]
+    records = list(iter_pubmed_article_set(chunks))
+
+    assert [record["pmid"] for record in records] == PMIDS
+    assert records == list(parse_pubmed_article_set(XML).values())
+
+
+def test_articles_are_released_and_start_events_stop():
+    parser = PubmedArticleSetParser(frozenset({"pmid", "title"}))
+    first = XML.index(b"</PubmedArticle>") + len(b"</PubmedArticle>")
+
+    records = parser.feed(XML[:first])
+    assert records == [{"pmid": "101", "title": "Synthetic article 101 on leukemia and bronchiolitis obliterans"}]
+    # 已解析的文章从根节点移除
+    assert parser._root.tag == "PubmedArticleSet" and len(parser._root) == 0
+
+    # 直接读取底层事件：第二篇文章开头的元素只产生 end 事件
+    parser._parser.feed(XML[first:first + 400])
+    events = list(parser._parser.read_events())
+    assert events and all(event == "end" for event, _ in events)
+    records = parser.feed(XML[first + 400:]) + parser.close()
+    assert [record["pmid"] for record in records] == PMIDS[1:]
+
+
+def test_incomplete_xml_raises():
+    parser = PubmedArticleSetParser()
+    parser.feed(XML[:len(XML) // 2])
+    with pytest.raises(ET.ParseError):
+        parser.close()
+
+
+def test_normalize_fields():
+    assert normalize_fields(None) is None and normalize_fields("") is None
+    assert normalize_fields("title, year,") == frozenset({"pmid", "title", "year"})
+    assert normalize_fields(["authors"]) == frozenset({"pmid", "authors"})
+    with pytest.raises(ValueError, match="nope"):
+        normalize_fields("title,nope")
+
+
+def test_projection_parses_only_requested_fields():
+    full = parse_pubmed_article_set(XML)["101"]
+    projected = parse_pubmed_article_set(XML, normalize_fields("first_author,year"))["101"]
+
+    assert projected == {"pmid": "101", "first_author": "Smith J", "year": "2004"}
+    # 完整记录额外包含 version 和 journal_title，project 按 API 字段裁剪
+    assert full["version"] == 1 and full["journal_title"] == "Journal of Synthetic Medicine 4"
+    assert set(project(full, None)) == set(ARTICLE_FIELDS)
+    assert project(full, normalize_fields("first_author,year")) == projected
+
+
+ARTICLE = (
+    "<PubmedArticle><MedlineCitation><PMID Version=\"2\">7</PMID><Article>"
+    "<Journal><JournalIssue><PubDate><MedlineDate>1998 Dec-1999 Jan</MedlineDate></PubDate></JournalIssue>"
+    "<Title>The Lancet</Title></Journal>"
+    "<ArticleTitle>CO<sub>2</sub> and <i>E. coli</i></ArticleTitle>"
+    "<Abstract><AbstractText Label=\"BACKGROUND\">Why.</AbstractText>"
+    "<AbstractText Label=\"RESULTS\">What.</AbstractText></Abstract>"
+    "<AuthorList><Author><CollectiveName>Trial Group</CollectiveName></Author>"
+    "<Author><LastName>Doe</LastName><Initials>JA</Initials></Author><Author></Author></AuthorList>"
+    "</Article><MeshHeadingList><MeshHeading>"
+    "<DescriptorName UI=\"D1\" MajorTopicYN=\"N\">Aspirin</DescriptorName>"
+    "<QualifierName UI=\"Q1\" MajorTopicYN=\"Y\">adverse effects</QualifierName>"
+    "<QualifierName UI=\"Q2\" MajorTopicYN=\"N\">therapeutic use</QualifierName>"
+    "</MeshHeading></MeshHeadingList></MedlineCitation></PubmedArticle>"
+)
+
+BOOK_ARTICLE = (
+    "<PubmedBookArticle><BookDocument><PMID Version=\"1\">20301295</PMID>"
+    "<Book><BookTitle>GeneReviews</BookTitle><PubDate><Year>1993</Year></PubDate></Book>"
+    "<Abstract><AbstractText>Summary.</AbstractText></Abstract>"
+    "<AuthorList><Author><LastName>Roe</LastName><Initials>R</Initials></Author></AuthorList>"
+    "</BookDocument></PubmedBookArticle>"
+)
+
+
+def test_inline_markup_structured_abstract_and_mesh_qualifiers():
+    record = parse_pubmed_article(ET.fromstring(ARTICLE))
+
+    assert record["version"] == 2 and record["title"] == "CO2 and E. coli"
+    assert record["abstract"] == "BACKGROUND: Why.\nRESULTS: What."
+    assert record["authors"] == ["Trial Group", "Doe JA"] and record["last_author"] == "Doe JA"
+    # 没有 ISOAbbreviation 时使用期刊全称，年份取自 MedlineDate
+    assert record["journal"] == "The Lancet" and record["year"] == "1998"
+    assert record["mesh_terms"] == {"D1": {
+        "descriptor_name": "Aspirin",
+        "major_topic": True,
+        "qualifier_name": "adverse effects; therapeutic use",
+        "qualifier_ui": "Q1; Q2",
+    }}
+    assert record["keywords"] == []
+
+
+def test_book_article():
+    xml = f"<PubmedArticleSet>{BOOK_ARTICLE}</PubmedArticleSet>".encode()
+
+    record = parse_pubmed_article_set(xml)["20301295"]
+    assert record["title"] == "GeneReviews" and record["year"] == "1993"
+    assert record["authors"] == ["Roe R"] and record["journal"] == "" and record["mesh_terms"] == {}
+    assert parse_pubmed_article_set(xml, normalize_fields("title")) == {
+        "20301295": {"pmid": "20301295", "title": "GeneReviews"}
+    }
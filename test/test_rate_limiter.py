@@ -0,0 +1,129 @@
+"""
+令牌桶限流器行为检查：突发容量、按速率补充令牌、429 退避和优先级排队
+
+    python -m pytest test/test_rate_limiter.py
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.tools.priority import BULK, INTERACTIVE, NORMAL
+from src.tools.rate_limiter import TokenBucketRateLimiter, retry_after_seconds
+
+
+def test_burst_then_steady_rate():
+    """桶满时突发请求立即放行，之后按 rate 匀速放行"""
+    limiter = TokenBucketRateLimiter(rate=20, burst=5, name="test")
+
+    async def run():
+        waits = [await limiter.acquire() for _ in range(5)]
+        started = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire()
+        return waits, time.monotonic() - started
+
+    burst_waits, elapsed = asyncio.run(run())
+
+    assert max(burst_waits) < 0.02
+    # 桶空后 5 个令牌按 20 次/秒补充，约 0.25 秒
+    assert 0.2 <= elapsed < 0.5
+    assert limiter.acquired == 10
+
+
+def test_refill_is_capped_at_capacity():
+    limiter = TokenBucketRateLimiter(rate=100, burst=3, name="test")
+
+    async def drain():
+        for _ in range(3):
+            await limiter.acquire()
+
+    asyncio.run(drain())
+    assert limiter._tokens < 1
+    time.sleep(0.1)  # 按速率可补充 10 个令牌
+    limiter._refill(time.monotonic())
+    assert limiter._tokens == limiter.capacity
+
+
+def test_backoff_grows_exponentially_and_resets():
+    limiter = TokenBucketRateLimiter(rate=100, base_backoff=0.05, max_backoff=0.15, name="test")
+
+    def remaining():
+        return limiter.stats()["backoff_remaining"]
+
+    limiter.backoff()
+    assert 0.03 < remaining() <= 0.05
+    limiter.backoff()
+    assert 0.08 < remaining() <= 0.1
+    limiter.backoff()
+    # 超过 max_backoff 时按上限退避
+    assert 0.13 < remaining() <= 0.15
+    assert limiter.throttled == 3
+
+    # 退避期间暂停发放令牌
+    waited = asyncio.run(limiter.acquire())
+    assert waited >= 0.12
+
+    limiter.record_success()
+    limiter.backoff()
+    assert 0.03 < remaining() <= 0.05
+
+
+def test_backoff_honours_retry_after():
+    limiter = TokenBucketRateLimiter(rate=100, base_backoff=5, name="test")
+
+    limiter.backoff(retry_after=0.1)
+
+    assert 0.08 < limiter.stats()["backoff_remaining"] <= 0.1
+    assert limiter._tokens == 0
+    assert asyncio.run(limiter.acquire()) >= 0.08
+
+
+def test_waiters_are_served_by_priority():
+    """队首之后排队的调用按优先级放行，不按到达顺序"""
+    limiter = TokenBucketRateLimiter(rate=50, burst=1, name="test")
+    order = []
+
+    async def call(priority):
+        await limiter.acquire(priority)
+        order.append(priority)
+
+    async def run():
+        await limiter.acquire()  # 清空令牌桶
+        first = asyncio.create_task(call(NORMAL))
+        await asyncio.sleep(0)  # NORMAL 成为队首，等待下一个令牌
+        others = [asyncio.create_task(call(BULK)), asyncio.create_task(call(INTERACTIVE))]
+        await asyncio.gather(first, *others)
+
+    asyncio.run(run())
+
+    assert order == [NORMAL, INTERACTIVE, BULK]
+
+
+def test_retry_after_seconds():
+    def error(headers):
+        e = Exception("429 Too Many Requests")
+        if headers is not None:
+            e.response = SimpleNamespace(headers=headers)
+        return e
+
+    assert retry_after_seconds(error({"Retry-After": "3"})) == 3.0
+    assert retry_after_seconds(error({"Retry-After": "soon"})) is None
+    assert retry_after_seconds(error({})) is None
+    assert retry_after_seconds(error(None)) is None
+
+
+def test_multi_token_acquire():
+    """一次调用向上游发出多个请求时按请求数获取令牌，超过桶容量时按容量计算"""
+    limiter = TokenBucketRateLimiter(rate=20, burst=5, name="test")
+
+    async def run():
+        first = await limiter.acquire(tokens=5)
+        second = await limiter.acquire(tokens=2)
+        third = await limiter.acquire(tokens=50)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert first < 0.02
+    assert 0.08 <= second < 0.2
+    assert 0.2 <= third < 0.4
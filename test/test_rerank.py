@@ -0,0 +1,100 @@
+"""
+检索结果重排检查：BM25 排序、从文章缓存补入索引、缺少的文章默认不获取，开启时经助手以 bulk 优先级获取且有上限
+
+    python -m pytest test/test_rerank.py
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from src.agents.base import EasyAgent
+from src.agents.rerank import BM25Index, SearchReranker, tokenize
+from src.tools.base import BaseTool
+from src.tools.priority import BULK, current_priority
+
+ARTICLES = {
+    "1": {"title": "Weather report", "abstract": "Rain expected on the coast."},
+    "2": {"title": "Aspirin and stroke", "abstract": "Aspirin reduces stroke risk in trials of aspirin use."},
+    "3": {"title": "Stroke rehabilitation", "abstract": "Physical therapy after stroke."},
+}
+
+
+class FakeCache:
+    def __init__(self, articles):
+        self.articles = articles
+
+    def get_many(self, pmids):
+        return {pmid: SimpleNamespace(value=self.articles[pmid]) for pmid in pmids if pmid in self.articles}
+
+
+class FakeArticleTool(BaseTool):
+    """按 PMID 返回预置文章，记录每次获取的 PMID 和当时的优先级"""
+
+    def __init__(self, articles, cached=()):
+        super().__init__("PubMedGetArticleTool")
+        self.articles = articles
+        self.cache = FakeCache({pmid: articles[pmid] for pmid in cached})
+        self.calls = []
+
+    async def async_execute(self, pmids=None, fields=None):
+        self.calls.append((list(pmids), current_priority.get()))
+        return [{"pmid": pmid, **self.articles[pmid]} if pmid in self.articles else {"pmid": pmid, "error": "文章未找到"}
+                for pmid in pmids]
+
+
+def make_reranker(tool, **options):
+    agent = EasyAgent("test")
+    agent.register_tool(tool)
+    return SearchReranker(agent, {"rerank": options})
+
+
+def test_tokenize_drops_stopwords_and_keeps_compounds():
+    assert tokenize("The role of COVID-19 in a B cell") == ["role", "covid-19", "cell"]
+
+
+def test_bm25_scores_and_unindexed_pmids():
+    index = BM25Index()
+    index.add_many(ARTICLES)
+
+    scores = index.score("aspirin[tiab] AND stroke", ["1", "2", "3", "9"])
+
+    assert scores[1] > scores[2] > 0
+    assert scores[0] == scores[3] == 0
+
+
+def test_bm25_replaces_and_evicts_documents():
+    index = BM25Index(max_documents=2)
+    index.add_many(ARTICLES)
+    assert "1" not in index and len(index) == 2
+
+    index.add_many({"2": {"title": "Weather", "abstract": ""}})
+    assert index.score("aspirin", ["2"])[0] == 0
+    assert index.stats()["documents"] == 2
+
+
+def test_rerank_from_cache_without_fetching():
+    tool = FakeArticleTool(ARTICLES, cached=["1", "2"])
+    reranker = make_reranker(tool)
+
+    ranked = asyncio.run(reranker.rerank("stroke", {"pmids": ["1", "3", "2"], "count": 40}, 3))
+
+    # 缺少的文章默认不获取，得分为 0 时保留 ESearch 顺序
+    assert ranked == {"pmids": ["2", "1", "3"], "count": 40}
+    assert tool.calls == []
+    assert reranker.cached_ranking("stroke", 3) == ranked
+    assert reranker.stats()["ranking_hits"] == 1
+
+
+def test_fetch_missing_uses_bulk_lane_and_cap():
+    tool = FakeArticleTool(ARTICLES, cached=["1"])
+    reranker = make_reranker(tool, fetch_missing=True, max_fetch=1)
+
+    ranked = asyncio.run(reranker.rerank("stroke", {"pmids": ["1", "3", "2"], "count": 3}, 3))
+
+    # 只获取第一篇缺少的文章，获取在 bulk 优先级下进行
+    assert tool.calls == [(["3"], BULK)]
+    assert ranked["pmids"] == ["3", "1", "2"]
+    assert reranker.counters["fetched"] == 1
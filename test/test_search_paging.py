@@ -0,0 +1,87 @@
+"""
+分页检索检查：首页保存到 ESearch history server、游标翻页读取 history、同一检索式复用会话、
+WebEnv 失效后重新检索、无效游标
+
+    python -m pytest test/test_search_paging.py
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("aiohttp")
+
+from src.agents.pubmed_assistant import PubMedAssistant, _encode_cursor
+from src.config import Config
+from src.tools import eutils
+from src.tools.rate_limiter import TokenBucketRateLimiter
+from src.tools.resilience import CircuitBreaker
+
+
+def make_assistant(tmp_path, monkeypatch, base_url):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "eutils:\n"
+        f"  base_url: {base_url}/entrez/eutils\n"
+        "article_cache:\n"
+        f"  path: {tmp_path / 'cache.db'}\n"
+    )
+    monkeypatch.setattr(eutils, "_eutils_client", None)
+    assistant = PubMedAssistant("test", Config(str(config_file)))
+    tool = assistant.get_tool("PubMedSearchTool")
+    tool.rate_limiter = TokenBucketRateLimiter(1000, name="test")
+    tool.circuit_breaker = CircuitBreaker("test")
+    calls = []
+    for name in ("esearch", "efetch_history_pmids"):
+        method = getattr(tool.client, name)
+
+        async def spy(*args, _name=name, _method=method, **kwargs):
+            calls.append(_name)
+            return await _method(*args, **kwargs)
+
+        monkeypatch.setattr(tool.client, name, spy)
+    return assistant, calls
+
+
+def test_cursor_pages_through_history(tmp_path, monkeypatch, mock_upstream):
+    base_url, _ = mock_upstream
+    assistant, calls = make_assistant(tmp_path, monkeypatch, base_url)
+
+    async def run():
+        first = await assistant.search_pubmed_page("leukemia", limit=10)
+        second = await assistant.search_pubmed_page(cursor=first["next_cursor"])
+        # 同一检索式指定偏移时复用保存的会话
+        third = await assistant.search_pubmed_page("leukemia", offset=20, limit=10)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert first["count"] == 5000 and len(first["pmids"]) == 10 and first["offset"] == 0
+    assert second["offset"] == 10 and second["limit"] == 10 and len(second["pmids"]) == 10
+    assert third["offset"] == 20 and third["count"] == 5000
+    assert not set(first["pmids"]) & set(second["pmids"])
+    assert calls == ["esearch", "efetch_history_pmids", "efetch_history_pmids"]
+    assert list(assistant._search_sessions) == ["leukemia"]
+
+
+def test_expired_webenv_falls_back_to_esearch(tmp_path, monkeypatch, mock_upstream):
+    base_url, _ = mock_upstream
+    assistant, calls = make_assistant(tmp_path, monkeypatch, base_url)
+    cursor = _encode_cursor({
+        "query": "leukemia", "offset": 10, "limit": 10, "count": 5000,
+        "webenv": "MCID_expired", "query_key": "1",
+    })
+
+    page = asyncio.run(assistant.search_pubmed_page(cursor=cursor))
+
+    assert calls == ["efetch_history_pmids", "esearch"]
+    assert page["offset"] == 10 and len(page["pmids"]) == 10 and page["next_cursor"]
+    # 重新检索得到的新会话替换过期的会话
+    assert assistant._search_sessions["leukemia"]["webenv"].startswith("MCID_")
+    assert assistant._search_sessions["leukemia"]["webenv"] != "MCID_expired"
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", _encode_cursor({"query": "q"})])
+def test_invalid_cursor_raises_value_error(cursor):
+    assistant = PubMedAssistant("test")
+    with pytest.raises(ValueError):
+        asyncio.run(assistant.search_pubmed_page(cursor=cursor))
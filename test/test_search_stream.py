@@ -0,0 +1,156 @@
+"""
+流式检索检查：按块获取详情且只预取下一块、提前结束时取消预取、NDJSON 和 SSE 输出、字段投影
+
+    python -m pytest test/test_search_stream.py
+"""
+import asyncio
+import json
+import pytest
+
+from src.agents.pubmed_assistant import PubMedAssistant
+from src.tools.base import BaseTool
+from src.tools.pubmed_parser import normalize_fields
+
+PMIDS = [str(pmid) for pmid in range(101, 108)]
+
+
+class FakeSearchTool(BaseTool):
+    def __init__(self):
+        super().__init__("PubMedSearchTool")
+
+    async def async_execute(self, query=None, offset=0, limit=10, history=None):
+        return {"pmids": PMIDS[offset:offset + limit], "count": len(PMIDS), "webenv": None, "query_key": None}
+
+
+class FakeArticleTool(BaseTool):
+    """记录每次请求的 PMID，PMID 104 返回错误"""
+
+    def __init__(self):
+        super().__init__("PubMedGetArticleTool")
+        self.requests = []
+
+    async def async_execute(self, pmids=None, fields=None, **kwargs):
+        self.requests.append(list(pmids))
+        fields = normalize_fields(fields)
+        await asyncio.sleep(0)
+        results = []
+        for pmid in pmids:
+            if pmid == "104":
+                results.append({"pmid": pmid, "error": "not found"})
+                continue
+            record = {"pmid": pmid, "title": f"Article {pmid}", "year": "2020"}
+            results.append({k: v for k, v in record.items() if fields is None or k in fields})
+        return results
+
+
+@pytest.fixture
+def agent():
+    agent = PubMedAssistant("test")
+    agent.register_tool(FakeSearchTool())
+    agent.register_tool(FakeArticleTool())
+    return agent
+
+
+def test_chunks_are_fetched_one_ahead(agent):
+    tool = agent.get_tool("PubMedGetArticleTool")
+
+    async def run():
+        stream = agent.iter_article_details(PMIDS, chunk_size=3)
+        first = await stream.__anext__()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # 调用方停在第一块时只预取了第二块
+        requested = list(tool.requests)
+        rest = [result async for result in stream]
+        return first, requested, rest
+
+    first, requested, rest = asyncio.run(run())
+
+    assert first["pmid"] == "101"
+    assert requested == [PMIDS[0:3], PMIDS[3:6]]
+    assert [result["pmid"] for result in rest] == PMIDS[1:]
+    assert tool.requests == [PMIDS[0:3], PMIDS[3:6], PMIDS[6:7]]
+
+
+def test_closing_stream_cancels_prefetch(agent):
+    tool = agent.get_tool("PubMedGetArticleTool")
+    cancelled = []
+
+    async def slow_execute(pmids=None, fields=None, **kwargs):
+        tool.requests.append(list(pmids))
+        if len(tool.requests) > 1:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(list(pmids))
+                raise
+        return [{"pmid": pmid} for pmid in pmids]
+
+    tool.async_execute = slow_execute
+
+    async def run():
+        stream = agent.iter_article_details(PMIDS, chunk_size=3)
+        await stream.__anext__()
+        await asyncio.sleep(0)
+        await stream.aclose()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled == [PMIDS[3:6]]
+    assert agent._inflight == {}
+
+
+def make_client(agent):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api.depends import get_pubmed_assistant
+    from src.api.routes.search_service import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/search")
+    app.dependency_overrides[get_pubmed_assistant] = lambda: agent
+    return TestClient(app)
+
+
+def test_ndjson_stream(agent):
+    client = make_client(agent)
+
+    response = client.post("/search/stream?fields=title", json={"query": "q", "limit": 5})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["x-total-count"] == str(len(PMIDS))
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"title": "Article 101", "pmid": "101"}
+    assert lines[3] == {"pmid": "104", "error": "not found"}
+    # 投影之外的字段不出现在输出中
+    assert all("year" not in line for line in lines)
+    assert [line["pmid"] for line in lines] == PMIDS[:5]
+
+
+def test_sse_stream_ends_with_summary(agent):
+    client = make_client(agent)
+
+    response = client.post("/search/stream?format=sse", json={"query": "q", "limit": 5})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    assert [event for event, _ in events] == ["article"] * 3 + ["error"] + ["article", "end"]
+    assert events[0][1]["year"] == "2020"
+    end = events[-1][1]
+    assert end["count"] == len(PMIDS) and end["sent"] == 4 and end["next_cursor"]
+
+
+def test_invalid_arguments_return_errors(agent):
+    client = make_client(agent)
+
+    assert client.post("/search/stream?fields=nope", json={"query": "q"}).status_code == 400
+    assert client.post("/search/stream?format=xml", json={"query": "q"}).status_code == 422
+    assert client.post("/search/stream", json={"cursor": "bogus"}).status_code == 400
@@ -0,0 +1,194 @@
+"""
+翻译工具检查：流式翻译的首片段耗时计入自适应超时、译文写入缓存、批量翻译的打包和去重、文本与文章缓存分开
+
+    python -m pytest test/test_translate.py
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("yaml")
+
+from src.config import Config
+from src.tools.resilience import CircuitBreaker, OperationError
+from src.tools.translate import TranslateTool
+
+
+class FakeStream:
+    def __init__(self, parts, first_delay):
+        self.parts = parts
+        self.first_delay = first_delay
+        self.closed = False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_delay)
+        for part in self.parts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """chat.completions.create(stream=True) 依次返回预置的流，记录请求数"""
+
+    def __init__(self, replies, first_delay=0.0, connect_delay=0.0):
+        self.replies = list(replies)
+        self.first_delay = first_delay
+        self.connect_delay = connect_delay
+        self.requests = 0
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model=None, messages=None, temperature=None, stream=False):
+        self.requests += 1
+        await asyncio.sleep(self.connect_delay)
+        stream = FakeStream(self.replies.pop(0), self.first_delay)
+        self.streams.append(stream)
+        return stream
+
+
+@pytest.fixture
+def make_tool(tmp_path, monkeypatch):
+    def make(client):
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            "openai:\n"
+            "  api_key: test-key\n"
+            "  model: test-model\n"
+            "translation_cache:\n"
+            f"  path: {tmp_path / 'cache.db'}\n"
+        )
+        monkeypatch.setattr(TranslateTool, "client", property(lambda self: client))
+        tool = TranslateTool("TranslateTool", Config(str(config_file)))
+        tool.circuit_breaker = CircuitBreaker("test-openai")
+        return tool
+    return make
+
+
+def test_stream_translation_observes_first_chunk_and_caches(make_tool):
+    client = FakeClient([["阿司", "匹林"], ["摘要"]], first_delay=0.05)
+    tool = make_tool(client)
+    article = {"pmid": "1", "title": "Aspirin", "abstract": "Abstract"}
+
+    async def collect():
+        return [event async for event in tool.stream_translate_article(article)]
+
+    events = asyncio.run(collect())
+
+    assert events == [
+        {"field": "title", "delta": "阿司"},
+        {"field": "title", "delta": "匹林"},
+        {"field": "abstract", "delta": "摘要"},
+    ]
+    assert all(stream.closed for stream in client.streams)
+    # 每次流式调用记录一次首片段耗时，包含首片段之前的生成等待
+    assert tool.adaptive_timeout.stats()["samples"] == 2
+    assert min(tool.adaptive_timeout._samples) >= 0.05
+
+    # 再次翻译命中缓存，直接产出完整译文
+    assert asyncio.run(collect()) == [{"field": "title", "delta": "阿司匹林"}, {"field": "abstract", "delta": "摘要"}]
+    assert client.requests == 2
+
+
+def test_stream_timeout_is_observed(make_tool):
+    client = FakeClient([["x"]], connect_delay=1.0)
+    tool = make_tool(client)
+    tool.adaptive_timeout.initial = 0.01
+
+    async def collect():
+        return [event async for event in tool.stream_translate_article({"title": "Aspirin"})]
+
+    with pytest.raises(OperationError):
+        asyncio.run(collect())
+
+    assert tool.adaptive_timeout._samples[-1] == 0.01
+    assert tool.circuit_breaker._consecutive_failures == 1
+
+
+def test_parse_batch_reply_tolerates_fences_and_wrappers():
+    from src.tools.translate import _parse_batch_reply
+
+    reply = '```json\n[{"id": 0, "title": "标题", "abstract": "摘要"}, {"title": "缺少 id"}]\n```'
+    assert _parse_batch_reply(reply) == {"0": {"title": "标题", "abstract": "摘要"}}
+    assert _parse_batch_reply('{"items": [{"id": "1", "title": "T"}]}') == {"1": {"title": "T", "abstract": ""}}
+    with pytest.raises(ValueError):
+        _parse_batch_reply("这不是 JSON")
+
+
+def test_pack_batches_respects_token_budget_and_article_limit(make_tool):
+    tool = make_tool(FakeClient([]))
+    tool.max_batch_tokens, tool.max_batch_articles = 100, 3
+    items = [{"id": str(i), "title": "t", "abstract": "x" * size} for i, size in enumerate([160, 160, 400, 4, 4, 4, 4])]
+
+    batches = tool._pack_batches(items)
+
+    # 超出预算的单篇文章自成一批
+    assert [[item["id"] for item in batch] for batch in batches] == [["0", "1"], ["2"], ["3", "4", "5"], ["6"]]
+
+
+def test_translate_articles_batches_dedupes_and_caches(make_tool):
+    tool = make_tool(FakeClient([]))
+    tool.max_batch_articles = 2
+    tool.max_retries = 1
+    batches = []
+
+    async def fake_complete(messages):
+        items = json.loads(messages[-1]["content"])
+        batches.append([item["title"] for item in items])
+        if any(item["title"] == "Broken" for item in items):
+            raise RuntimeError("upstream error")
+        # 模型漏掉了标题为 Dropped 的文章
+        return json.dumps([
+            {"id": item["id"], "title": f"译:{item['title']}", "abstract": f"译:{item['abstract']}"}
+            for item in items if item["title"] != "Dropped"
+        ], ensure_ascii=False)
+
+    tool._complete = fake_complete
+    articles = [
+        {"pmid": "1", "title": "Aspirin", "abstract": "A"},
+        {"pmid": "2", "title": "Aspirin", "abstract": "A"},
+        {"pmid": "3", "title": "Stroke", "abstract": "B"},
+        {"pmid": "4", "title": "Dropped", "abstract": "C"},
+        {"pmid": "5", "title": "Fever", "abstract": "D"},
+        {"pmid": 6, "title": "Broken", "abstract": "E"},
+    ]
+
+    results = asyncio.run(tool.translate_articles(articles))
+
+    # 内容相同的文章只翻译一次
+    assert batches == [["Aspirin", "Stroke"], ["Dropped", "Fever"], ["Broken"]]
+    assert results[0] == {"pmid": "1", "title": "译:Aspirin", "abstract": "译:A", "target_language": "中文"}
+    assert results[1]["title"] == "译:Aspirin" and results[2]["title"] == "译:Stroke"
+    assert "缺少该文章" in results[3]["error"] and results[4]["title"] == "译:Fever"
+    # 一批失败不影响其他批次
+    assert results[5]["pmid"] == "6" and "upstream error" in results[5]["error"]
+
+    # 再次翻译只请求上次失败的文章
+    batches.clear()
+    results = asyncio.run(tool.translate_articles(articles[:5]))
+    assert batches == [["Dropped"]]
+    assert [result["pmid"] for result in results if "error" not in result] == ["1", "2", "3", "5"]
+
+
+def test_text_and_article_cache_entries_do_not_collide(make_tool):
+    tool = make_tool(FakeClient([]))
+
+    async def fake_complete(messages):
+        content = messages[-1]["content"]
+        if content.startswith("["):
+            items = json.loads(content)
+            return json.dumps([{"id": item["id"], "title": "文章标题", "abstract": ""} for item in items],
+                              ensure_ascii=False)
+        return "文本译文"
+
+    tool._complete = fake_complete
+
+    text = asyncio.run(tool.execute({"text": "Aspirin"}))
+    # 标题与已翻译的文本相同、摘要为空的文章不会读到字符串类型的文本译文
+    article = asyncio.run(tool.translate_articles([{"pmid": "1", "title": "Aspirin", "abstract": ""}]))
+
+    assert text["translated_text"] == "文本译文"
+    assert article[0]["title"] == "文章标题"
+    assert tool.cache.get(tool._text_cache_key("Aspirin", "中文")).value == "文本译文"